@@ -0,0 +1,153 @@
+"""
+Multi-process check of the distributed mode, on one machine and on CPU.
+
+Run from the repository root:
+
+    python benchmarks/check_distributed.py --ranks 4
+
+Local ranks are spawned with the environment set by `torchrun`, and check that
+
+- all ranks see the config and the last epoch computed by the local leader,
+  and only the writer rank writes checkpoints and logs, while the loggers of
+  the other ranks accept the same calls;
+- the other ranks fail at once when the local leader fails to compute a
+  handoff, instead of waiting for the timeout;
+- no handoff file is left after the run, and files of a run without
+  `LOCAL_WORLD_SIZE` are removed by a later run once stale.
+
+Exits with status 1 if any check fails.
+"""
+
+import os, sys, time, argparse
+import multiprocessing as mp
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+CONFIG = """
+workspace:
+  ckpts_folder: 'ckpts'
+  logs_folder: 'logs'
+  epoch_prefix: 'e'
+  ckpts_extension: '.pt'
+  step_key: 'step'
+
+base:
+  model.hidden_dim: 10
+
+base/test:
+  model.hidden_dim: 20
+"""
+
+
+def _set_env(rank: int, world_size: int, local_world_size: bool, run_id: str, handoff_dir: str):
+    os.environ.update(RANK=str(rank), WORLD_SIZE=str(world_size), LOCAL_RANK=str(rank),
+                      SUCROSE_RUN_ID=run_id, SUCROSE_HANDOFF_DIR=handoff_dir)
+    if local_world_size:
+        os.environ["LOCAL_WORLD_SIZE"] = str(world_size)
+
+
+def _train(rank: int, world_size: int, work_dir: str, run_id: str, handoff_dir: str, queue):
+    _set_env(rank, world_size, True, run_id, handoff_dir)
+    import torch
+    from sucrose import Scenario
+
+    ssc = Scenario(work_dir, "base/test")
+    model = torch.nn.Linear(4, 4)
+    ssc.load_state_dict(model=model)
+    writer = ssc.start_pytorch_tensorboard()
+    start = ssc.LAST_EPOCH
+
+    for _ in ssc.epoch_range(2):
+        ssc.step()
+        writer.add_scalar("loss(train)", 1.0, ssc.num_steps)
+        ssc.log_scalar("loss", 1.0)
+        ssc.accumulate("acc", 1.0)
+        ssc.save_state_dict(1, model=model)
+    ssc.flush()
+    writer.close()
+    queue.put((rank, start, ssc.LAST_EPOCH, ssc["model.hidden_dim"]))
+
+
+def _fail(rank: int, world_size: int, local_world_size: bool, run_id: str, handoff_dir: str, queue):
+    _set_env(rank, world_size, local_world_size, run_id, handoff_dir)
+    from sucrose.project.distributed import DistInfo, handoff
+
+    def compute():
+        raise ValueError("bad config")
+
+    start = time.monotonic()
+    try:
+        handoff("config", compute, DistInfo.from_env(), timeout=60.0)
+    except Exception as e:
+        queue.put((rank, type(e).__name__, time.monotonic() - start))
+    else:
+        queue.put((rank, None, time.monotonic() - start))
+
+
+def _spawn(target, ranks: int, *args) -> list:
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=target, args=(rank, ranks, *args, queue)) for rank in range(ranks)]
+    for p in procs:
+        p.start()
+    results = sorted(queue.get(timeout=300) for _ in procs)
+    for p in procs:
+        p.join()
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--ranks", type=int, default=4, help="number of local ranks")
+    args = parser.parse_args(argv)
+    failures: list[str] = []
+
+    def check(ok: bool, message: str):
+        print(("ok    " if ok else "FAIL  ") + message)
+        if not ok:
+            failures.append(message)
+
+    with tempfile.TemporaryDirectory() as root:
+        work_dir = os.path.join(root, "ws")
+        handoff_dir = os.path.join(root, "handoff")
+        os.makedirs(work_dir)
+        os.makedirs(handoff_dir)
+        with open(os.path.join(work_dir, "config.yaml"), "w") as f:
+            f.write(CONFIG)
+
+        for run in range(2):
+            results = _spawn(_train, args.ranks, work_dir, f"train{run}", handoff_dir)
+            check(len(set(r[1:] for r in results)) == 1,
+                  f"run {run}: same config and epochs on all ranks {results}")
+        ckpts = sorted(name for name in os.listdir(os.path.join(work_dir, "ckpts", "base", "test"))
+                       if name.endswith(".pt"))
+        check(ckpts == [f"base_test_e{epoch}.pt" for epoch in range(1, 5)],
+              f"checkpoints of the writer {ckpts}")
+        logs = os.listdir(os.path.join(work_dir, "logs", "base", "test"))
+        check(sum(name.endswith(".sclog") for name in logs) == 2,
+              f"one scalar log per run {sorted(logs)}")
+
+        for local_world_size in (True, False):
+            results = _spawn(_fail, args.ranks, local_world_size, f"fail{local_world_size}", handoff_dir)
+            check(all(r[1] == ("ValueError" if r[0] == 0 else "RuntimeError") and r[2] < 30
+                      for r in results),
+                  f"failed handoff raised on all ranks, LOCAL_WORLD_SIZE set: "
+                  f"{local_world_size} {results}")
+
+        left = os.listdir(handoff_dir)
+        check(left == ["sucrose-failFalse"], f"only files of the unknown local world size left {left}")
+
+        # Aged past the limit, then removed by the next run.
+        stale = time.time() - 2 * 24 * 3600
+        os.utime(os.path.join(handoff_dir, "sucrose-failFalse"), (stale, stale))
+        _spawn(_fail, args.ranks, True, "sweep", handoff_dir)
+        left = os.listdir(handoff_dir)
+        check(left == [], f"stale handoff files removed {left}")
+
+    print(f"{len(failures)} check(s) failed" if failures else "all checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+Check that importing sucrose does not import its heavy dependencies.
+
+Run from the repository root:
+
+    python benchmarks/check_imports.py
+
+Each statement is run in a fresh interpreter, which fails if any of torch,
+pandas, matplotlib or tensorboard is in `sys.modules` after it, since they
+are only needed when a scenario, a checkpoint or a log is actually used.
+
+Exits with status 1 if any check fails.
+"""
+
+import os, sys, json, argparse
+import subprocess
+
+HEAVY_MODULES = ("torch", "pandas", "matplotlib", "tensorboard")
+
+STATEMENTS = (
+    "import sucrose",
+    "import sucrose.config",
+    "import sucrose.project",
+    "import sucrose.post",
+    "import sucrose.runner",
+    "from sucrose import Scenario",
+)
+
+
+def heavy_imports(statement: str = "import sucrose") -> list[str]:
+    """Heavy modules imported by `statement` in a fresh interpreter."""
+    src = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [src] + os.environ.get("PYTHONPATH", "").split(os.pathsep)))
+    code = (f"{statement}\n"
+            "import sys, json\n"
+            f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+    proc = subprocess.run([sys.executable, "-c", code],
+                          capture_output=True, text=True, env=env, check=True)
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.parse_args(argv)
+    failures = 0
+
+    for statement in STATEMENTS:
+        found = heavy_imports(statement)
+        if found:
+            failures += 1
+            print(f"FAIL  {statement!r} imported {', '.join(found)}")
+        else:
+            print(f"ok    {statement!r}")
+
+    print(f"{failures} check(s) failed" if failures else "all checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,401 @@
+"""
+Benchmarks of config resolution, checkpoint I/O and log loading.
+
+Run from the repository root, offline and on CPU:
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --output new.json --compare results.json
+    python benchmarks/run.py --quick --only config
+
+Each case reports the wall time (min, median and mean over repeats) and the
+peak memory traced by `tracemalloc` in one extra run. Memory allocated
+outside the Python allocators (e.g. torch storages) is not traced.
+"""
+
+import os, sys, json, time, argparse
+import platform, statistics, subprocess, tempfile
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic
+from check_imports import heavy_imports
+
+
+@dataclass
+class Scale:
+    num_domains: int = 2000
+    depth: int = 8
+    num_ckpt_files: int = 5000
+    state_dict_mb: float = 64.0
+    log_steps: int = 20000
+    log_tags: int = 4
+    calls: int = 10000
+    repeat: int = 5
+
+
+QUICK = Scale(num_domains=100, depth=4, num_ckpt_files=200, state_dict_mb=4.0,
+              log_steps=1000, calls=1000, repeat=3)
+
+
+@dataclass
+class Context:
+    root: str
+    scale: Scale
+    cache: dict[str, Any] = field(default_factory=dict)
+
+    def workspace(self) -> str:
+        if "workspace" not in self.cache:
+            config = synthetic.make_config(self.scale.num_domains, self.scale.depth)
+            work_dir = synthetic.write_workspace(os.path.join(self.root, "ws"), config)
+            self.cache["workspace"] = work_dir
+            self.cache["config"] = config
+            self.cache["domain"] = synthetic.deepest_domain(config)
+        return self.cache["workspace"]
+
+
+# name -> setup, which returns the function to time and the number of
+# operations done by one call of the function
+Setup = Callable[[Context], tuple[Callable[[], Any], int]]
+CASES: dict[str, Setup] = {}
+
+
+def case(name: str):
+    def register(setup: Setup) -> Setup:
+        CASES[name] = setup
+        return setup
+    return register
+
+
+### Config
+
+def _config(ctx: Context, compiled: bool):
+    from sucrose.config import CompiledConfig
+    ctx.workspace()
+    data = ctx.cache["config"]
+    return (CompiledConfig(data) if compiled else data), ctx.cache["domain"]
+
+
+@case("config.lookup")
+def _(ctx):
+    from sucrose.config import lookup
+    data, domain = _config(ctx, compiled=False)
+    calls = ctx.scale.calls
+    return lambda: [lookup(data, domain, "data.f3") for _ in range(calls)], calls
+
+
+@case("config.lookup.compiled")
+def _(ctx):
+    from sucrose.config import lookup
+    data, domain = _config(ctx, compiled=True)
+    calls = ctx.scale.calls
+    return lambda: [lookup(data, domain, "data.f3") for _ in range(calls)], calls
+
+
+@case("config.find_all")
+def _(ctx):
+    from sucrose.config import find_all
+    data, domain = _config(ctx, compiled=False)
+    calls = ctx.scale.calls // 10
+    return lambda: [list(find_all(data, domain, "model")) for _ in range(calls)], calls
+
+
+@case("config.find_all.compiled")
+def _(ctx):
+    from sucrose.config import find_all
+    data, domain = _config(ctx, compiled=True)
+    calls = ctx.scale.calls // 10
+    return lambda: [list(find_all(data, domain, "model")) for _ in range(calls)], calls
+
+
+class _Model:
+    def __init__(self, f0=0, f1=1, f2=2, f3=3, **kwargs):
+        pass
+
+
+@case("config.partial_config")
+def _(ctx):
+    from sucrose.config import config_from_data
+    data, domain = _config(ctx, compiled=True)
+    calls = ctx.scale.calls // 10
+    return lambda: [config_from_data(_Model, "model", domain, data)()
+                    for _ in range(calls)], calls
+
+
+@case("config.load_config")
+def _(ctx):
+    from sucrose.project import scenario
+    work_dir = ctx.workspace()
+
+    def run():
+        scenario._CONFIG_CACHE.clear()
+        return scenario.load_config(work_dir)
+
+    return run, 1
+
+
+@case("config.scenario_init")
+def _(ctx):
+    from sucrose.project import Scenario
+    work_dir = ctx.workspace()
+    domain = ctx.cache["domain"]
+    return lambda: Scenario(work_dir, domain), 1
+
+
+### Checkpoints
+
+def _ckpts_dir(ctx: Context) -> tuple[str, str]:
+    if "ckpts_dir" not in ctx.cache:
+        name = "base/d0"
+        ckpts_dir = os.path.join(ctx.root, "ckpts_many")
+        synthetic.make_ckpt_dir(ckpts_dir, name, ctx.scale.num_ckpt_files)
+        ctx.cache["ckpts_dir"] = ckpts_dir
+    return ctx.cache["ckpts_dir"], "base_d0_e([0-9]+)\\.pt$"
+
+
+@case("ckpt.find_latest_epoch")
+def _(ctx):
+    from sucrose.project import find_latest_epoch
+    ckpts_dir, pattern = _ckpts_dir(ctx)
+    return lambda: find_latest_epoch(ckpts_dir, pattern), 1
+
+
+@case("ckpt.manifest.latest_epoch")
+def _(ctx):
+    import re
+    from sucrose.project.manifest import Manifest
+    ckpts_dir, pattern = _ckpts_dir(ctx)
+    Manifest(ckpts_dir, re.compile(pattern)).latest_epoch() # builds manifest.json
+    return lambda: Manifest(ckpts_dir, re.compile(pattern)).latest_epoch(), 1
+
+
+def _state_dict(ctx: Context):
+    if "state_dict" not in ctx.cache:
+        ctx.cache["state_dict"] = synthetic.make_state_dict(ctx.scale.state_dict_mb)
+    return ctx.cache["state_dict"]
+
+
+def _ckpt_cases(ext: str, layout: str):
+    name = f"base_e1.{ext}"
+
+    def save(ctx):
+        from sucrose.project.ckpt import save_state_dict_impl
+        state = _state_dict(ctx)
+        ckpts_dir = os.path.join(ctx.root, f"ckpt_{ext}_{layout}")
+        return lambda: save_state_dict_impl(ckpts_dir, name, layout=layout, **state), 1
+
+    def load(ctx):
+        from sucrose.project.ckpt import load_state_dict_impl, save_state_dict_impl
+        state = _state_dict(ctx)
+        ckpts_dir = os.path.join(ctx.root, f"ckpt_{ext}_{layout}")
+        save_state_dict_impl(ckpts_dir, name, layout=layout, **state)
+        return lambda: load_state_dict_impl(ckpts_dir, name, keys=list(state)), 1
+
+    case(f"ckpt.save.{ext}.{layout}")(save)
+    case(f"ckpt.load.{ext}.{layout}")(load)
+
+
+for _ext in ("pt", "safetensors", "npy", "npz"):
+    _ckpt_cases(_ext, "file")
+_ckpt_cases("pt", "sharded")
+
+
+### Logs
+
+def _logs_workspace(ctx: Context) -> tuple[str, list[str], list[str]]:
+    if "logs" not in ctx.cache:
+        config = {"workspace": dict(synthetic.WORKSPACE_DOMAIN), "base": {}}
+        work_dir = synthetic.write_workspace(os.path.join(ctx.root, "logs_ws"), config)
+        runs = ["base/run0", "base/run1"]
+        tags = [f"tag{i}" for i in range(ctx.scale.log_tags)]
+        for run in runs:
+            synthetic.write_tfevents(os.path.join(work_dir, "logs", run),
+                                     tags, ctx.scale.log_steps)
+        ctx.cache["logs"] = (work_dir, runs, tags)
+    return ctx.cache["logs"]
+
+
+@case("logs.load.cold")
+def _(ctx):
+    from sucrose.post import LogDataFrame, frame
+    work_dir, runs, tags = _logs_workspace(ctx)
+    loader = LogDataFrame(work_dir, runs=runs, tags=tags[:2])
+
+    def run():
+        frame._EVENT_CACHE.clear()
+        return loader.load(workers=1)
+
+    return run, 1
+
+
+@case("logs.load.warm")
+def _(ctx):
+    from sucrose.post import LogDataFrame
+    work_dir, runs, tags = _logs_workspace(ctx)
+    loader = LogDataFrame(work_dir, runs=runs, tags=tags[:2])
+    loader.load(workers=1)
+    return lambda: loader.load(workers=1), 1
+
+
+### Import time
+
+def import_time_ms(module: str = "sucrose") -> float:
+    """Cumulative import time of a module in a fresh interpreter,
+    from `python -X importtime`."""
+    src = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [src] + os.environ.get("PYTHONPATH", "").split(os.pathsep)))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, env=env, check=True)
+    for line in reversed(proc.stderr.splitlines()):
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    raise RuntimeError(f"import time of {module!r} not found")
+
+
+### Runner
+
+def measure(fn: Callable[[], Any], repeat: int) -> dict[str, float]:
+    fn() # warm up
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "peak_traced_bytes": peak,
+    }
+
+
+def run_cases(names: list[str], scale: Scale) -> dict[str, dict[str, float]]:
+    results = {}
+
+    with tempfile.TemporaryDirectory(prefix="sucrose-bench-") as root:
+        ctx = Context(root, scale)
+        for name in names:
+            try:
+                fn, ops = CASES[name](ctx)
+            except ImportError as e:
+                print(f"{name:40s} skipped ({e})")
+                continue
+            result = measure(fn, scale.repeat)
+            result["ops"] = ops
+            result["per_op"] = result["min"] / ops
+            results[name] = result
+            print(f"{name:40s} {_fmt_time(result['per_op']):>10s}/op  "
+                  f"peak {result['peak_traced_bytes'] / (1 << 20):8.2f} MiB")
+
+    return results
+
+
+def _fmt_time(seconds: float) -> str:
+    for unit, factor in (("s", 1), ("ms", 1e3), ("us", 1e6)):
+        if seconds * factor >= 1:
+            return f"{seconds * factor:.3g} {unit}"
+    return f"{seconds * 1e9:.3g} ns"
+
+
+def compare(new: dict[str, Any], base: dict[str, Any], threshold: float) -> bool:
+    """Print the ratio of new to base times. Return whether any case is
+    slower than `threshold` times the base."""
+    regressed = False
+    print(f"\n{'case':40s} {'base':>10s} {'new':>10s} {'ratio':>7s}")
+
+    for name, result in new["results"].items():
+        old = base["results"].get(name)
+        if old is None:
+            continue
+        ratio = result["per_op"] / old["per_op"]
+        flag = " !" if ratio > threshold else ""
+        regressed |= bool(flag)
+        print(f"{name:40s} {_fmt_time(old['per_op']):>10s} "
+              f"{_fmt_time(result['per_op']):>10s} {ratio:7.2f}{flag}")
+
+    if "import_ms" in new and "import_ms" in base:
+        print(f"{'import sucrose':40s} {base['import_ms']:8.1f}ms {new['import_ms']:8.1f}ms "
+              f"{new['import_ms'] / base['import_ms']:7.2f}")
+
+    return regressed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="*", default=[],
+                        help="run cases whose names start with any of these")
+    parser.add_argument("--list", action="store_true", help="list cases and exit")
+    parser.add_argument("--quick", action="store_true", help="use small inputs")
+    parser.add_argument("--repeat", type=int, default=None)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="compare with results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="ratio over which a case is flagged as slower")
+    parser.add_argument("--import-budget-ms", type=float, default=None,
+                        help="fail if `import sucrose` takes longer than this")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(CASES))
+        return 0
+
+    scale = QUICK if args.quick else Scale()
+    if args.repeat is not None:
+        scale.repeat = args.repeat
+
+    names = [n for n in CASES if not args.only or any(n.startswith(p) for p in args.only)]
+    results = run_cases(names, scale)
+    import_ms = min(import_time_ms() for _ in range(3))
+    print(f"{'import sucrose':40s} {import_ms:8.1f} ms")
+    heavy = heavy_imports("import sucrose")
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": vars(scale),
+        "import_ms": import_ms,
+        "heavy_imports": heavy,
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    status = 0
+
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(report, json.load(f), args.threshold):
+                status = 1
+
+    if args.import_budget_ms is not None and import_ms > args.import_budget_ms:
+        print(f"import sucrose took {import_ms:.1f} ms, over the budget "
+              f"of {args.import_budget_ms:.1f} ms")
+        status = 1
+
+    if heavy:
+        print(f"import sucrose imported {', '.join(heavy)}")
+        status = 1
+
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Synthetic inputs of the benchmarks: workspaces with deep config hierarchies,
+checkpoint directories with many files, state dicts and tfevents files.
+"""
+
+import os, struct, time
+from typing import Any
+
+import yaml
+
+WORKSPACE_DOMAIN = {
+    "ckpts_folder": "ckpts",
+    "logs_folder": "logs",
+    "epoch_prefix": "e",
+    "ckpts_extension": ".pt",
+    "step_key": "step",
+}
+
+
+def make_config(num_domains: int, depth: int, fields: int = 20) -> dict[str, dict[str, Any]]:
+    """Config data with `num_domains` leaf chains of `depth` levels under `base`.
+
+    Every level overrides a few fields of its parent, and the root defines
+    `fields` fields of each of the prefixes `model`, `optim` and `data`."""
+    config: dict[str, dict[str, Any]] = {"workspace": dict(WORKSPACE_DOMAIN)}
+    config["base"] = {f"{prefix}.f{i}": i
+                      for prefix in ("model", "optim", "data") for i in range(fields)}
+
+    for d in range(num_domains):
+        domain = "base"
+        for level in range(depth):
+            domain = f"{domain}/d{d}" if level == 0 else f"{domain}/l{level}"
+            config[domain] = {f"model.f{level % fields}": level, f"optim.f{d % fields}": d}
+
+    return config
+
+
+def deepest_domain(config: dict[str, Any]) -> str:
+    return max(config, key=lambda k: (k.count("/"), k))
+
+
+def write_workspace(work_dir: str, config: dict[str, Any]) -> str:
+    os.makedirs(work_dir, exist_ok=True)
+    with open(os.path.join(work_dir, "config.yaml"), "w") as f:
+        yaml.safe_dump(config, f, sort_keys=False)
+    return work_dir
+
+
+def make_ckpt_dir(ckpts_dir: str, name: str, num_files: int, ext: str = "pt",
+                  prefix: str = "e") -> str:
+    """Empty checkpoint files of epochs 1 to `num_files`, named like those of
+    `Scenario`, with some unrelated files mixed in."""
+    os.makedirs(ckpts_dir, exist_ok=True)
+    base = name.replace("/", "_")
+
+    for epoch in range(1, num_files + 1):
+        open(os.path.join(ckpts_dir, f"{base}_{prefix}{epoch}.{ext}"), "wb").close()
+        if epoch % 10 == 0:
+            open(os.path.join(ckpts_dir, f"notes_{epoch}.txt"), "wb").close()
+
+    return ckpts_dir
+
+
+def make_state_dict(total_mb: float, num_tensors: int = 64, seed: int = 0) -> dict[str, Any]:
+    """A model-like state dict of float32 tensors of about `total_mb` MiB,
+    and an optimizer-like state dict of the same size."""
+    import torch
+
+    gen = torch.Generator().manual_seed(seed)
+    numel = max(1, int(total_mb * (1 << 20) / 4 / num_tensors / 2))
+    model = {f"layer{i}.weight": torch.randn(numel, generator=gen)
+             for i in range(num_tensors)}
+    optim = {
+        "state": {i: {"exp_avg": torch.randn(numel, generator=gen), "step": torch.tensor(10.)}
+                  for i in range(num_tensors)},
+        "param_groups": [{"lr": 1e-3, "params": list(range(num_tensors))}],
+    }
+    return {"model": model, "optim": optim}
+
+
+### TensorBoard event files
+
+def _crc32c_table():
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0x82F63B78 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_CRC_TABLE = _crc32c_table()
+
+
+def _masked_crc32c(data: bytes) -> int:
+    crc = 0xFFFFFFFF
+    for b in data:
+        crc = _CRC_TABLE[(crc ^ b) & 0xFF] ^ (crc >> 8)
+    crc ^= 0xFFFFFFFF
+    return (((crc >> 15) | (crc << 17)) + 0xA282EAD8) & 0xFFFFFFFF
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+
+def _length_delimited(key: int, payload: bytes) -> bytes:
+    return bytes([key]) + _varint(len(payload)) + payload
+
+
+def _event(wall_time: float, step: int, tag: str | None = None, value: float = 0.0,
+           file_version: str | None = None) -> bytes:
+    data = b"\x09" + struct.pack("<d", wall_time) + b"\x10" + _varint(step)
+    if file_version is not None:
+        data += _length_delimited(0x1A, file_version.encode())
+    if tag is not None:
+        summary_value = _length_delimited(0x0A, tag.encode()) + b"\x15" + struct.pack("<f", value)
+        data += _length_delimited(0x2A, _length_delimited(0x0A, summary_value))
+    return data
+
+
+def _record(data: bytes) -> bytes:
+    header = struct.pack("<Q", len(data))
+    return (header + struct.pack("<I", _masked_crc32c(header)) + data
+            + struct.pack("<I", _masked_crc32c(data)))
+
+
+def write_tfevents(log_dir: str, tags: list[str], num_steps: int) -> str:
+    """A TensorBoard event file with a scalar of every tag at every step."""
+    import math
+
+    os.makedirs(log_dir, exist_ok=True)
+    now = time.time()
+    path = os.path.join(log_dir, f"events.out.tfevents.{int(now)}.bench.{os.getpid()}.0")
+
+    with open(path, "wb") as f:
+        f.write(_record(_event(now, 0, file_version="brain.Event:2")))
+        for step in range(num_steps):
+            for i, tag in enumerate(tags):
+                value = math.exp(-step / num_steps) + 0.01 * i
+                f.write(_record(_event(now + step, step, tag, value)))
+
+    return path
@@ -9,15 +9,42 @@ __all__ = [
     "scenario"
 ]
 
-from .project import *
+import importlib
+
 from .sucrose_logger import logger
 
+# Subpackages and names of `sucrose.project` are imported on first access,
+# so that `import sucrose` stays cheap for short-lived processes.
+_SUBMODULES = ("config", "counter", "post", "project", "runner")
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+
+    if not name.startswith("__"):
+        project = importlib.import_module(".project", __name__)
+        try:
+            value = getattr(project, name)
+        except AttributeError:
+            pass
+        else:
+            globals()[name] = value
+            return value
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    project = importlib.import_module(".project", __name__)
+    return sorted(set(globals()) | set(_SUBMODULES) | set(dir(project)))
+
 
 def scenario(work_dir: str, name: str):
     """Start a Scenario."""
-    from .project.scenario import set_current
+    from .project.scenario import Scenario, set_current_scenario
 
     sc = Scenario(work_dir, name)
-    set_current('Scenario', sc)
+    set_current_scenario(sc, process_wide=True)
 
     return sc
@@ -0,0 +1,105 @@
+import os
+import shutil, tempfile
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import BinaryIO
+
+_UMASK: int | None = None
+_UMASK_LOCK = threading.Lock()
+
+
+def _umask() -> int:
+    global _UMASK
+    with _UMASK_LOCK:
+        if _UMASK is None:
+            try: # Linux reports it without changing it
+                with open("/proc/self/status", "r") as f:
+                    for line in f:
+                        if line.startswith("Umask:"):
+                            _UMASK = int(line.split()[1], 8)
+                            break
+            except OSError:
+                pass
+            if _UMASK is None:
+                _UMASK = os.umask(0o022)
+                os.umask(_UMASK)
+        return _UMASK
+
+
+def default_mode(path: str) -> None:
+    """Give a file (or directory) made by `tempfile.mkstemp` (or `mkdtemp`),
+    which is only accessible by the owner, the mode of files made by `open`
+    (or `os.makedirs`). Called before the temp file is renamed into place."""
+    if os.name != "posix":
+        return
+    mode = 0o777 if os.path.isdir(path) else 0o666
+    os.chmod(path, mode & ~_umask())
+
+
+def _replace_dir(src: str, dst: str):
+    # A directory can not replace a non-empty one, so the old one is moved
+    # aside first.
+    if not os.path.exists(dst):
+        os.replace(src, dst)
+        return
+
+    trash = tempfile.mkdtemp(prefix=".", suffix=".old", dir=os.path.dirname(dst))
+    os.replace(dst, os.path.join(trash, "old"))
+    os.replace(src, dst)
+    shutil.rmtree(trash, ignore_errors=True)
+
+
+@contextmanager
+def atomic_path(path: str, *, directory: bool = False) -> Iterator[str]:
+    """Yield the path of a hidden temp file (or directory) beside `path`,
+    to be written in the block. It is renamed to `path` with the default
+    mode when the block exits normally, and removed otherwise, so that a
+    crash never leaves a partial file under the final name."""
+    dir_name = os.path.dirname(path) or "."
+    os.makedirs(dir_name, exist_ok=True)
+    if directory:
+        tmp_name = tempfile.mkdtemp(prefix=".", suffix=".tmp", dir=dir_name)
+    else:
+        fd, tmp_name = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=dir_name)
+        os.close(fd)
+
+    try:
+        yield tmp_name
+        default_mode(tmp_name)
+        if directory:
+            _replace_dir(tmp_name, path)
+        else:
+            os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.isdir(tmp_name):
+            shutil.rmtree(tmp_name, ignore_errors=True)
+        elif os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+
+def atomic_write(
+    path: str,
+    data: bytes | str | Callable[[BinaryIO], None],
+    *,
+    fsync: bool = False
+) -> None:
+    """Replace the file at `path` atomically, see `atomic_path`.
+
+    Args:
+        path (str): The file to write.
+        data (bytes | str | Callable[[BinaryIO], None]): The content (`str` is
+            encoded as UTF-8), or a function writing it to the binary file.
+        fsync (bool, optional): Flush the file to the disk before renaming it.
+            Defaults to `False`.
+    """
+    with atomic_path(path) as tmp_name:
+        with open(tmp_name, "wb") as f:
+            if callable(data):
+                data(f)
+            else:
+                f.write(data.encode("utf-8") if isinstance(data, str) else data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
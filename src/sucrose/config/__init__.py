@@ -2,3 +2,4 @@
 from .conftools import *
 from .configs import *
 from .callableconf import *
+from .sweeps import *
@@ -1,6 +1,7 @@
 
 __all__ = ["config_from_data"]
 
+import logging
 from typing import Any, TypeVar
 from collections.abc import Mapping, Callable
 
@@ -11,6 +12,32 @@ from .conftools import partial_config
 _MT = TypeVar('_MT')
 
 
+def _collect_dataset(
+    prefix: str,
+    domain: str,
+    data: Mapping[str, Mapping[str, Any]],
+) -> dict[str, Any]:
+    return {item[0].rsplit(".", 1)[-1]: item[1]
+            for item in find_all(data, domain, prefix)}
+
+
+def _resolve_dataset(
+    prefix: str,
+    domain: str,
+    data: Mapping[str, Mapping[str, Any]],
+) -> dict[str, Any]:
+    # Datasets are cached in compiled configs, and dropped on config changes.
+    if isinstance(data, CompiledConfig):
+        key = (config_from_data, domain, prefix)
+        try:
+            return data.cache[key]
+        except KeyError:
+            dataset = data.cache[key] = _collect_dataset(prefix, domain, data)
+            return dataset
+
+    return _collect_dataset(prefix, domain, data)
+
+
 def config_from_data(
     func: Callable[..., _MT],
     /,
@@ -18,13 +45,14 @@ def config_from_data(
     domain: str,
     data: Mapping[str, Mapping[str, Any]],
 ):
-    dataset = {item[0].rsplit(".", 1)[-1]: item[1]
-               for item in find_all(data, domain, prefix)}
-    if dataset:
-        data_repr = "\n".join([f"{k!r}\t = {v!r}" for k, v in dataset.items()])
-        logger.info(f"Configuring {prefix!r} from domain {domain!r} "
-                    f"with following args:\n{data_repr}")
-    else:
-        logger.info(f"No config found for {prefix!r} in domain {domain!r}.")
+    dataset = _resolve_dataset(prefix, domain, data)
+
+    if logger.isEnabledFor(logging.INFO):
+        if dataset:
+            data_repr = "\n".join([f"{k!r}\t = {v!r}" for k, v in dataset.items()])
+            logger.info(f"Configuring {prefix!r} from domain {domain!r} "
+                        f"with following args:\n{data_repr}")
+        else:
+            logger.info(f"No config found for {prefix!r} in domain {domain!r}.")
 
     return partial_config(func, dataset)
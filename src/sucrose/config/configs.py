@@ -1,8 +1,11 @@
 
-__all__ = ["lookup", "find_all"]
+__all__ = ["lookup", "find_all", "CompiledConfig"]
 
+from bisect import bisect_left
 from typing import Any
-from collections.abc import Mapping, Iterator
+from collections.abc import Mapping, MutableMapping, Iterator
+
+from .sweeps import SWEEP_KEYS, sweep_member
 
 
 def check_data(data: Mapping[str, Mapping[str, Any]]) -> None:
@@ -11,6 +14,185 @@ def check_data(data: Mapping[str, Mapping[str, Any]]) -> None:
             raise ValueError(f"domain name cannot start with '/'")
 
 
+def _parent_domain(domain: str) -> str | None:
+    parent = domain.rsplit("/", 1)[0]
+    return None if parent == domain else parent
+
+
+def _domain_layers(data: Mapping[str, Mapping[str, Any]], domain: str):
+    """Fields of the domain itself, then those it takes as a sweep member."""
+    layers = [data[domain] or {}] if domain in data else []
+    member = sweep_member(data, domain)
+    if member is not None:
+        layers.append(member)
+    return layers
+
+
+class _Domain(dict):
+    """Fields of a domain of a `CompiledConfig`, invalidating its resolved
+    data when changed. Pickled and copied as a plain dict."""
+    __slots__ = ("_owner",)
+
+    def __init__(self, owner: "CompiledConfig", fields: Mapping[str, Any]):
+        super().__init__(fields)
+        self._owner = owner
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+    def __setitem__(self, field, value):
+        super().__setitem__(field, value)
+        self._owner.invalidate()
+
+    def __delitem__(self, field):
+        super().__delitem__(field)
+        self._owner.invalidate()
+
+    def __ior__(self, other):
+        super().__ior__(other)
+        self._owner.invalidate()
+        return self
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._owner.invalidate()
+
+    def setdefault(self, field, default=None):
+        if field not in self:
+            self[field] = default
+        return self[field]
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self._owner.invalidate()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._owner.invalidate()
+        return item
+
+    def clear(self):
+        super().clear()
+        self._owner.invalidate()
+
+
+class CompiledConfig(MutableMapping[str, Mapping[str, Any]]):
+    """Config data with the domain inheritance resolved.
+
+    Each domain is flattened with the fields inherited from its parents into
+    a resolved mapping when first queried, together with a sorted index of
+    field names for prefix queries. Then `lookup` and `find_all` on the
+    config are dict reads and binary searches.
+
+    Domains are dicts, copied from the data when first accessed. Changing
+    their fields, or assigning a whole domain, invalidates the resolved data."""
+    def __init__(self, data: Mapping[str, Mapping[str, Any]] = {}):
+        check_data(data)
+        self._data: dict[str, Mapping[str, Any]] = dict(data)
+        self._version = 0
+        self._resolved: dict[str, dict[str, Any]] = {}
+        self._index: dict[str, list[str]] = {}
+        self._cache: dict[Any, Any] = {}
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._data!r})"
+
+    def __getitem__(self, domain: str) -> dict[str, Any]:
+        fields = self._data[domain]
+        if not isinstance(fields, _Domain) or fields._owner is not self:
+            # Copied, as the data may be shared with other configs
+            fields = self._data[domain] = _Domain(self, fields or {})
+        return fields
+
+    def __setitem__(self, domain: str, value: Mapping[str, Any]):
+        check_data((domain,))
+        self._data[domain] = _Domain(self, value or {})
+        self.invalidate()
+
+    def __delitem__(self, domain: str):
+        del self._data[domain]
+        self.invalidate()
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def version(self) -> int:
+        """A number increased every time the config changes."""
+        return self._version
+
+    @property
+    def cache(self) -> dict[Any, Any]:
+        """A dict for data derived from the config, cleared on changes."""
+        return self._cache
+
+    def invalidate(self) -> None:
+        """Drop all resolved data."""
+        self._resolved.clear()
+        self._index.clear()
+        self._cache.clear()
+        self._version += 1
+
+    def resolve(self, domain: str) -> Mapping[str, Any]:
+        """All fields of the domain, including the inherited ones.
+        Fields of the domain come first, then those of its parent."""
+        try:
+            return self._resolved[domain]
+        except KeyError:
+            pass
+
+        parent = _parent_domain(domain)
+
+        resolved = dict(self._data.get(domain) or ()) # empty domains are None
+        for key in SWEEP_KEYS:
+            resolved.pop(key, None)
+
+        for field, value in (sweep_member(self._data, domain) or {}).items():
+            resolved.setdefault(field, value) # fields of (virtual) sweep members
+
+        if parent is not None:
+            for field, value in self.resolve(parent).items():
+                resolved.setdefault(field, value)
+
+        self._resolved[domain] = resolved
+        return resolved
+
+    def lookup(self, domain: str, field: str) -> Any:
+        try:
+            return self.resolve(domain)[field]
+        except KeyError:
+            raise KeyError(
+                f"can not resolve field {field!r} from the domain {domain!r}"
+            ) from None
+
+    def find_all(self, domain: str, prefix: str) -> list[tuple[str, Any]]:
+        resolved = self.resolve(domain)
+
+        if not prefix:
+            return list(resolved.items())
+
+        try:
+            keys = self._index[domain]
+        except KeyError:
+            keys = self._index[domain] = sorted(resolved)
+
+        matched = []
+        for i in range(bisect_left(keys, prefix), len(keys)):
+            if not keys[i].startswith(prefix):
+                break
+            matched.append(keys[i])
+
+        if len(matched) > 1: # keep the order of resolved fields
+            order = {k: i for i, k in enumerate(resolved)}
+            matched.sort(key=order.__getitem__)
+
+        return [(k, resolved[k]) for k in matched]
+
+
 def lookup(
     data: Mapping[str, Mapping[str, Any]],
     domain: str,
@@ -19,22 +201,25 @@ def lookup(
     """Lookup the given field path in data.
 
     Raise KeyError if not found."""
-    check_data(data)
+    if isinstance(data, CompiledConfig):
+        return data.lookup(domain, field)
 
-    if domain in data:
-        dom_data = data[domain]
+    check_data(data)
+    current = domain
 
-        if field in dom_data:
-            return dom_data[field]
+    if field in SWEEP_KEYS:
+        raise KeyError(f"field {field!r} is reserved for sweeps")
 
-    parent_domain = domain.rsplit("/", 1)[0]
+    while current is not None:
+        for dom_data in _domain_layers(data, current):
+            if field in dom_data:
+                return dom_data[field]
 
-    if parent_domain == domain:
-        raise KeyError(
-            f"can not resolve field {field!r} from the domain {domain!r}"
-        )
+        current = _parent_domain(current)
 
-    return lookup(data, parent_domain, field)
+    raise KeyError(
+        f"can not resolve field {field!r} from the domain {domain!r}"
+    )
 
 
 def find_all(
@@ -43,19 +228,21 @@ def find_all(
     prefix: str,
     exclude: set[str] = set()
 ) -> Iterator[tuple[str, Any]]:
-    check_data(data)
-    exclude = exclude.copy()
-
-    if domain in data:
-        dom_data = data[domain]
-        for field, value in dom_data.items():
-            if field.startswith(prefix) and (field not in exclude):
+    if isinstance(data, CompiledConfig):
+        for field, value in data.find_all(domain, prefix):
+            if field not in exclude:
                 yield field, value
-                exclude.add(field)
+        return
 
-    parent_domain = domain.rsplit("/", 1)[0]
+    check_data(data)
+    exclude = exclude.union(SWEEP_KEYS)
+    current = domain
 
-    if parent_domain == domain: # if reached the root
-        return
+    while current is not None:
+        for dom_data in _domain_layers(data, current):
+            for field, value in dom_data.items():
+                if field.startswith(prefix) and (field not in exclude):
+                    yield field, value
+                    exclude.add(field)
 
-    yield from find_all(data, parent_domain, prefix, exclude)
+        current = _parent_domain(current)
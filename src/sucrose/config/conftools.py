@@ -5,11 +5,22 @@ from typing import Any, TypeVar, Generic
 from functools import partial
 from collections.abc import Mapping, Callable
 import inspect
+import functools
 
 _R = TypeVar("_R")
 
 
-def _get_keyword_params(target: Callable, /) -> tuple[list[str], list[bool], bool]:
+def _get_keyword_params(target: Callable, /) -> tuple[tuple[str, ...], tuple[bool, ...], bool]:
+    """Names of keyword parameters, whether they have defaults, and whether
+    `**kwargs` is accepted. Results are cached for functions and classes,
+    but not for bound methods or partials, which would keep their owners alive."""
+    if isinstance(target, type) or inspect.isfunction(target):
+        return _cached_keyword_params(target)
+
+    return _parse_keyword_params(target)
+
+
+def _parse_keyword_params(target: Callable, /) -> tuple[tuple[str, ...], tuple[bool, ...], bool]:
     if not hasattr(target, "__dict__"):
         raise TypeError("func must have __dict__ attribute")
 
@@ -43,7 +54,10 @@ def _get_keyword_params(target: Callable, /) -> tuple[list[str], list[bool], boo
         results.append(name)
         has_default.append(param.default != param.empty)
 
-    return results, has_default, has_var_keyword
+    return tuple(results), tuple(has_default), has_var_keyword
+
+
+_cached_keyword_params = functools.lru_cache(maxsize=1024)(_parse_keyword_params)
 
 
 class partial_config(partial, Generic[_R]):
@@ -0,0 +1,154 @@
+
+__all__ = [
+    "SWEEP_KEYS",
+    "Sweep",
+    "get_sweep",
+    "sweep_member",
+    "sweep_size",
+    "iter_sweep_members",
+    "list_sweeps"
+]
+
+import math
+from collections.abc import Iterator, Mapping, Sequence
+from typing import Any
+
+# Reserved fields declaring a sweep in a domain:
+#   __grid__: {field: values}, the product of the values of all fields
+#   __zip__:  {field: values}, values of all fields taken together,
+#             which must be of the same length
+# Values are lists, or one of
+#   {range: [start, stop, step]}, {linspace: [start, stop, num]},
+#   {geomspace: [start, stop, num]}
+# Members of a sweep in domain `D` are virtual domains `D/0`, `D/1`, ...,
+# inheriting `D` and overriding the swept fields.
+GRID_KEY = "__grid__"
+ZIP_KEY = "__zip__"
+SWEEP_KEYS = (GRID_KEY, ZIP_KEY)
+
+
+class _Values(Sequence):
+    """Values of a sweep axis, computed by index instead of stored."""
+    def __init__(self, kind: str, args: Sequence[Any]):
+        if kind == "range":
+            self._range = range(*args)
+            self._len = len(self._range)
+        elif kind in ("linspace", "geomspace"):
+            start, stop, num = args
+            if kind == "geomspace" and (start <= 0 or stop <= 0):
+                raise ValueError("geomspace needs positive bounds")
+            self._range = None
+            self._len = int(num)
+        else:
+            raise ValueError(f"unknown sweep values {kind!r}, expected "
+                             "'range', 'linspace' or 'geomspace'")
+        self.kind = kind
+        self.args = tuple(args)
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, index: int):
+        if not -self._len <= index < self._len:
+            raise IndexError(index)
+        index %= self._len
+
+        if self._range is not None:
+            return self._range[index]
+
+        start, stop, num = self.args
+        if index == 0 or index == num - 1: # exact bounds
+            return start if index == 0 else stop
+        t = index / (num - 1)
+        if self.kind == "linspace":
+            return start + (stop - start) * t
+        return math.exp(math.log(start) + (math.log(stop) - math.log(start)) * t)
+
+
+def _values(spec: Any) -> Sequence[Any]:
+    if isinstance(spec, Mapping):
+        if len(spec) != 1:
+            raise ValueError(f"sweep values should have one kind, got {list(spec)}")
+        (kind, args), = spec.items()
+        return _Values(kind, args)
+    if isinstance(spec, (list, tuple)):
+        return spec
+    return (spec,)
+
+
+class Sweep():
+    """Axes of a sweep declared in a domain. Member `i` is decoded from `i`
+    by mixed radix, the last axis changing fastest, without expanding the
+    combinations."""
+    def __init__(self, dom_data: Mapping[str, Any]):
+        # each axis: names of the fields and sequences of their values
+        self.axes: list[tuple[tuple[str, ...], tuple[Sequence[Any], ...]]] = []
+
+        for field, spec in (dom_data.get(GRID_KEY) or {}).items():
+            self.axes.append(((field,), (_values(spec),)))
+
+        zipped = dom_data.get(ZIP_KEY) or {}
+        if zipped:
+            columns = tuple(_values(spec) for spec in zipped.values())
+            if len({len(c) for c in columns}) != 1:
+                raise ValueError(f"values of {ZIP_KEY} should be of the same length")
+            self.axes.append((tuple(zipped), columns))
+
+        self.sizes = [len(cols[0]) for _, cols in self.axes]
+
+    def __len__(self):
+        return math.prod(self.sizes)
+
+    def member(self, index: int) -> dict[str, Any]:
+        """Fields of the member at the index."""
+        if not 0 <= index < len(self):
+            raise IndexError(f"sweep member {index} out of range {len(self)}")
+
+        fields = {}
+
+        for (names, columns), size in zip(reversed(self.axes), reversed(self.sizes)):
+            index, pos = divmod(index, size)
+            for name, column in zip(names, columns):
+                fields[name] = column[pos]
+
+        return fields
+
+
+def get_sweep(dom_data: Mapping[str, Any] | None) -> Sweep | None:
+    """The sweep declared in the domain data, or `None`."""
+    if not dom_data or (GRID_KEY not in dom_data and ZIP_KEY not in dom_data):
+        return None
+    return Sweep(dom_data)
+
+
+def sweep_member(data: Mapping[str, Mapping[str, Any]], domain: str) -> dict[str, Any] | None:
+    """Swept fields of the domain if it is a virtual member of a sweep,
+    or `None` if it is not."""
+    parent, sep, index = domain.rpartition("/")
+
+    if not sep or not index.isdigit() or parent not in data:
+        return None
+
+    sweep = get_sweep(data[parent])
+    if sweep is None or int(index) >= len(sweep):
+        return None
+
+    return sweep.member(int(index))
+
+
+def sweep_size(data: Mapping[str, Mapping[str, Any]], domain: str) -> int:
+    """Number of members of the sweep declared in the domain, `0` if none."""
+    sweep = get_sweep(data.get(domain))
+    return 0 if sweep is None else len(sweep)
+
+
+def iter_sweep_members(data: Mapping[str, Mapping[str, Any]], domain: str) -> Iterator[str]:
+    """Names of the members of the sweep declared in the domain."""
+    for i in range(sweep_size(data, domain)):
+        yield f"{domain}/{i}"
+
+
+def list_sweeps(data: Mapping[str, Mapping[str, Any]]) -> list[str]:
+    """Domains declaring sweeps."""
+    return [d for d, dom_data in data.items()
+            if dom_data and (GRID_KEY in dom_data or ZIP_KEY in dom_data)]
@@ -1,3 +1,6 @@
+import threading
+import weakref
+
 
 class Buffer():
     _value : int
@@ -43,3 +46,85 @@ class Buffer():
 
     def clean(self):
         self._buffer = 0
+
+
+class _ShardToken():
+    # Held by the thread-local data only, so it dies with the thread.
+    __slots__ = ("__weakref__",)
+
+
+class ShardedCounter():
+    """An int counter incremented by many threads without a shared lock.
+
+    Each thread adds to its own shard, and the shards are summed on read
+    without a lock. The base value and the shards are replaced together as
+    one tuple (under a lock only taken by writers other than `add`), so a
+    read always sees a consistent pair. Shards of threads which have exited
+    are folded into the base value.
+
+    `set` starts a new generation of shards, so that the shards of the old
+    one are never read again. An `add` racing with `set` either lands before
+    it (and is overwritten) or in the new generation."""
+    _state : tuple[int, tuple[list[int], ...]]
+
+    def __init__(self, value: int = 0):
+        self._state = (value, ()) # base value, shards
+        self._generation = object()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "ShardedInt({} in {} shards)".format(self.value, len(self._state[1]))
+
+    def __int__(self):
+        return self.value
+
+    def __float__(self):
+        return float(self.value)
+
+    def __index__(self):
+        return self.value
+
+    @property
+    def value(self):
+        base, shards = self._state
+        return base + sum(shard[0] for shard in shards)
+
+    def set(self, value: int):
+        with self._lock:
+            self._state = (value, ())
+            self._generation = object()
+
+    def add(self, n: int = 1, /):
+        local = self._local
+        try:
+            shard = local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        else:
+            if local.generation is not self._generation:
+                shard = self._new_shard()
+        shard[0] += n # only this thread writes the shard
+
+    def _new_shard(self) -> list[int]:
+        shard = [0]
+        token = _ShardToken()
+        with self._lock:
+            base, shards = self._state
+            self._state = (base, shards + (shard,))
+            generation = self._generation
+        weakref.finalize(token, _retire_shard, weakref.ref(self), shard)
+        self._local.shard = shard
+        self._local.token = token # the old token dies, retiring the old shard
+        self._local.generation = generation
+        return shard
+
+
+def _retire_shard(ref: "weakref.ref[ShardedCounter]", shard: list[int]):
+    counter = ref()
+    if counter is None:
+        return
+    with counter._lock:
+        base, shards = counter._state
+        if any(s is shard for s in shards): # not of an old generation
+            counter._state = (base + shard[0], tuple(s for s in shards if s is not shard))
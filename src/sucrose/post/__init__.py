@@ -0,0 +1,42 @@
+"""
+Post analysis of the logs of scenarios.
+
+Submodules are imported on first access of their names, so that pandas and
+matplotlib are only loaded when needed.
+"""
+
+import importlib
+
+# public name -> submodule defining it
+_EXPORTS = {
+    "list_event_files": "events",
+    "iter_records": "events",
+    "read_scalar_events": "events",
+    "EventFileCache": "events",
+    "LogDataFrame": "frame",
+    "iter_series": "frame",
+    "downsample": "_downsample",
+    "downsample_indices": "_downsample",
+    "DOWNSAMPLE_METHODS": "_downsample",
+    "group_runs": "aggregate",
+    "aggregate_runs": "aggregate",
+    "plot_evolution": "plot",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    try:
+        module_name = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,159 @@
+
+__all__ = [
+    "downsample",
+    "downsample_indices",
+    "DOWNSAMPLE_METHODS"
+]
+
+from collections.abc import Callable, Mapping
+from typing import Any
+
+import numpy as np
+
+
+def _stride(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    return np.unique(np.linspace(0, len(x) - 1, n).round().astype(np.int64))
+
+
+def _buckets(length: int, num: int) -> tuple[np.ndarray, int]:
+    """Start of `num` equal buckets over `length` points, and the bucket size."""
+    size = -(-length // num)
+    return np.arange(0, length, size, dtype=np.int64), size
+
+
+def _minmax(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    # Keep the minimum and maximum of every bucket, two points per bucket.
+    starts, size = _buckets(len(y), max(1, n // 2))
+    padded = np.empty(len(starts) * size, dtype=np.float64)
+    padded[:len(y)] = y
+    padded[len(y):] = np.nan
+    padded = padded.reshape(len(starts), size)
+    nan = np.isnan(padded)
+    lo = np.argmin(np.where(nan, np.inf, padded), axis=1)
+    hi = np.argmax(np.where(nan, -np.inf, padded), axis=1)
+    selected = np.concatenate([starts + lo, starts + hi, [0, len(y) - 1]])
+    return np.unique(np.minimum(selected, len(y) - 1))
+
+
+def _lttb(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    # Largest-Triangle-Three-Buckets: the first and last points are kept, and
+    # one point from each bucket between them, which forms the largest triangle
+    # with the point selected from the previous bucket and the average of the
+    # next bucket.
+    #
+    # Twice the area of the triangle of (xp, yp), (x, y) and (xn, yn) is
+    # |xp * (y - yn) + yp * (xn - x) + (x * yn - xn * y)|, so all the terms but
+    # the previous point are computed at once, on the buckets padded to the
+    # same size. Only the selection, which depends on the previous one, runs
+    # bucket by bucket.
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    length = len(x)
+    edges = np.linspace(1, length - 1, n - 1).astype(np.int64)
+    counts = np.diff(edges)
+    starts = edges[:-1][counts > 0]
+    counts = counts[counts > 0]
+    x_avg = np.add.reduceat(x, starts) / counts
+    valid = ~np.isnan(y) # NaN are not averaged, and never selected
+    y_avg = (np.add.reduceat(np.where(valid, y, 0.0), starts)
+             / np.maximum(np.add.reduceat(valid, starts), 1))
+    # the "next bucket" of the last bucket is the last point
+    x_next = np.append(x_avg[1:], x[-1])[:, None]
+    y_next = np.append(y_avg[1:], y[-1])[:, None]
+
+    size = int(counts.max())
+    # Padding repeats the last point of the bucket, and NaN are replaced by
+    # the first valid point of the bucket (or its start if there is none).
+    # The first of equal areas is selected, so this does not change the
+    # selection.
+    index = starts[:, None] + np.minimum(np.arange(size), counts[:, None] - 1)
+    if not valid.all():
+        nan = ~valid[index]
+        first = index[np.arange(len(starts)), np.argmin(nan, axis=1)]
+        index = np.where(nan, first[:, None], index)
+    xs, ys = x[index], y[index]
+    terms = np.empty((len(starts), 3, size))
+    np.subtract(ys, y_next, out=terms[:, 0])
+    np.subtract(x_next, xs, out=terms[:, 1])
+    np.multiply(xs, y_next, out=terms[:, 2])
+    terms[:, 2] -= x_next * ys
+    # the next average is NaN only for the last bucket, if the last point is
+    nan_next = np.isnan(y_next[:, 0]).tolist()
+
+    selected = np.empty(len(starts) + 2, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = length - 1
+    prev = 0
+
+    for i, start in enumerate(starts.tolist()):
+        xp, yp = x.item(prev), y.item(prev)
+        if yp != yp or nan_next[i]: # the triangles have no area
+            prev = start
+        else:
+            prev = index.item(i, int(np.abs(np.dot((xp, yp, 1.0), terms[i])).argmax()))
+        selected[i + 1] = prev
+
+    return selected
+
+
+DOWNSAMPLE_METHODS: dict[str, Callable[[np.ndarray, np.ndarray, int], np.ndarray]] = {
+    "lttb": _lttb,
+    "minmax": _minmax,
+    "stride": _stride,
+}
+
+
+def downsample_indices(
+    x: Any,
+    y: Any,
+    max_points: int,
+    method: str = "lttb"
+) -> np.ndarray:
+    """Positions of the points kept when reducing a line to about `max_points`.
+
+    Args:
+        x (ArrayLike): Sorted x values (steps).
+        y (ArrayLike): Values of the same length.
+        max_points (int): The number of points to keep.
+        method (str, optional): One of `"lttb"` (Largest-Triangle-Three-Buckets,
+            keeping the visual shape), `"minmax"` (extremes of every bucket,
+            keeping spikes) and `"stride"` (evenly spaced points).
+            Defaults to `"lttb"`.
+    """
+    try:
+        func = DOWNSAMPLE_METHODS[method]
+    except KeyError:
+        raise ValueError(f"unknown downsampling method {method!r}, "
+                         f"expected one of {sorted(DOWNSAMPLE_METHODS)}") from None
+
+    length = len(x)
+
+    if max_points < 3 or length <= max_points:
+        return np.arange(length)
+
+    return func(np.asarray(x), np.asarray(y, dtype=np.float64), max_points)
+
+
+def downsample(data, max_points: int, method: str = "lttb"):
+    """Downsample every (run, tag) series of the result of `LogDataFrame.load`
+    to about `max_points`, keeping the layout of the result."""
+    if isinstance(data, Mapping):
+        result = {}
+        for key, arrays in data.items():
+            sel = downsample_indices(arrays["step"], arrays["value"], max_points, method)
+            result[key] = {name: np.asarray(col)[sel] for name, col in arrays.items()}
+        return result
+
+    steps = (data.index.get_level_values("step") if data.index.nlevels > 1
+             else data.index).to_numpy()
+    values = data["value"].to_numpy()
+    positions = []
+
+    for _, idx in data.groupby(["run", "tag"], observed=True).indices.items():
+        sel = downsample_indices(steps[idx], values[idx], max_points, method)
+        positions.append(idx[sel])
+
+    if not positions:
+        return data
+
+    return data.iloc[np.sort(np.concatenate(positions))]
@@ -0,0 +1,169 @@
+
+__all__ = [
+    "group_runs",
+    "aggregate_runs"
+]
+
+import re
+import warnings
+from collections.abc import Collection, Iterable, Mapping
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from ..project import Scenario
+from .frame import LogData, iter_series
+
+
+def group_runs(
+    runs: Iterable[str | Scenario],
+    pattern: str | None = None,
+    *,
+    ignore: Collection[str] = ("seed",),
+) -> dict[str, list[str]]:
+    """Group runs that differ only in seeds (or other ignored settings).
+
+    Args:
+        runs (Iterable[str | Scenario]): Names of runs, or Scenario instances.
+        pattern (str | None, optional): A regular expression searched in run
+            names. Runs are grouped by the first group of the match (or the
+            whole match if the pattern has no group), and runs not matching
+            are left alone. If `None`, runs must be scenarios, and are grouped
+            by their resolved configs, without fields named in `ignore`.
+        ignore (Collection[str], optional): Fields (full names, or the names
+            after the last dot) to ignore when grouping by configs.
+            Defaults to `("seed",)`.
+
+    Returns:
+        dict[str, list[str]]: Names of runs in each group. Groups by pattern
+            are named by the matched text, and groups by configs are named by
+            their first run.
+    """
+    groups: dict[Any, list[str]] = {}
+    names: dict[Any, str] = {}
+
+    if pattern is not None:
+        compiled = re.compile(pattern)
+        for run in runs:
+            name = run.NAME if isinstance(run, Scenario) else run
+            match = compiled.search(name)
+            key = name if match is None else match.group(1 if compiled.groups else 0)
+            groups.setdefault(key, []).append(name)
+        return groups
+
+    for run in runs:
+        if not isinstance(run, Scenario):
+            raise TypeError("runs must be Scenario instances to be grouped "
+                            "by configs, or use a pattern")
+        resolved = run.CONFIG.resolve(run.NAME)
+        key = tuple(sorted(
+            (field, repr(value)) for field, value in resolved.items()
+            if field not in ignore and field.rsplit(".", 1)[-1] not in ignore
+        ))
+        names.setdefault(key, run.NAME)
+        groups.setdefault(key, []).append(run.NAME)
+
+    return {names[key]: members for key, members in groups.items()}
+
+
+def _interp_runs(series: list[tuple[np.ndarray, np.ndarray]], grid: np.ndarray) -> np.ndarray:
+    """Interpolate every run on the grid with one `np.interp` call.
+
+    Runs are shifted to disjoint ranges of x and concatenated, so that one
+    interpolation serves all of them. Points outside the steps of a run are NaN.
+    """
+    lo = min(float(x[0]) for x, _ in series)
+    hi = max(float(x[-1]) for x, _ in series)
+    width = hi - lo + 1.0
+    shifts = np.arange(len(series), dtype=np.float64) * width
+
+    xp = np.concatenate([x - lo + shift for (x, _), shift in zip(series, shifts)])
+    fp = np.concatenate([y for _, y in series])
+    query = (grid - lo)[None, :] + shifts[:, None]
+    result = np.interp(query.ravel(), xp, fp).reshape(len(series), len(grid))
+
+    starts = np.array([x[0] for x, _ in series], dtype=np.float64)
+    stops = np.array([x[-1] for x, _ in series], dtype=np.float64)
+    outside = (grid[None, :] < starts[:, None]) | (grid[None, :] > stops[:, None])
+    result[outside] = np.nan
+
+    return result
+
+
+def aggregate_runs(
+    data: LogData,
+    groups: Mapping[str, Collection[str]],
+    *,
+    steps: Any = None,
+    num_steps: int | None = None,
+    quantiles: Collection[float] = (0.25, 0.75),
+) -> DataFrame:
+    """Align the series of runs in each group on a common step grid, and
+    compute the mean, std and quantiles over runs at every step.
+
+    Args:
+        data (LogData): Result of `LogDataFrame.load`, in any layout.
+        groups (Mapping[str, Collection[str]]): Runs in each group, like the
+            result of `group_runs`.
+        steps (ArrayLike, optional): The step grid. If `None`, use `num_steps`
+            evenly spaced steps over all runs of the group, or the steps of its
+            longest run if `num_steps` is also `None`.
+        quantiles (Collection[float], optional): Quantiles to compute, stored
+            in columns like `"q0.25"`. Defaults to `(0.25, 0.75)`.
+
+    Returns:
+        DataFrame: Indexed by step, with columns run (the group name), tag,
+            value (the mean), std, count (runs covering the step) and quantiles.
+            It can be drawn by `plot_evolution(..., band="std")`.
+    """
+    run_group = {run: group for group, runs in groups.items() for run in runs}
+    collected: dict[tuple[str, str], list[tuple[np.ndarray, np.ndarray]]] = {}
+
+    for run, tag, run_steps, columns in iter_series(data):
+        if run not in run_group:
+            continue
+        x = np.asarray(run_steps, dtype=np.float64)
+        y = np.asarray(columns["value"], dtype=np.float64)
+        if len(x) == 0:
+            continue
+        if np.any(x[1:] < x[:-1]):
+            order = np.argsort(x, kind="stable")
+            x, y = x[order], y[order]
+        collected.setdefault((run_group[run], tag), []).append((x, y))
+
+    frames = []
+
+    for (group, tag), series in collected.items():
+        if steps is not None:
+            grid = np.asarray(steps, dtype=np.float64)
+        elif num_steps is not None:
+            grid = np.linspace(min(x[0] for x, _ in series),
+                               max(x[-1] for x, _ in series), num_steps)
+        else:
+            grid = max(series, key=lambda s: len(s[0]))[0]
+
+        values = _interp_runs(series, grid)
+
+        with warnings.catch_warnings(): # steps not covered by any run
+            warnings.simplefilter("ignore", RuntimeWarning)
+            columns = {
+                "value": np.nanmean(values, axis=0),
+                "std": np.nanstd(values, axis=0),
+                "count": np.sum(~np.isnan(values), axis=0),
+            }
+            if quantiles:
+                qs = np.nanquantile(values, list(quantiles), axis=0)
+                for q, row in zip(quantiles, qs):
+                    columns[f"q{q:g}"] = row
+
+        frame = pd.DataFrame(columns, index=pd.Index(grid, name="step"))
+        frame["run"] = group
+        frame["tag"] = tag
+        frames.append(frame)
+
+    if not frames:
+        raise ValueError("No series found for the runs in groups")
+
+    return pd.concat(frames)
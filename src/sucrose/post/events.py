@@ -0,0 +1,451 @@
+
+__all__ = [
+    "list_event_files",
+    "iter_records",
+    "read_scalar_events",
+    "EventFileCache"
+]
+
+import os, struct
+from collections.abc import Collection, Iterator
+
+import numpy as np
+
+_HEADER = struct.Struct("<QI") # record length, masked crc of the length
+_FOOTER_SIZE = 4 # masked crc of the data
+_READ_BUFFER = 1 << 20
+
+# step (int64), value (float64), wall_time (float64) of one tag
+ScalarArrays = tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def list_event_files(log_dir: str) -> list[str]:
+    """TensorBoard event files directly under the log directory, in the order
+    they were written. The same files as read by TensorBoard's
+    `EventAccumulator`, without the empty `.profile-empty` files."""
+    if not os.path.isdir(log_dir):
+        return []
+
+    with os.scandir(log_dir) as it:
+        names = sorted(e.name for e in it if e.is_file() and "tfevents" in e.name
+                       and not e.name.endswith(".profile-empty"))
+
+    return [os.path.join(log_dir, name) for name in names]
+
+
+def iter_records(path: str, offset: int = 0) -> Iterator[tuple[bytes, int]]:
+    """Iterate over the TFRecord framed records of a file from `offset`,
+    yielding each record and the offset just after it.
+    A truncated record at the end (still being written) stops the iteration.
+    Checksums are not verified."""
+    with open(path, "rb", buffering=_READ_BUFFER) as f:
+        f.seek(offset)
+
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            length, _ = _HEADER.unpack(header)
+            data = f.read(length)
+            footer = f.read(_FOOTER_SIZE)
+            if len(data) < length or len(footer) < _FOOTER_SIZE:
+                return
+            offset += _HEADER.size + length + _FOOTER_SIZE
+            yield data, offset
+
+
+### Protocol buffers
+
+# A minimal decoder of the fields of `tensorboard.Event` holding scalars:
+#   Event: wall_time = 1 (double), step = 2 (int64), file_version = 3,
+#       summary = 5, session_log = 7
+#   SessionLog: status = 1 (START = 1)
+#   Summary: value = 1 (repeated)
+#   Summary.Value: tag = 1, simple_value = 2 (float), tensor = 8
+#   TensorProto: dtype = 1, tensor_content = 4, float_val = 5,
+#       double_val = 6, int_val = 7, int64_val = 10, half_val = 13
+
+_DOUBLE = struct.Struct("<d")
+_FLOAT = struct.Struct("<f")
+
+# TensorFlow DataType -> (struct format of tensor_content, field of the value)
+_TENSOR_DTYPES = {
+    1: ("<f", 5),  # DT_FLOAT
+    2: ("<d", 6),  # DT_DOUBLE
+    3: ("<i", 7),  # DT_INT32
+    9: ("<q", 10), # DT_INT64
+    19: ("<e", 13), # DT_HALF
+}
+
+
+def _varint(buf: bytes, pos: int) -> tuple[int, int]:
+    result = 0
+    shift = 0
+
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _skip(buf: bytes, pos: int, wire_type: int) -> int:
+    if wire_type == 0:
+        return _varint(buf, pos)[1]
+    if wire_type == 1:
+        return pos + 8
+    if wire_type == 2:
+        length, pos = _varint(buf, pos)
+        return pos + length
+    if wire_type == 5:
+        return pos + 4
+    raise ValueError(f"unsupported wire type {wire_type}")
+
+
+def _fields(buf: bytes, start: int, end: int) -> Iterator[tuple[int, int, int, int]]:
+    """Yield number, wire type, start and end of fields in buf[start:end].
+    For length-delimited fields, the range is of the content."""
+    pos = start
+
+    while pos < end:
+        key, pos = _varint(buf, pos)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == 2:
+            length, pos = _varint(buf, pos)
+            yield number, wire_type, pos, pos + length
+            pos += length
+        else:
+            field_end = _skip(buf, pos, wire_type)
+            yield number, wire_type, pos, field_end
+            pos = field_end
+
+
+def _tensor_scalar(buf: bytes, start: int, end: int) -> float | None:
+    dtype = 0
+    content = None
+    values: dict[int, tuple[int, int, int]] = {}
+
+    for number, wire_type, s, e in _fields(buf, start, end):
+        if number == 1:
+            dtype = _varint(buf, s)[0]
+        elif number == 4:
+            content = (s, e)
+        else:
+            values[number] = (wire_type, s, e)
+
+    if dtype not in _TENSOR_DTYPES:
+        return None
+
+    fmt, number = _TENSOR_DTYPES[dtype]
+    size = struct.calcsize(fmt)
+
+    if content is not None:
+        if content[1] - content[0] != size:
+            return None
+        return float(struct.unpack_from(fmt, buf, content[0])[0])
+
+    if number not in values:
+        return None
+
+    wire_type, s, e = values[number]
+
+    if number in (5, 6): # packed or single float/double
+        if e - s != size:
+            return None
+        return float(struct.unpack_from(fmt, buf, s)[0])
+
+    value, pos = _varint(buf, s) # int/int64/half bits, packed or single
+    if pos != e:
+        return None
+    if number == 13:
+        return float(struct.unpack("<e", value.to_bytes(2, "little"))[0])
+    if value >= 1 << 63:
+        value -= 1 << 64
+    return float(value)
+
+
+def _decode_event(record: bytes) -> tuple[float, int, tuple[int, int] | None, float | None, bool]:
+    """Wall time, step, range of the summary, file version (if any) of an
+    event, and whether it is the start of a session (a restart of the writer)."""
+    wall_time = 0.0
+    step = 0
+    summary = None
+    version = None
+    start = False
+    pos = 0
+    end = len(record)
+
+    while pos < end:
+        key = record[pos]
+        if key == 0x09: # wall_time, double
+            wall_time = _DOUBLE.unpack_from(record, pos + 1)[0]
+            pos += 9
+        elif key == 0x10: # step, varint
+            step, pos = _varint(record, pos + 1)
+            if step >= 1 << 63:
+                step -= 1 << 64
+        elif key == 0x1A: # file_version, like "brain.Event:2"
+            length, pos = _varint(record, pos + 1)
+            try:
+                version = float(record[pos:pos + length].split(b":")[-1])
+            except ValueError:
+                version = -1.0
+            pos += length
+        elif key == 0x2A: # summary, length-delimited
+            length, pos = _varint(record, pos + 1)
+            summary = (pos, pos + length)
+            pos += length
+        elif key == 0x3A: # session_log, length-delimited
+            length, pos = _varint(record, pos + 1)
+            for number, wire_type, s, _ in _fields(record, pos, pos + length):
+                if number == 1 and wire_type == 0 and _varint(record, s)[0] == 1:
+                    start = True
+            pos += length
+        else:
+            key, pos = _varint(record, pos)
+            pos = _skip(record, pos, key & 7)
+
+    return wall_time, step, summary, version, start
+
+
+def _decode_scalars(record: bytes, summary: tuple[int, int], tags: Collection[str]):
+    """Yield tag and value of the scalars of wanted tags in the summary."""
+    for number, _, vs, ve in _fields(record, *summary):
+        if number != 1:
+            continue
+
+        tag = None
+        value = None
+
+        for field, wire_type, s, e in _fields(record, vs, ve):
+            if field == 1:
+                tag = record[s:e].decode("utf-8")
+                if tag not in tags:
+                    break
+            elif field == 2 and wire_type == 5:
+                value = _FLOAT.unpack_from(record, s)[0]
+            elif field == 8 and wire_type == 2:
+                value = _tensor_scalar(record, s, e)
+
+        if tag in tags and value is not None:
+            yield tag, value
+
+
+class _Column():
+    """Growable preallocated arrays of step, value and wall_time."""
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.steps = np.empty(capacity, dtype=np.int64)
+        self.values = np.empty(capacity, dtype=np.float64)
+        self.walls = np.empty(capacity, dtype=np.float64)
+
+    def append(self, step: int, value: float, wall_time: float):
+        if self.size == len(self.steps):
+            capacity = 2 * len(self.steps)
+            self.steps = np.resize(self.steps, capacity)
+            self.values = np.resize(self.values, capacity)
+            self.walls = np.resize(self.walls, capacity)
+
+        i = self.size
+        self.steps[i] = step
+        self.values[i] = value
+        self.walls[i] = wall_time
+        self.size = i + 1
+
+    def arrays(self) -> ScalarArrays:
+        n = self.size
+        return self.steps[:n].copy(), self.values[:n].copy(), self.walls[:n].copy()
+
+
+### Orphaned scalars
+
+# Like TensorBoard, scalars orphaned by a restart of the writer are purged:
+# when a writer restarts from step T (e.g. from a checkpoint after a crash),
+# the scalars read before with a step at or after T are dropped.
+# A restart is a SessionLog.START event in files of version 2 or later, like
+# those written by `SummaryWriter(purge_step=T)`, or a summary with a step
+# before the last one in older files, which drops the scalars of its tags.
+
+
+class EventState():
+    """What is needed to purge orphaned scalars of an event file, kept to
+    continue reading the file when it grows."""
+    __slots__ = ("version", "last_step", "first", "counts", "restarts")
+
+    def __init__(self):
+        self.version: float | None = None
+        # Step of the last event, in files without a version
+        self.last_step: int | None = None
+        # Step and wanted tags of the first summary, if it is out of order
+        # with the previous file of the directory (files without a version)
+        self.first: tuple[int, frozenset[str]] | None = None
+        # Number of scalars of each tag read from the file
+        self.counts: dict[str, int] = {}
+        # Step, tags (all if `None`) and counts of scalars before each restart
+        self.restarts: list[tuple[int, frozenset[str] | None, dict[str, int]]] = []
+
+
+def _read_events(
+    path: str,
+    tags: Collection[str],
+    offset: int = 0,
+    state: EventState | None = None
+) -> tuple[int, dict[str, ScalarArrays], EventState]:
+    """Read scalar events of the given tags from an event file, starting at
+    the byte `offset`, and the restarts found along, continuing `state`."""
+    tags = frozenset(tags)
+    tag_bytes = [t.encode("utf-8") for t in tags]
+    state = EventState() if state is None else state
+    columns: dict[str, _Column] = {}
+    end = offset
+
+    for record, end in iter_records(path, offset):
+        wall_time, step, summary, version, start = _decode_event(record)
+
+        if version is not None:
+            state.version = version
+
+        scalars = ()
+        # Records without any wanted tag are skipped by a substring search.
+        if summary is not None and any(t in record for t in tag_bytes):
+            scalars = list(_decode_scalars(record, summary, tags))
+
+        if state.version is not None and state.version >= 2:
+            restart = (step, None) if start else None
+        elif summary is not None and state.last_step is not None and step < state.last_step:
+            restart = (step, frozenset(tag for tag, _ in scalars)) if scalars else None
+        else:
+            if state.last_step is None and summary is not None:
+                state.first = (step, frozenset(tag for tag, _ in scalars))
+            restart = None
+            state.last_step = step
+
+        if restart is not None:
+            counts = {tag: state.counts.get(tag, 0) + column.size
+                      for tag, column in columns.items()}
+            state.restarts.append((*restart, {**state.counts, **counts}))
+
+        for tag, value in scalars:
+            try:
+                column = columns[tag]
+            except KeyError:
+                column = columns[tag] = _Column()
+            column.append(step, value, wall_time)
+
+    for tag, column in columns.items():
+        state.counts[tag] = state.counts.get(tag, 0) + column.size
+
+    return end, {tag: column.arrays() for tag, column in columns.items()}, state
+
+
+def _purge(arrays: ScalarArrays, restarts: list[tuple[int, int]]) -> ScalarArrays:
+    """Drop the scalars orphaned by restarts, given as the number of scalars
+    before the restart and its step, in order."""
+    if not restarts:
+        return arrays
+
+    steps = arrays[0]
+    positions, bounds = (np.array(col, dtype=np.int64) for col in zip(*restarts))
+    # The lowest step of restarts after each scalar
+    bounds = np.append(np.minimum.accumulate(bounds[::-1])[::-1], np.iinfo(np.int64).max)
+    after = np.searchsorted(positions, np.arange(len(steps)), side="right")
+    keep = steps < bounds[after]
+
+    if keep.all():
+        return arrays
+    return tuple(col[keep] for col in arrays)
+
+
+def _merge_event_files(columns: list[dict[str, ScalarArrays]], states: list[EventState],
+                      tag: str) -> ScalarArrays | None:
+    """Scalars of a tag in the event files of a directory, in order, without
+    those orphaned by restarts of the writer in the same or later files.
+    `None` if the tag is not found."""
+    found = []
+    restarts = []
+    size = 0
+    last_step = None
+
+    for cols, state in zip(columns, states):
+        if state.first is not None and last_step is not None:
+            step, first_tags = state.first
+            if step < last_step and tag in first_tags:
+                restarts.append((size, step))
+        for step, restart_tags, counts in state.restarts:
+            if restart_tags is None or tag in restart_tags:
+                restarts.append((size + counts.get(tag, 0), step))
+        if tag in cols:
+            found.append(cols[tag])
+            size += len(cols[tag][0])
+        if state.last_step is not None:
+            last_step = state.last_step
+
+    if not found:
+        return None
+    if len(found) == 1:
+        arrays = found[0]
+    else:
+        arrays = tuple(np.concatenate(cols) for cols in zip(*found))
+    return _purge(arrays, restarts)
+
+
+def read_scalar_events(
+    path: str,
+    tags: Collection[str],
+    offset: int = 0
+) -> tuple[int, dict[str, ScalarArrays]]:
+    """Read scalar events of the given tags from an event file, starting at
+    the byte `offset`.
+
+    Records are streamed from the file and decoded without TensorBoard.
+    Values of other tags are skipped without being decoded. Scalars orphaned
+    by a restart of the writer in the file are dropped, as by TensorBoard.
+
+    Returns:
+        tuple[int, dict]: The offset after the last complete record, and
+            arrays of step, value and wall_time for each tag found.
+    """
+    end, columns, state = _read_events(path, tags, offset)
+    columns = {tag: _merge_event_files([columns], [state], tag) for tag in columns}
+    return end, columns
+
+
+class EventFileCache():
+    """Scalars already read from an event file, and the byte offset to
+    continue reading from when the file grows."""
+    def __init__(self, path: str, tags: Collection[str]):
+        self.path = path
+        self.tags = frozenset(tags)
+        self.offset = 0
+        self.columns: dict[str, ScalarArrays] = {}
+        self.state: EventState | None = None # of event files only
+
+    def covers(self, tags: Collection[str]) -> bool:
+        return self.tags.issuperset(tags)
+
+    def outdated(self) -> bool:
+        """Whether there may be new records since the last read."""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return False
+
+        if size < self.offset: # rewritten, read from the beginning
+            self.offset = 0
+            self.columns = {}
+            self.state = None
+
+        return size != self.offset
+
+    def update(self, offset: int, columns: dict[str, ScalarArrays],
+               state: EventState | None = None):
+        for tag, arrays in columns.items():
+            if tag in self.columns:
+                arrays = tuple(np.concatenate([old, new])
+                               for old, new in zip(self.columns[tag], arrays))
+            self.columns[tag] = arrays
+
+        self.offset = offset
+        self.state = state
@@ -0,0 +1,204 @@
+
+__all__ = [
+    "LogDataFrame",
+    "iter_series"
+]
+
+import os
+from collections.abc import Iterator, Mapping
+from typing import Any, overload
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from ..project import Scenario
+from ..project.logs import SCALAR_LOG_EXT, list_scalar_logs, read_scalar_log
+from ..sucrose_logger import logger
+from .events import EventFileCache, ScalarArrays, list_event_files
+from .events import _merge_event_files, _read_events
+
+# Results of `LogDataFrame.load` in any layout
+LogData = DataFrame | Mapping[tuple[str, str], Mapping[str, Any]]
+
+# Scalars read from every event file in this process, so that loading again
+# only reads the events appended since the last load.
+_EVENT_CACHE: dict[str, EventFileCache] = {}
+
+
+class LogDataFrame:
+    """Log loader for scenarios with the given tags."""
+    @overload
+    def __init__(self, work_dir: str, *, runs: list[str], tags: list[str], meta_domain: str = "workspace"): ...
+    @overload
+    def __init__(self, *, runs: list[Scenario], tags: list[str], meta_domain: str = "workspace"): ...
+    def __init__(self, work_dir=None, *, runs: list, tags: list[str], meta_domain: str = "workspace"):
+        """
+        Log loader for scenarios with the given tags.
+
+        Args:
+            work_dir (str, optional): The directory where the scenarios are located.
+            runs (list[str] | list[Scenario]): The names of the scenarios to load.
+                A list of Scenario instances can be used when work_dir is not specified.
+            tags (list[str]): The tags of the scenarios to load.
+        """
+        if work_dir is None:
+            if not all(isinstance(r, Scenario) for r in runs):
+                raise ValueError("runs must be a list of Scenario instances "
+                                 "when work_dir is not specified")
+            self._scenarios = runs
+        else:
+            if not all(isinstance(r, str) for r in runs):
+                raise ValueError("runs must be a list of strings "
+                                 "when work_dir is specified")
+            kwargs = {"meta_domain": meta_domain}
+            self._scenarios = [Scenario(work_dir, r, **kwargs) for r in runs]
+
+        self._tags = tags
+
+    def load(
+        self,
+        *,
+        workers: int | None = None,
+        layout: str = "default"
+    ) -> DataFrame | dict[tuple[str, str], dict[str, np.ndarray]]:
+        """Load scalars of the tags from all runs.
+
+        Both TensorBoard event files and scalar logs written by
+        `Scenario.start_scalar_logger` are read, in parallel on a process pool.
+        Events read before are cached in the process, and only the new events
+        are read when the files grow. As by TensorBoard, scalars of event files
+        orphaned by a restart of the writer at an earlier step are dropped.
+
+        Args:
+            workers (int | None, optional): Number of worker processes. Use one
+                for each event file to read (up to the number of CPUs) if `None`,
+                and read in this process if `1`. Defaults to `None`.
+            layout (str, optional): The layout of the result, one of
+                - `"default"`: a DataFrame indexed by step, with columns value,
+                  wall_time, run and tag.
+                - `"compact"`: a DataFrame indexed by (run, tag, step), with
+                  categorical run and tag levels, float32 values and float64 wall_time.
+                - `"arrays"`: a dict from (run, tag) to a dict of numpy arrays
+                  of step, value and wall_time.
+                Defaults to `"default"`.
+        """
+        if layout not in ("default", "compact", "arrays"):
+            raise ValueError(f"unknown layout {layout!r}, expected "
+                             "'default', 'compact' or 'arrays'")
+
+        runs: list[tuple[str, list[EventFileCache], list[EventFileCache]]] = []
+        pending: list[EventFileCache] = []
+
+        for sc in self._scenarios:
+            event_caches = []
+            log_caches = []
+            for path in list_event_files(sc.LOGS_DIR) + list_scalar_logs(sc.LOGS_DIR):
+                cache = _EVENT_CACHE.get(path)
+                if cache is None or not cache.covers(self._tags):
+                    tags = set(self._tags).union(cache.tags if cache else ())
+                    cache = _EVENT_CACHE[path] = EventFileCache(path, tags)
+                if cache.outdated():
+                    pending.append(cache)
+                if path.endswith(SCALAR_LOG_EXT):
+                    log_caches.append(cache)
+                else:
+                    event_caches.append(cache)
+            runs.append((sc.NAME, event_caches, log_caches))
+
+        _update_caches(pending, workers)
+        series: dict[tuple[str, str], ScalarArrays] = {}
+
+        for name, event_caches, log_caches in runs:
+            for tag in self._tags:
+                # Restarts in event files do not apply to scalar logs.
+                events = _merge_event_files([c.columns for c in event_caches],
+                                            [c.state for c in event_caches], tag)
+                found = [] if events is None else [events]
+                found += [c.columns[tag] for c in log_caches if tag in c.columns]
+                if not found:
+                    logger.warning(f"No tag named {tag!r} in {name!r}")
+                    continue
+                if len(found) == 1:
+                    series[(name, tag)] = found[0]
+                else:
+                    series[(name, tag)] = tuple(np.concatenate(cols) for cols in zip(*found))
+
+        if layout == "arrays":
+            return {key: {"step": s, "value": v, "wall_time": w}
+                    for key, (s, v, w) in series.items()}
+
+        return _series_to_frame(series, compact=(layout == "compact"))
+
+
+def _series_to_frame(series: dict[tuple[str, str], ScalarArrays], compact: bool) -> DataFrame:
+    """Build a frame of all series with one allocation for every column."""
+    if not series:
+        raise ValueError("No scalars to load")
+
+    keys = list(series)
+    lengths = np.array([len(s[0]) for s in series.values()], dtype=np.int64)
+    steps, values, walls = (np.concatenate(cols) for cols in zip(*series.values()))
+    runs = sorted({k[0] for k in keys})
+    tags = sorted({k[1] for k in keys})
+    run_ids = {name: i for i, name in enumerate(runs)}
+    tag_ids = {name: i for i, name in enumerate(tags)}
+    run_codes = np.repeat([run_ids[k[0]] for k in keys], lengths)
+    tag_codes = np.repeat([tag_ids[k[1]] for k in keys], lengths)
+
+    if compact:
+        index = pd.MultiIndex.from_arrays([
+            pd.Categorical.from_codes(run_codes, runs),
+            pd.Categorical.from_codes(tag_codes, tags),
+            steps,
+        ], names=["run", "tag", "step"])
+        return pd.DataFrame({
+            "value": values.astype(np.float32),
+            "wall_time": walls,
+        }, index=index)
+
+    return pd.DataFrame({
+        "value": values,
+        "wall_time": walls,
+        "run": np.array(runs, dtype=object)[run_codes],
+        "tag": np.array(tags, dtype=object)[tag_codes],
+    }, index=pd.Index(steps, name="step"))
+
+
+def _read_scalars(path: str, tags, offset: int, state):
+    if path.endswith(SCALAR_LOG_EXT):
+        return (*read_scalar_log(path, tags, offset), None)
+    return _read_events(path, tags, offset, state)
+
+
+def _update_caches(caches: list[EventFileCache], workers: int | None):
+    if workers is None:
+        workers = min(len(caches), os.cpu_count() or 1)
+
+    tasks = [(c.path, c.tags, c.offset, c.state) for c in caches]
+
+    if workers <= 1 or len(tasks) <= 1:
+        results = [_read_scalars(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(_read_scalars, *zip(*tasks)))
+
+    for cache, (offset, columns, state) in zip(caches, results):
+        cache.update(offset, columns, state)
+
+
+def iter_series(data: LogData) -> Iterator[tuple[str, str, Any, Any]]:
+    """Iterate over each (run, tag) series in the result of `LogDataFrame.load`,
+    yielding run, tag, steps, and the columns (like value) of the series."""
+    if isinstance(data, Mapping):
+        for run, tag in sorted(data):
+            arrays = data[(run, tag)]
+            yield run, tag, arrays["step"], arrays
+        return
+
+    for (run, tag), g in data.groupby(["run", "tag"], observed=True):
+        if "step" in g.index.names and g.index.nlevels > 1:
+            steps = g.index.get_level_values("step")
+        else:
+            steps = g.index
+        yield run, tag, steps, g
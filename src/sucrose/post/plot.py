@@ -0,0 +1,95 @@
+
+__all__ = ["plot_evolution"]
+
+import numpy as np
+from pandas import DataFrame
+import matplotlib.pyplot as plt
+from matplotlib.pyplot import Axes
+from matplotlib.lines import Line2D
+
+from ._downsample import downsample_indices
+from .frame import LogData, iter_series
+
+
+def plot_evolution(
+    df: LogData,
+    axes: Axes | None = None,
+    fmts: dict[tuple[str, str], str] | list[str] | None = None,
+    *,
+    xlabel: str | None = None,
+    ylabel: str | None = None,
+    log_scale: str = "auto",
+    legend_fmt: str = "{run} - {tag}",
+    downsample: str | None = None,
+    max_points: int | None = None,
+    band: str | tuple[str, str] | None = None,
+    band_alpha: float = 0.2,
+) -> list[Line2D]:
+    """Plot every (run, tag) series of the result of `LogDataFrame.load`.
+
+    Long series can be downsampled before plotting by `downsample`, the name
+    of a method in `DOWNSAMPLE_METHODS` (`"lttb"`, `"minmax"` or `"stride"`).
+    Each line is reduced to `max_points`, or twice the pixel width of the axes
+    if `None`.
+
+    A shaded band is drawn around each line by `band`: `"std"` for one standard
+    deviation around the value, or the names of the lower and upper columns,
+    like `("q0.25", "q0.75")` of the result of `aggregate_runs`.
+    """
+    lines: list[Line2D] = []
+    cursor = 0
+
+    if axes is None:
+        axes = plt.gca()
+
+    if downsample is not None and max_points is None:
+        max_points = 2 * max(1, int(axes.get_window_extent().width))
+
+    for run, tag, steps, columns in iter_series(df):
+        values = columns["value"]
+        bounds = None
+
+        if band is not None:
+            if band == "std":
+                std = np.asarray(columns["std"])
+                bounds = np.asarray(values) - std, np.asarray(values) + std
+            else:
+                bounds = np.asarray(columns[band[0]]), np.asarray(columns[band[1]])
+
+        if downsample is not None:
+            steps, values = np.asarray(steps), np.asarray(values)
+            sel = downsample_indices(steps, values, max_points, downsample)
+            steps, values = steps[sel], values[sel]
+            if bounds is not None:
+                bounds = bounds[0][sel], bounds[1][sel]
+
+        if isinstance(fmts, list) and cursor < len(fmts):
+            args = steps, values, fmts[cursor]
+        elif isinstance(fmts, dict) and (run, tag) in fmts:
+            args = steps, values, fmts[(run, tag)]
+        else:
+            args = steps, values
+
+        line = axes.plot(*args, label=legend_fmt.format(run=run, tag=tag))
+        lines.append(line)
+
+        if bounds is not None:
+            axes.fill_between(steps, *bounds, color=line[0].get_color(),
+                              alpha=band_alpha, linewidth=0)
+        cursor += 1
+
+    if xlabel is None:
+        xlabel = df.index.name if isinstance(df, DataFrame) and df.index.name else "step"
+    ylabel = "value" if ylabel is None else ylabel
+    axes.set_xlabel(xlabel)
+    axes.set_ylabel(ylabel)
+
+    if log_scale in ("auto", "AUTO", "Auto"):
+        pass # TODO: decide log scale automatically
+    else:
+        if "y" in log_scale or "Y" in log_scale:
+            axes.set_yscale("log")
+        if "x" in log_scale or "X" in log_scale:
+            axes.set_xscale("log")
+
+    return lines
@@ -1,2 +1,9 @@
 
-from .scenario import *
\ No newline at end of file
+from .scenario import *
+from .formats import *
+from .metrics import *
+from .instrument import *
+from .schedule import *
+from .distributed import *
+from .compress import *
+from .storage import *
@@ -2,30 +2,371 @@
 __all__ = [
     'load_state_dict_impl',
     'save_state_dict_impl',
+    'snapshot_state_dict',
+    'CheckpointWriter',
+    'iter_state_dicts',
     'SupportsStateDict'
 ]
 
-import os
+import os, sys, copy, json
+import shutil, tempfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections.abc import Callable, Collection, Iterator, Sequence
 from typing import Any, Protocol, runtime_checkable
 
+from .formats import CkptFormat, get_format
+from .compress import (
+    MAGIC, Compression, decompress_bytes, decompressed_size, is_compressed, read_compressed
+)
+from .storage import Storage, LocalStorage
+from .._fsutil import atomic_path, atomic_write
 
-def _save_pt_file(ckpts_dir: str, file_name: str, data: dict[str, Any]):
-    from torch import save
-    os.makedirs(ckpts_dir, exist_ok=True)
-    file_name = os.path.join(ckpts_dir, file_name)
-    save(data, file_name)
+_LOCAL = LocalStorage()
 
 
-def _load_pt_file(ckpts_dir: str, file_name: str, **loader_kwds):
-    from torch import load
-    file_name = os.path.join(ckpts_dir, file_name)
+def _save_stream(fmt: CkptFormat, f, data: dict[str, Any], compression: Compression | None):
+    if compression is None:
+        fmt.save(f, data)
+    else:
+        writer = compression.writer(f)
+        fmt.save(writer, data)
+        writer.close()
+
+
+def _write(fmt: CkptFormat, path: str, data: dict[str, Any],
+           compression: Compression | None = None):
+    if fmt.directory:
+        os.makedirs(path, exist_ok=True)
+        fmt.save(path, data)
+    else:
+        with open(path, 'wb') as f:
+            _save_stream(fmt, f, data, compression)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _read(fmt: CkptFormat, path: str, **loader_kwds):
+    # Compressed files are detected by their magic, whatever the config says.
+    if not fmt.directory and is_compressed(path):
+        return fmt.load_bytes(read_compressed(path), **loader_kwds)
+    return fmt.load(path, **loader_kwds)
+
+
+### Object storages
+
+# Checkpoints in storages without local paths are written object by object.
+# A checkpoint directory becomes objects under the key of the checkpoint,
+# and the index of sharded checkpoints is written last.
+
+def _put(storage: Storage, key: str, fmt: CkptFormat, data: dict[str, Any],
+         compression: Compression | None) -> list[str]:
+    # Write a checkpoint (or shard) and return the keys written under `key`.
+    if not fmt.directory:
+        with storage.writer(key) as f:
+            _save_stream(fmt, f, data, compression)
+        return []
+
+    tmp_name = tempfile.mkdtemp(prefix="sucrose-")
+    try:
+        fmt.save(tmp_name, data)
+        rels = sorted(os.path.relpath(os.path.join(root, name), tmp_name).replace(os.sep, "/")
+                      for root, _, names in os.walk(tmp_name) for name in names)
+        for rel in rels:
+            storage.upload(os.path.join(tmp_name, rel), storage.join(key, rel))
+        return rels
+    finally:
+        shutil.rmtree(tmp_name, ignore_errors=True)
+
+
+def _get(storage: Storage, key: str, fmt: CkptFormat, **loader_kwds):
+    if not fmt.directory:
+        try:
+            data = storage.read(key)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"No checkpoint exists at {key}") from None
+        if data[:len(MAGIC)] == MAGIC:
+            data = decompress_bytes(data, key)
+        return fmt.load_bytes(data, **loader_kwds)
+
+    # Memory-mapped files can be removed on POSIX systems.
+    tmp_name = tempfile.mkdtemp(prefix="sucrose-")
+    try:
+        storage.download(key, tmp_name)
+        return fmt.load(tmp_name, **loader_kwds)
+    finally:
+        shutil.rmtree(tmp_name, ignore_errors=True)
+
+
+def _save_object(
+    storage: Storage,
+    ckpts_dir: str,
+    file_name: str,
+    data: dict[str, Any],
+    layout: str,
+    shard_size: int | None,
+    compression: Compression | None
+):
+    ext = os.path.splitext(file_name)[1]
+    fmt = get_format(ext)
+    key = storage.join(ckpts_dir, file_name)
+    old = storage.list(key) # objects of a checkpoint saved before with the name
 
-    if os.path.exists(file_name):
-        data_loaded = load(file_name, **loader_kwds)
-        return data_loaded
+    if layout == "sharded":
+        written = _save_shards(key, data, ext, shard_size, compression, storage)
+    elif layout == "file":
+        written = _put(storage, key, fmt, data, compression)
     else:
+        raise ValueError(f"unknown checkpoint layout {layout!r}, "
+                         "expected 'file' or 'sharded'")
+
+    for rel in set(old).difference(written):
+        storage.delete(storage.join(key, rel))
+
+
+def _save_file(
+    ckpts_dir: str,
+    file_name: str,
+    data: dict[str, Any],
+    layout: str = "file",
+    shard_size: int | None = None,
+    compression: Compression | None = None,
+    storage: Storage | None = None
+):
+    ext = os.path.splitext(file_name)[1]
+    fmt = get_format(ext)
+    if compression is not None and fmt.directory:
+        raise ValueError(f"checkpoint format {ext!r} writes directories, "
+                         "which can not be compressed")
+
+    storage = storage or _LOCAL
+    local_dir = storage.local_path(ckpts_dir)
+    if local_dir is None:
+        return _save_object(storage, ckpts_dir, file_name, data,
+                            layout, shard_size, compression)
+
+    file_name = os.path.join(local_dir, file_name)
+    if layout == "sharded":
+        with atomic_path(file_name, directory=True) as tmp_name:
+            _save_shards(tmp_name, data, ext, shard_size, compression)
+    elif layout == "file":
+        if fmt.directory:
+            with atomic_path(file_name, directory=True) as tmp_name:
+                fmt.save(tmp_name, data)
+        else:
+            atomic_write(file_name, lambda f: _save_stream(fmt, f, data, compression),
+                         fsync=True)
+    else:
+        raise ValueError(f"unknown checkpoint layout {layout!r}, "
+                         "expected 'file' or 'sharded'")
+
+
+def _load_file(
+    ckpts_dir: str,
+    file_name: str,
+    keys: Collection[str] | None = None,
+    storage: Storage | None = None,
+    **loader_kwds
+):
+    ext = os.path.splitext(file_name)[1]
+    fmt = get_format(ext)
+    storage = storage or _LOCAL
+    local_dir = storage.local_path(ckpts_dir)
+
+    if local_dir is None:
+        key = storage.join(ckpts_dir, file_name)
+        if SHARD_INDEX in storage.list(key):
+            return _load_shards(key, keys, storage, **loader_kwds)
+        if fmt.directory and not storage.exists(key):
+            raise FileNotFoundError(f"No checkpoint exists at {key}")
+        return _get(storage, key, fmt, **loader_kwds)
+
+    file_name = os.path.join(local_dir, file_name)
+
+    if not os.path.exists(file_name):
         raise FileNotFoundError(f"No checkpoint exists at {file_name}")
 
+    if os.path.exists(os.path.join(file_name, SHARD_INDEX)):
+        return _load_shards(file_name, keys, **loader_kwds)
+
+    return _read(fmt, file_name, **loader_kwds)
+
+
+### Sharded layout
+
+# A sharded checkpoint is a directory holding one file (shard) for each
+# top-level entry, and an index recording the files of every entry.
+# Entries larger than the shard size are split into several shards, each
+# holding a part of the nested dicts.
+
+SHARD_INDEX = "index.json"
+
+
+def _nbytes(obj: Any) -> int:
+    if hasattr(obj, "element_size") and hasattr(obj, "nelement"): # torch.Tensor
+        return obj.element_size() * obj.nelement()
+    if hasattr(obj, "nbytes") and hasattr(obj, "dtype"): # numpy.ndarray
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sum(_nbytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_nbytes(v) for v in obj)
+    return 0
+
+
+def _partial_dict(obj: dict, items: dict) -> dict:
+    part = copy.copy(obj) # keeps the dict type and attributes like `_metadata`
+    part.clear()
+    part.update(items)
+    return part
+
+
+def _split_entry(obj: Any, shard_size: int | None) -> list[Any]:
+    if shard_size is None or not isinstance(obj, dict) or _nbytes(obj) <= shard_size:
+        return [obj]
+
+    parts = []
+    current: dict = {}
+    current_size = 0
+
+    for key, value in obj.items():
+        size = _nbytes(value)
+
+        if size > shard_size and isinstance(value, dict):
+            if current:
+                parts.append(_partial_dict(obj, current))
+                current, current_size = {}, 0
+            for sub in _split_entry(value, shard_size):
+                parts.append(_partial_dict(obj, {key: sub}))
+            continue
+
+        if current and current_size + size > shard_size:
+            parts.append(_partial_dict(obj, current))
+            current, current_size = {}, 0
+
+        current[key] = value
+        current_size += size
+
+    if current:
+        parts.append(_partial_dict(obj, current))
+
+    return parts
+
+
+def _merge_parts(dst: dict, src: dict):
+    for key, value in src.items():
+        if key in dst and isinstance(dst[key], dict) and isinstance(value, dict):
+            _merge_parts(dst[key], value)
+        else:
+            dst[key] = value
+
+
+def _num_workers(num_tasks: int) -> int:
+    return max(1, min(num_tasks, os.cpu_count() or 1, 8))
+
+
+def _save_shards(
+    path: str,
+    data: dict[str, Any],
+    ext: str,
+    shard_size: int | None,
+    compression: Compression | None = None,
+    storage: Storage | None = None
+) -> list[str]:
+    # Return the files written, under the path (or key if `storage` is given).
+    fmt = get_format(ext)
+    entries = {}
+    tasks = []
+
+    for key, value in data.items():
+        parts = _split_entry(value, shard_size)
+        files = [f"{key}.{ext.lstrip('.')}" if len(parts) == 1
+                 else f"{key}-{i}.{ext.lstrip('.')}" for i in range(len(parts))]
+        entries[key] = {"files": files, "nbytes": _nbytes(value)}
+        tasks.extend(zip(files, parts))
+
+    def write_part(file: str, part: Any) -> list[str]:
+        if storage is None:
+            _write(fmt, os.path.join(path, file), {"data": part}, compression)
+            return [file]
+        rels = _put(storage, storage.join(path, file), fmt, {"data": part}, compression)
+        return [f"{file}/{rel}" for rel in rels] or [file]
+
+    with ThreadPoolExecutor(_num_workers(len(tasks))) as executor:
+        futures = [executor.submit(write_part, file, part) for file, part in tasks]
+        written = [rel for future in futures for rel in future.result()]
+
+    index = {"layout": "sharded", "entries": entries}
+
+    if storage is None:
+        with open(os.path.join(path, SHARD_INDEX), 'w') as f:
+            json.dump(index, f)
+    else:
+        storage.write(storage.join(path, SHARD_INDEX), json.dumps(index).encode())
+
+    return written + [SHARD_INDEX]
+
+
+def _load_shards(
+    path: str,
+    keys: Collection[str] | None,
+    storage: Storage | None = None,
+    **loader_kwds
+):
+    # Read from the path, or from the key if `storage` is given.
+    if storage is None:
+        with open(os.path.join(path, SHARD_INDEX), 'r') as f:
+            entries: dict[str, Any] = json.load(f)["entries"]
+    else:
+        entries = json.loads(storage.read(storage.join(path, SHARD_INDEX)))["entries"]
+
+    if keys is not None:
+        entries = {k: v for k, v in entries.items() if k in keys}
+
+    fmt = get_format(os.path.splitext(path)[1])
+    files = [file for entry in entries.values() for file in entry["files"]]
+
+    def load_part(file: str):
+        if storage is None:
+            return _read(fmt, os.path.join(path, file), **loader_kwds)["data"]
+        return _get(storage, storage.join(path, file), fmt, **loader_kwds)["data"]
+
+    with ThreadPoolExecutor(_num_workers(len(files))) as executor:
+        loaded = dict(zip(files, executor.map(load_part, files)))
+
+    data = {}
+
+    for key, entry in entries.items():
+        parts = [loaded[file] for file in entry["files"]]
+        value = parts[0]
+        for part in parts[1:]:
+            _merge_parts(value, part)
+        data[key] = value
+
+    return data
+
+
+def _shard_keys(
+    ckpts_dir: str,
+    ckpt_file: str,
+    requested: Collection[str],
+    storage: Storage | None = None
+):
+    """Select entries to read by default: the requested ones, and those
+    holding no tensor data."""
+    if not requested:
+        return None
+
+    storage = storage or _LOCAL
+    key = storage.join(ckpts_dir, ckpt_file, SHARD_INDEX)
+
+    try:
+        entries: dict[str, Any] = json.loads(storage.read(key))["entries"]
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+    return {k for k, v in entries.items() if k in requested or v["nbytes"] == 0}
+
 
 @runtime_checkable
 class SupportsStateDict(Protocol):
@@ -33,11 +374,58 @@ class SupportsStateDict(Protocol):
     def load_state_dict(self, state_dict: dict[str, Any]) -> Any: ...
 
 
+def _to_cpu(obj: Any):
+    torch = sys.modules.get("torch")
+
+    if torch is not None and isinstance(obj, torch.Tensor):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, dict):
+        result = copy.copy(obj) # keeps attributes like `_metadata`
+        for key, value in obj.items():
+            result[key] = _to_cpu(value)
+        return result
+    if isinstance(obj, list):
+        return [_to_cpu(v) for v in obj]
+    if type(obj) is tuple:
+        return tuple(_to_cpu(v) for v in obj)
+
+    return obj
+
+
+def snapshot_state_dict(**state_dict: SupportsStateDict | Any) -> dict[str, Any]:
+    """Collect state dicts of the given objects, with all tensors copied to CPU.
+
+    The snapshot does not share memory with the live objects, so it can be
+    written by another thread while training goes on."""
+    data = {}
+
+    for key, value in state_dict.items():
+        if isinstance(value, SupportsStateDict):
+            value = value.state_dict()
+        data[key] = _to_cpu(value)
+
+    return data
+
+
 def save_state_dict_impl(
     ckpts_dir: str,
     ckpt_file: str,
+    layout: str = "file",
+    shard_size: int | None = None,
+    compression: Compression | None = None,
+    storage: Storage | None = None,
     **state_dict: SupportsStateDict | Any
 ) -> None:
+    """
+    Save state dicts of the given objects, and other values, to a checkpoint.
+
+    With `layout="sharded"`, the checkpoint is a directory with one shard file
+    for each keyword, and shards are written in parallel.
+    Entries holding more than `shard_size` bytes of tensors are further split.
+    With `compression`, every file is compressed in chunks on a thread pool,
+    and decompressed automatically on load.
+    The checkpoint directory is a key of `storage` if given, and a local path if not.
+    """
     data_to_save = {}
 
     for key, value in state_dict.items():
@@ -47,23 +435,31 @@ def save_state_dict_impl(
             data_to_save[key] = value
 
     if len(data_to_save) > 0:
-        os.makedirs(ckpts_dir, exist_ok=True)
-        _save_pt_file(ckpts_dir, ckpt_file, data_to_save)
+        _save_file(ckpts_dir, ckpt_file, data_to_save, layout, shard_size,
+                   compression, storage)
 
 
 def load_state_dict_impl(
     ckpts_dir: str,
     ckpt_file: str,
     loader_kwds: dict[str, Any] = {},
+    keys: Collection[str] | None = None,
+    storage: Storage | None = None,
     **state_dict: SupportsStateDict
 ) -> dict[str, Any]:
     """
     Load state dicts from a checkpoint file, then load into the given objects
     that supports state dict operations.
 
+    For sharded checkpoints, only the shards of the given objects, of `keys`,
+    and of entries holding no tensors are read. All shards are read if
+    neither objects nor `keys` are given.
+
     Return the remaining data in the checkpoint as a dict.
     """
-    data_loaded = _load_pt_file(ckpts_dir, ckpt_file, **loader_kwds)
+    keys = _shard_keys(ckpts_dir, ckpt_file, set(state_dict).union(keys or ()), storage)
+
+    data_loaded = _load_file(ckpts_dir, ckpt_file, keys, storage, **loader_kwds)
 
     if not isinstance(data_loaded, dict):
         raise TypeError("State dicts are expected to be dict, "
@@ -74,3 +470,184 @@ def load_state_dict_impl(
             obj.load_state_dict(data_loaded.pop(key))
 
     return data_loaded
+
+
+class CheckpointWriter():
+    """Write checkpoint files on a background thread.
+
+    Only one write is in flight at a time: submitting a new checkpoint waits
+    for the previous one, which bounds the memory held by snapshots."""
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="sucrose-ckpt")
+        self._pending: Future | None = None
+
+    def submit(
+        self,
+        ckpts_dir: str,
+        ckpt_file: str,
+        data: dict[str, Any],
+        callback: Callable[[], Any] | None = None,
+        **options
+    ) -> Future:
+        """Schedule `data` (usually from `snapshot_state_dict`) to be saved.
+        `options` are passed to `save_state_dict_impl`, and `callback` is
+        called in the writer thread after the file is written."""
+        self.wait()
+        self._pending = self._executor.submit(
+            self._write, ckpts_dir, ckpt_file, data, callback, options
+        )
+        return self._pending
+
+    @staticmethod
+    def _write(ckpts_dir, ckpt_file, data, callback, options):
+        save_state_dict_impl(ckpts_dir, ckpt_file, **options, **data)
+        if callback is not None:
+            callback()
+
+    @property
+    def busy(self) -> bool:
+        return self._pending is not None and not self._pending.done()
+
+    def wait(self) -> None:
+        """Block until the pending write finishes.
+        Errors raised in the writer thread are raised here."""
+        pending, self._pending = self._pending, None
+
+        if pending is not None:
+            pending.result()
+
+    def close(self) -> None:
+        try:
+            self.wait()
+        finally:
+            self._executor.shutdown(wait=True)
+
+
+### Prefetching
+
+def _memory_size(path: str) -> int:
+    # Estimated memory of a loaded checkpoint: the size of its files,
+    # decompressed if compressed.
+    if not os.path.isdir(path):
+        return decompressed_size(path) if is_compressed(path) else os.path.getsize(path)
+
+    return sum(_memory_size(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+def _readahead(path: str):
+    # Ask the kernel to read the files into the page cache in the background,
+    # which also helps memory-mapped loads.
+    if not hasattr(os, "posix_fadvise"):
+        return
+
+    paths = [path] if not os.path.isdir(path) else \
+        [os.path.join(root, name) for root, _, names in os.walk(path) for name in names]
+
+    for file_name in paths:
+        try:
+            fd = os.open(file_name, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+def _load_selected(
+    ckpts_dir: str,
+    ckpt_file: str,
+    keys: Collection[str] | None,
+    storage: Storage,
+    loader_kwds: dict[str, Any]
+) -> dict[str, Any]:
+    local_dir = storage.local_path(ckpts_dir)
+    if local_dir is not None:
+        _readahead(os.path.join(local_dir, ckpt_file))
+    data = _load_file(ckpts_dir, ckpt_file,
+                      _shard_keys(ckpts_dir, ckpt_file, keys, storage), storage,
+                      **loader_kwds)
+
+    if keys is not None:
+        data = {k: v for k, v in data.items() if k in keys}
+
+    return data
+
+
+def iter_state_dicts(
+    ckpts_dir: str,
+    ckpt_files: Sequence[str],
+    keys: Collection[str] | None = None,
+    *,
+    prefetch: int = 2,
+    max_bytes: int | None = None,
+    loader_kwds: dict[str, Any] = {},
+    storage: Storage | None = None
+) -> Iterator[dict[str, Any]]:
+    """Load the checkpoints in order, while the next `prefetch` ones are
+    loaded on background threads.
+
+    Args:
+        ckpts_dir (str): The checkpoint directory.
+        ckpt_files (Sequence[str]): Names of the checkpoints.
+        keys (Collection[str] | None, optional): Entries to keep. Other shards of
+            sharded checkpoints are not read. All entries if `None`.
+        prefetch (int, optional): Number of checkpoints loaded ahead.
+            Defaults to `2`.
+        max_bytes (int | None, optional): Limit of the memory (estimated by the
+            size of the files) of the checkpoints loaded ahead and the one
+            yielded last. A checkpoint is still loaded if nothing else is,
+            even if it is larger. Not limited if `None`.
+        loader_kwds (dict[str, Any], optional): Keyword args for the loader.
+        storage (Storage | None, optional): The storage of the checkpoints,
+            local if `None`.
+
+    Yields:
+        dict[str, Any]: The loaded checkpoint, which is only released by the
+        iterator when the next one is requested.
+    """
+    if keys is not None:
+        keys = set(keys)
+
+    storage = storage or _LOCAL
+    local_dir = storage.local_path(ckpts_dir)
+    files = deque(ckpt_files)
+    pending: deque[tuple[Future, int]] = deque()
+    in_memory = 0 # bytes held by pending loads and the last yielded
+
+    executor = ThreadPoolExecutor(max(1, prefetch), thread_name_prefix="sucrose-prefetch")
+
+    def fill(needed: bool):
+        # Load ahead, and load the next one anyway if `needed`.
+        nonlocal in_memory
+        while files and (len(pending) < prefetch or (needed and not pending)):
+            if max_bytes is None:
+                size = 0
+            elif local_dir is not None:
+                size = _memory_size(os.path.join(local_dir, files[0]))
+            else: # compressed sizes
+                size = storage.info(storage.join(ckpts_dir, files[0]))[0]
+            if max_bytes is not None and in_memory + size > max_bytes and \
+                    (pending or not needed):
+                break
+            file_name = files.popleft()
+            future = executor.submit(_load_selected, ckpts_dir, file_name, keys,
+                                     storage, loader_kwds)
+            pending.append((future, size))
+            in_memory += size
+
+    try:
+        fill(True)
+        while pending:
+            future, size = pending.popleft()
+            data = future.result()
+            fill(False) # read the next ones while this one is used
+            yield data
+            del data
+            in_memory -= size
+            fill(True)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,295 @@
+
+__all__ = [
+    "Compression",
+    "register_codec",
+    "get_codec",
+    "is_compressed",
+    "read_compressed",
+    "decompress_bytes",
+    "decompressed_size"
+]
+
+import os, io, struct
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections.abc import Callable
+from typing import BinaryIO
+
+# A compressed checkpoint file is the magic, the codec name, then frames of
+# independently compressed chunks of the serialized checkpoint:
+#   magic (4s) | name size (B) | codec name | frames...
+#   frame: raw size (Q) | stored size (Q) | stored bytes
+# Chunks which do not shrink are stored raw, with the stored size equal to
+# the raw size. Chunks are compressed and decompressed on a thread pool.
+MAGIC = b"SCZ1"
+_FRAME = struct.Struct("<QQ")
+DEFAULT_CHUNK_SIZE = 4 << 20
+
+# name -> factory returning (compress(data, level), decompress(data, raw_size)),
+# imported on first use, so that optional codecs are only needed when used.
+_CODECS: dict[str, Callable[[], tuple[Callable, Callable]]] = {}
+_LOADED: dict[str, tuple[Callable, Callable]] = {}
+
+
+def register_codec(name: str, factory: Callable[[], tuple[Callable, Callable]],
+                   *, overwrite: bool = False):
+    """Register a codec by a factory returning `(compress, decompress)`, called
+    as `compress(data, level)` and `decompress(data, raw_size)`. The factory
+    should raise `ImportError` if the codec is not installed."""
+    if name in _CODECS and not overwrite:
+        raise KeyError(f"codec {name!r} is already registered")
+    if len(name.encode()) > 255:
+        raise ValueError(f"codec name {name!r} is too long")
+    _CODECS[name] = factory
+    _LOADED.pop(name, None)
+
+
+def get_codec(name: str) -> tuple[Callable, Callable]:
+    """Get `(compress, decompress)` of the codec registered as `name`."""
+    try:
+        return _LOADED[name]
+    except KeyError:
+        pass
+
+    try:
+        factory = _CODECS[name]
+    except KeyError:
+        raise ValueError(
+            f"unknown compression codec {name!r}, expected one of {sorted(_CODECS)}"
+        ) from None
+
+    try:
+        codec = _LOADED[name] = factory()
+    except ImportError as e:
+        raise ValueError(f"compression codec {name!r} is not installed: {e}") from None
+
+    return codec
+
+
+def _zlib():
+    import zlib
+    return (lambda data, level: zlib.compress(data, -1 if level is None else level),
+            lambda data, raw_size: zlib.decompress(data, bufsize=raw_size))
+
+
+def _lzma():
+    import lzma
+    return (lambda data, level: lzma.compress(data, preset=level),
+            lambda data, raw_size: lzma.decompress(data))
+
+
+def _bz2():
+    import bz2
+    return (lambda data, level: bz2.compress(data, 9 if level is None else level),
+            lambda data, raw_size: bz2.decompress(data))
+
+
+def _zstd():
+    try:
+        from compression import zstd # the standard library since 3.14
+        return (lambda data, level: zstd.compress(data, level),
+                lambda data, raw_size: zstd.decompress(data))
+    except ImportError:
+        import zstandard
+    # compressor objects are not thread-safe, so one is made per chunk
+    return (lambda data, level: zstandard.ZstdCompressor(
+                level=3 if level is None else level).compress(data),
+            lambda data, raw_size: zstandard.ZstdDecompressor().decompress(
+                data, max_output_size=raw_size))
+
+
+def _lz4():
+    import lz4.frame
+    return (lambda data, level: lz4.frame.compress(
+                data, compression_level=0 if level is None else level),
+            lambda data, raw_size: lz4.frame.decompress(data))
+
+
+register_codec("zlib", _zlib)
+register_codec("lzma", _lzma)
+register_codec("bz2", _bz2)
+register_codec("zstd", _zstd)
+register_codec("lz4", _lz4)
+
+
+# Codecs of the standard library release the GIL, so the chunks of all
+# checkpoints (and shards) are compressed in parallel on a shared pool.
+_EXECUTOR: ThreadPoolExecutor | None = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(
+                min(32, os.cpu_count() or 1), thread_name_prefix="sucrose-codec"
+            )
+        return _EXECUTOR
+
+
+class Compression():
+    """Compression of checkpoint files, set by the `ckpts_compression`,
+    `ckpts_compression_level` and `ckpts_chunk_size` fields of the meta domain.
+
+    The serialized checkpoint is cut into chunks of `chunk_size` bytes, which
+    are compressed on a thread pool while the next chunks are serialized."""
+    __slots__ = ("codec", "level", "chunk_size")
+
+    def __init__(self, codec: str = "zlib", level: int | None = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        get_codec(codec) # fail early on unknown or missing codecs
+        if chunk_size <= 0:
+            raise ValueError(f"chunk size should be positive, got {chunk_size}")
+        self.codec = codec
+        self.level = level
+        self.chunk_size = chunk_size
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}({self.codec!r}, level={self.level}, "
+                f"chunk_size={self.chunk_size})")
+
+    def writer(self, f: BinaryIO) -> "_ChunkWriter":
+        """A binary file-like object compressing what is written into `f`.
+        Close it to write the last chunk."""
+        return _ChunkWriter(f, self)
+
+
+class _ChunkWriter(io.BufferedIOBase):
+    # Not seekable: writers like `zipfile` then write sequentially.
+    def __init__(self, f: BinaryIO, compression: Compression):
+        super().__init__()
+        self._file = f
+        self._position = 0
+        self._compress = get_codec(compression.codec)[0]
+        self._level = compression.level
+        self._chunk_size = compression.chunk_size
+        self._buffer = bytearray()
+        # bounds the memory of chunks waiting to be written
+        self._pending: deque[tuple[bytes, Future]] = deque()
+        self._max_pending = 2 * (os.cpu_count() or 1)
+
+        name = compression.codec.encode()
+        f.write(MAGIC + struct.pack("<B", len(name)) + name)
+
+    def writable(self):
+        return True
+
+    def write(self, data) -> int:
+        view = memoryview(data).cast("B")
+        size = len(view)
+        self._position += size
+
+        if self._buffer:
+            take = min(size, self._chunk_size - len(self._buffer))
+            self._buffer += view[:take]
+            view = view[take:]
+            if len(self._buffer) == self._chunk_size:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+
+        while len(view) >= self._chunk_size:
+            self._submit(bytes(view[:self._chunk_size]))
+            view = view[self._chunk_size:]
+
+        if len(view):
+            self._buffer += view
+
+        return size
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            while self._pending:
+                self._write_next()
+        finally:
+            super().close()
+
+    def _submit(self, chunk: bytes):
+        future = _executor().submit(self._compress, chunk, self._level)
+        self._pending.append((chunk, future))
+        while len(self._pending) > self._max_pending:
+            self._write_next()
+
+    def _write_next(self):
+        chunk, future = self._pending.popleft()
+        data = future.result()
+
+        if len(data) >= len(chunk): # stored raw
+            data = chunk
+        self._file.write(_FRAME.pack(len(chunk), len(data)))
+        self._file.write(data)
+
+
+def is_compressed(path: str) -> bool:
+    """Whether the file is a compressed checkpoint."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except (IsADirectoryError, FileNotFoundError):
+        return False
+
+
+def decompressed_size(path: str) -> int:
+    """Size of the serialized checkpoint in a compressed file, read from the
+    frame headers without decompressing."""
+    size = 0
+
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a compressed checkpoint")
+        name_size, = f.read(1)
+        f.seek(name_size, os.SEEK_CUR)
+        while header := f.read(_FRAME.size):
+            raw_size, stored_size = _FRAME.unpack(header)
+            size += raw_size
+            f.seek(stored_size, os.SEEK_CUR)
+
+    return size
+
+
+def read_compressed(path: str) -> bytearray:
+    """Decompress a compressed checkpoint file into the serialized bytes,
+    decompressing the chunks in parallel."""
+    with open(path, "rb") as f:
+        return decompress_bytes(f.read(), path)
+
+
+def decompress_bytes(data: bytes, name: str = "data") -> bytearray:
+    """Decompress the content of a compressed checkpoint file, e.g. read
+    from a storage, decompressing the chunks in parallel. The result is
+    writable, so that loaders can view it without another copy."""
+    data = memoryview(data)
+
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{name} is not a compressed checkpoint")
+
+    name_size = data[len(MAGIC)]
+    start = len(MAGIC) + 1
+    codec_name = bytes(data[start:start + name_size]).decode()
+    decompress = get_codec(codec_name)[1]
+    offset = start + name_size
+    futures: list[Future | memoryview] = []
+
+    while offset < len(data):
+        raw_size, stored_size = _FRAME.unpack_from(data, offset)
+        offset += _FRAME.size
+        chunk = data[offset:offset + stored_size]
+        if len(chunk) != stored_size:
+            raise ValueError(f"{name} is truncated")
+        offset += stored_size
+
+        if stored_size == raw_size:
+            futures.append(chunk)
+        else:
+            futures.append(_executor().submit(decompress, chunk, raw_size))
+
+    return bytearray().join(f if isinstance(f, memoryview) else f.result() for f in futures)
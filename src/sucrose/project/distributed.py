@@ -0,0 +1,294 @@
+
+__all__ = [
+    "DistInfo",
+    "default_run_id",
+    "handoff"
+]
+
+import os, time
+import pickle, tempfile
+import hashlib
+import threading
+import traceback
+from collections.abc import Callable, Mapping
+from typing import TypeVar
+
+from ..sucrose_logger import logger
+from .._fsutil import atomic_write
+
+_T = TypeVar("_T")
+
+RUN_ID_ENV = "SUCROSE_RUN_ID"
+HANDOFF_DIR_ENV = "SUCROSE_HANDOFF_DIR"
+# Handoff directories untouched for this long are left by runs which could not
+# remove them, see `handoff`, and are removed by later runs.
+STALE_HANDOFF_SECS = 24 * 3600.0
+
+
+class DistInfo():
+    """Rank of the process in a distributed launch, like one by `torchrun`.
+
+    Only the writer rank writes checkpoints and logs. Data computed once,
+    like the parsed config, is computed by the local leader (local rank `0`)
+    of each machine and handed to the other local ranks, see `handoff`."""
+    __slots__ = ("rank", "world_size", "local_rank", "local_world_size",
+                 "writer_rank", "run_id")
+
+    def __init__(
+        self,
+        rank: int = 0,
+        world_size: int = 1,
+        local_rank: int | None = None,
+        local_world_size: int | None = None,
+        *,
+        writer_rank: int = 0,
+        run_id: str | None = None
+    ):
+        """
+        Args:
+            rank (int, optional): The global rank. Defaults to `0`.
+            world_size (int, optional): Number of processes. Defaults to `1`.
+            local_rank (int | None, optional): The rank on this machine. Same as
+                `rank` if `None`, as on a single machine.
+            local_world_size (int | None, optional): Number of processes on this
+                machine. Same as `world_size` if `local_rank` is `None`, and
+                unknown otherwise.
+            writer_rank (int, optional): The rank writing files. Defaults to `0`.
+            run_id (str | None, optional): An id shared by the processes of the
+                launch and unique across launches, naming the handoff files.
+                Detected from the environment if `None`, see `default_run_id`.
+        """
+        if not 0 <= rank < world_size:
+            raise ValueError(f"rank {rank} out of range of world size {world_size}")
+        if not 0 <= writer_rank < world_size:
+            raise ValueError(f"writer rank {writer_rank} out of range of world size {world_size}")
+
+        self.rank = rank
+        self.world_size = world_size
+        self.local_rank = rank if local_rank is None else local_rank
+        self.local_world_size = world_size if local_rank is None else local_world_size
+        self.writer_rank = writer_rank
+        self.run_id = default_run_id() if run_id is None else run_id
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(rank={self.rank}, world_size={self.world_size}, "
+                f"local_rank={self.local_rank}, local_world_size={self.local_world_size}, "
+                f"writer_rank={self.writer_rank}, "
+                f"run_id={self.run_id!r})")
+
+    @property
+    def is_writer(self) -> bool:
+        return self.rank == self.writer_rank
+
+    @property
+    def is_local_leader(self) -> bool:
+        return self.local_rank == 0
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ, **kwargs) -> "DistInfo | None":
+        """Read `RANK`, `WORLD_SIZE`, `LOCAL_RANK` and `LOCAL_WORLD_SIZE` set by
+        the launcher, or `SLURM_NTASKS_PER_NODE` for the local world size if
+        it is not set. `None` if not launched with more than one process."""
+        try:
+            world_size = int(environ.get("WORLD_SIZE", 1))
+            rank = int(environ.get("RANK", 0))
+            local_rank = int(environ["LOCAL_RANK"]) if "LOCAL_RANK" in environ else None
+            local_world_size = _local_world_size(environ)
+        except ValueError as e:
+            raise ValueError(f"Bad distributed environment variables: {e}") from None
+
+        if world_size <= 1:
+            return None
+
+        return cls(rank, world_size, local_rank, local_world_size, **kwargs)
+
+
+def _local_world_size(environ: Mapping[str, str]) -> int | None:
+    if "LOCAL_WORLD_SIZE" in environ:
+        return int(environ["LOCAL_WORLD_SIZE"])
+    # Like "4", or "4(x2)" if the same on all nodes, which it is not otherwise
+    tasks = environ.get("SLURM_NTASKS_PER_NODE", "")
+    if tasks.isdigit():
+        return int(tasks)
+    return None
+
+
+def default_run_id(environ: Mapping[str, str] = os.environ) -> str:
+    """`SUCROSE_RUN_ID`, the run id of `torchrun`, the Slurm job step, or the
+    id and start time of the parent process (the launcher of the local ranks),
+    in order."""
+    if environ.get(RUN_ID_ENV):
+        return environ[RUN_ID_ENV]
+    if environ.get("TORCHELASTIC_RUN_ID", "none") != "none":
+        return environ["TORCHELASTIC_RUN_ID"]
+    if "SLURM_JOB_ID" in environ:
+        return f"slurm{environ['SLURM_JOB_ID']}.{environ.get('SLURM_STEP_ID', 0)}"
+    ppid = os.getppid()
+    start = _start_time(ppid)
+    return f"ppid{ppid}" if start is None else f"ppid{ppid}.{start}"
+
+
+def _start_time(pid: int) -> str | None:
+    # In clock ticks since boot, so that a reused pid gives another run id.
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            # the command name in parentheses may contain spaces
+            return f.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+def _handoff_dir(run_id: str) -> str:
+    # Memory-backed on Linux, so the handoff never touches the disk.
+    base = os.environ.get(HANDOFF_DIR_ENV) or \
+        ("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir())
+    return os.path.join(base, f"sucrose-{run_id}")
+
+
+# Handoff directories of which stale runs were removed by this process.
+_SWEPT: set[str] = set()
+
+# Number of handoffs of each key in this process. Ranks run the same code,
+# so the n-th handoff of a key is the same on all ranks.
+_HANDOFF_SEQ: dict[str, int] = {}
+_HANDOFF_LOCK = threading.Lock()
+
+
+def _remove_stale(base: str, max_age: float = STALE_HANDOFF_SECS):
+    # Directories of runs which did not know their local world size.
+    now = time.time()
+    try:
+        names = [n for n in os.listdir(base) if n.startswith("sucrose-")]
+    except OSError:
+        return
+    for name in names:
+        dir_name = os.path.join(base, name)
+        try:
+            if now - os.stat(dir_name).st_mtime < max_age:
+                continue
+            for file_name in os.listdir(dir_name):
+                os.remove(os.path.join(dir_name, file_name))
+            os.rmdir(dir_name)
+        except OSError: # removed by another process, or not ours
+            pass
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    try: # the last file of the run
+        os.rmdir(os.path.dirname(path))
+    except OSError:
+        pass
+
+
+def _acknowledge(path: str, dist: DistInfo):
+    # Every reader leaves a mark after reading, and the reader completing
+    # the marks removes the file and the marks.
+    if dist.local_world_size is None:
+        return
+
+    mark = f"{path}.{dist.local_rank}.ack"
+    with open(mark, "wb"):
+        pass
+
+    marks = [f"{path}.{r}.ack" for r in range(1, dist.local_world_size)]
+    if all(os.path.exists(m) for m in marks):
+        for m in [path, *marks]:
+            _remove(m)
+
+
+def handoff(
+    key: str,
+    compute: Callable[[], _T],
+    dist: DistInfo,
+    *,
+    timeout: float = 600.0,
+) -> _T:
+    """Compute a value once on the local leader and share it with the other
+    local ranks by a file. The leader writes the pickled value atomically
+    with the key and the sequence number of the handoff, and the others wait
+    for the file to appear and check both. If `compute` raises,
+    the leader writes the error instead, and the others raise a `RuntimeError`
+    without waiting for the timeout.
+
+    The file is removed once all local ranks have read it, which needs
+    `dist.local_world_size`. Removing it when the leader exits instead could
+    leave slower ranks waiting. If it is unknown, the file is kept and removed
+    by the first handoff of a later run on the machine once it is older than
+    `STALE_HANDOFF_SECS`.
+
+    Args:
+        key (str): Name of the value, the same on all ranks.
+        compute (Callable[[], _T]): Called on the local leader only.
+        dist (DistInfo): Rank of this process.
+        timeout (float, optional): Seconds to wait for the leader.
+            Defaults to `600.0`.
+
+    Returns:
+        _T: The value computed by the leader.
+    """
+    with _HANDOFF_LOCK:
+        seq = _HANDOFF_SEQ.get(key, 0)
+        _HANDOFF_SEQ[key] = seq + 1
+
+    digest = hashlib.sha1(f"{key}#{seq}".encode()).hexdigest()[:16]
+    dir_name = _handoff_dir(dist.run_id)
+    path = os.path.join(dir_name, f"{digest}.pkl")
+
+    if dist.is_local_leader:
+        if dist.local_world_size == 1:
+            return compute()
+
+        try:
+            value = compute()
+        except BaseException:
+            # Written as text, the error itself may not be picklable.
+            _publish(dir_name, path, (key, seq, traceback.format_exc(), None))
+            raise
+
+        _publish(dir_name, path, (key, seq, None, value))
+        if dist.local_world_size is None and seq == 0:
+            logger.warning(f"Local world size unknown, {path} is not removed "
+                           "after the handoff. Set LOCAL_WORLD_SIZE to remove it.")
+        return value
+
+    deadline = time.monotonic() + timeout
+    delay = 0.001
+
+    while True:
+        try:
+            with open(path, "rb") as f:
+                found_key, found_seq, error, value = pickle.load(f)
+        except FileNotFoundError:
+            pass
+        else:
+            if (found_key, found_seq) != (key, seq):
+                raise RuntimeError(
+                    f"Rank {dist.rank} expected handoff #{seq} of {key!r} at {path}, "
+                    f"but found #{found_seq} of {found_key!r}"
+                )
+            _acknowledge(path, dist)
+            if error is not None:
+                raise RuntimeError(f"The local leader failed to compute handoff "
+                                   f"#{seq} of {key!r}:\n{error}")
+            return value
+
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Rank {dist.rank} waited {timeout}s for handoff "
+                               f"#{seq} of {key!r} from the local leader at {path}")
+        time.sleep(delay)
+        delay = min(delay * 2, 0.1)
+
+
+def _publish(dir_name: str, path: str, payload: tuple):
+    base = os.path.dirname(dir_name)
+    with _HANDOFF_LOCK:
+        sweep = base not in _SWEPT
+        _SWEPT.add(base)
+    if sweep:
+        _remove_stale(base)
+
+    atomic_write(path, lambda f: pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL))
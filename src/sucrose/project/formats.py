@@ -0,0 +1,441 @@
+
+__all__ = [
+    "CkptFormat",
+    "register_format",
+    "get_format",
+    "TorchFormat",
+    "SafeTensorsFormat",
+    "NpyDirFormat",
+    "NpzFormat"
+]
+
+import os, io, sys, json, mmap, struct
+import inspect
+from collections import OrderedDict
+from collections.abc import Collection
+from typing import Any, BinaryIO
+
+
+class CkptFormat():
+    """Serialization format of checkpoint files.
+
+    A format either writes one file (`directory = False`), receiving an
+    opened binary file in `save`, or writes a whole directory
+    (`directory = True`), receiving the directory path.
+    `load` always receives the path, and `load_bytes` the content of a file
+    which is not on the disk as is, like a decompressed one."""
+    directory: bool = False
+
+    def save(self, dst: BinaryIO | str, data: dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def load(self, path: str, **kwds) -> dict[str, Any]:
+        raise NotImplementedError
+
+    def load_bytes(self, data: bytes, **kwds) -> dict[str, Any]:
+        return self.load(io.BytesIO(data), **kwds)
+
+
+_FORMATS: dict[str, CkptFormat] = {}
+
+
+def register_format(ext: str, fmt: CkptFormat, *, overwrite: bool = False):
+    """Register a checkpoint format for the file extension `ext`."""
+    ext = ext.lstrip('.').lower()
+
+    if ext in _FORMATS and not overwrite:
+        raise KeyError(f"checkpoint format for {ext!r} is already registered")
+
+    _FORMATS[ext] = fmt
+
+
+def get_format(ext: str) -> CkptFormat:
+    """Get the checkpoint format registered for the file extension `ext`."""
+    try:
+        return _FORMATS[ext.lstrip('.').lower()]
+    except KeyError:
+        raise ValueError(
+            f"unknown checkpoint extension {ext!r}, "
+            f"expected one of {sorted(_FORMATS)}"
+        ) from None
+
+
+### Pickle
+
+class TorchFormat(CkptFormat):
+    """Pickle-based format of `torch.save`.
+
+    Files are memory-mapped on load (`mmap=True`) if not specified otherwise
+    and supported by the torch version, so tensors are read from the page
+    cache instead of being copied into process memory."""
+    _mmap_supported: bool | None = None
+
+    def save(self, dst, data):
+        from torch import save
+        save(data, dst)
+
+    def load(self, path, **kwds):
+        from torch import load
+
+        if isinstance(path, str) and "mmap" not in kwds and self._supports_mmap(load):
+            try:
+                return load(path, mmap=True, **kwds)
+            except RuntimeError: # legacy (non-zip) files can not be mapped
+                pass
+
+        return load(path, **kwds)
+
+    @classmethod
+    def _supports_mmap(cls, load_func) -> bool:
+        if cls._mmap_supported is None:
+            cls._mmap_supported = "mmap" in inspect.signature(load_func).parameters
+        return cls._mmap_supported
+
+
+### Flat tensors
+
+# Non-tensor parts of the checkpoint are kept as a JSON skeleton, where
+# tensors are replaced by references to the flat tensor storage.
+
+_TORCH_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+    "F8_E4M3": "float8_e4m3fn", "F8_E5M2": "float8_e5m2",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8",
+    "U64": "uint64", "U32": "uint32", "U16": "uint16", "U8": "uint8",
+    "BOOL": "bool",
+}
+_NUMPY_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8",
+    "U64": "uint64", "U32": "uint32", "U16": "uint16", "U8": "uint8",
+    "BOOL": "bool",
+}
+_DTYPE_SIZES = {
+    "F64": 8, "F32": 4, "F16": 2, "BF16": 2, "F8_E4M3": 1, "F8_E5M2": 1,
+    "I64": 8, "I32": 4, "I16": 2, "I8": 1,
+    "U64": 8, "U32": 4, "U16": 2, "U8": 1, "BOOL": 1,
+}
+
+
+def _dtype_code(array) -> str:
+    name = str(array.dtype).removeprefix("torch.")
+    table = _TORCH_DTYPES if _is_tensor(array) else _NUMPY_DTYPES
+
+    for code, dtype_name in table.items():
+        if dtype_name == name:
+            return code
+
+    raise TypeError(f"dtype {name} is not supported by flat tensor formats")
+
+
+def _is_tensor(obj) -> bool:
+    torch = sys.modules.get("torch")
+    return torch is not None and isinstance(obj, torch.Tensor)
+
+
+def _is_ndarray(obj) -> bool:
+    numpy = sys.modules.get("numpy")
+    return numpy is not None and isinstance(obj, numpy.ndarray)
+
+
+def _flatten(data: Any, path: str, arrays: dict[str, Any],
+             reserved: Collection[str] = ()):
+    # Arrays are named by their path, made unique among the arrays and
+    # the names `reserved` by the format, and recorded in the skeleton.
+    if _is_tensor(data) or _is_ndarray(data):
+        name = path or "_"
+        while name in arrays or name in reserved:
+            name = name + "_"
+        arrays[name] = data
+        return {"@t": name, "torch": _is_tensor(data)}
+    if data is None or isinstance(data, (bool, int, float, str)):
+        return data
+    if isinstance(data, list):
+        return [_flatten(v, f"{path}.{i}", arrays, reserved) for i, v in enumerate(data)]
+    if type(data) is tuple:
+        return {"@tuple": [_flatten(v, f"{path}.{i}", arrays, reserved)
+                           for i, v in enumerate(data)]}
+    if isinstance(data, dict):
+        kind = "@odict" if isinstance(data, OrderedDict) else "@dict"
+        result: dict[str, Any] = {kind: [
+            [_flatten(k, path, {}), _flatten(v, f"{path}.{k}".lstrip("."), arrays, reserved)]
+            for k, v in data.items()
+        ]}
+        metadata = getattr(data, "_metadata", None)
+        if metadata is not None:
+            result["@meta"] = _flatten(metadata, "", {})
+        return result
+
+    raise TypeError(f"{data.__class__.__name__} can not be stored in flat "
+                    "tensor formats, use the pickle-based format instead")
+
+
+def _unflatten(data: Any, arrays: dict[str, Any]):
+    if isinstance(data, list):
+        return [_unflatten(v, arrays) for v in data]
+    if not isinstance(data, dict):
+        return data
+    if "@t" in data:
+        return arrays[data["@t"]]
+    if "@tuple" in data:
+        return tuple(_unflatten(v, arrays) for v in data["@tuple"])
+
+    kind = OrderedDict if "@odict" in data else dict
+    result = kind(
+        (_unflatten(k, arrays), _unflatten(v, arrays))
+        for k, v in data.get("@odict", data.get("@dict"))
+    )
+    if "@meta" in data:
+        setattr(result, "_metadata", _unflatten(data["@meta"], arrays))
+    return result
+
+
+def _as_bytes(array) -> memoryview:
+    """View the contiguous CPU memory of a tensor/array as bytes."""
+    if _is_tensor(array):
+        array = array.detach().cpu().contiguous().reshape(-1)
+        if array.numel() == 0:
+            return memoryview(b"")
+        import torch
+        return memoryview(array.view(torch.uint8).numpy())
+    else:
+        import numpy as np
+        array = np.ascontiguousarray(array).reshape(-1)
+        return memoryview(array.view(np.uint8))
+
+
+def _from_buffer(buffer, code: str, shape: list[int], offset: int, as_tensor: bool):
+    count = 1
+    for s in shape:
+        count *= s
+
+    if as_tensor:
+        import torch
+        dtype = getattr(torch, _TORCH_DTYPES[code])
+        if count == 0:
+            return torch.empty(shape, dtype=dtype)
+        return torch.frombuffer(buffer, dtype=dtype, count=count, offset=offset).reshape(shape)
+    else:
+        import numpy as np
+        return np.frombuffer(buffer, _NUMPY_DTYPES[code], count, offset).reshape(shape)
+
+
+class SafeTensorsFormat(CkptFormat):
+    """Flat tensor format compatible with safetensors files.
+
+    The file starts with the 8-byte little-endian size of a JSON header,
+    which records dtype, shape and byte range of every tensor, followed by
+    the raw tensor data. Other values are kept in the header metadata.
+
+    Loading a file maps it copy-on-write into memory, and tensors are views of
+    the mapping, so nothing is copied until the tensors are modified. Loading
+    from bytes (a compressed file, or an object of a storage) needs a writable
+    buffer: a `bytearray`, like the decompressed content, is viewed as is and
+    then owned by the tensors, and other bytes are copied once."""
+    SKELETON_KEY = "sucrose.skeleton"
+    METADATA_KEY = "__metadata__"
+
+    def save(self, dst, data):
+        arrays: dict[str, Any] = {}
+        skeleton = _flatten(data, "", arrays, (self.METADATA_KEY,))
+        # Larger items first, so that every tensor is aligned to its item size.
+        names = sorted(arrays, key=lambda n: -_DTYPE_SIZES[_dtype_code(arrays[n])])
+        header: dict[str, Any] = {
+            self.METADATA_KEY: {self.SKELETON_KEY: json.dumps(skeleton)}
+        }
+        buffers = []
+        offset = 0
+
+        for name in names:
+            buffer = _as_bytes(arrays[name])
+            header[name] = {
+                "dtype": _dtype_code(arrays[name]),
+                "shape": list(arrays[name].shape),
+                "data_offsets": [offset, offset + buffer.nbytes],
+            }
+            buffers.append(buffer)
+            offset += buffer.nbytes
+
+        header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        header_bytes += b" " * (-len(header_bytes) % 8)
+        dst.write(struct.pack("<Q", len(header_bytes)))
+        dst.write(header_bytes)
+
+        for buffer in buffers:
+            dst.write(buffer)
+
+    def load(self, path, *, mmap_file: bool = True, **kwds):
+        with open(path, "rb") as f:
+            header_size, = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_size))
+
+            if mmap_file and os.fstat(f.fileno()).st_size > 8 + header_size:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+            else:
+                f.seek(0)
+                buffer = bytearray(f.read())
+
+        return self._decode(buffer, header, 8 + header_size, kwds)
+
+    def load_bytes(self, data, *, mmap_file: bool = True, **kwds):
+        # Tensors are views of a writable buffer
+        buffer = data if isinstance(data, bytearray) else bytearray(data)
+        header_size, = struct.unpack_from("<Q", buffer)
+        header = json.loads(buffer[8:8 + header_size])
+        return self._decode(buffer, header, 8 + header_size, kwds)
+
+    def _decode(self, buffer, header: dict[str, Any], start: int, loader_kwds: dict[str, Any]):
+        metadata = header.pop(self.METADATA_KEY, None) or {}
+        skeleton = json.loads(metadata.get(self.SKELETON_KEY, "null"))
+        torch_names = set()
+        _collect_torch_names(skeleton, torch_names)
+        arrays = {}
+
+        for name, info in header.items():
+            arrays[name] = _from_buffer(
+                buffer, info["dtype"], info["shape"],
+                start + info["data_offsets"][0],
+                as_tensor=(name in torch_names) or skeleton is None
+            )
+
+        arrays = _map_location(arrays, loader_kwds)
+
+        if skeleton is None: # files written by other tools
+            return arrays
+
+        return _unflatten(skeleton, arrays)
+
+
+def _collect_torch_names(skeleton: Any, names: set[str]):
+    if isinstance(skeleton, list):
+        for v in skeleton:
+            _collect_torch_names(v, names)
+    elif isinstance(skeleton, dict):
+        if "@t" in skeleton:
+            if skeleton["torch"]:
+                names.add(skeleton["@t"])
+            return
+        for v in skeleton.values():
+            _collect_torch_names(v, names)
+
+
+### Numpy
+
+class NpyDirFormat(CkptFormat):
+    """A directory of raw `.npy` files, one for each tensor, and a JSON file
+    `arrays.json` for the structure. Arrays are memory-mapped on load."""
+    directory = True
+    INDEX_FILE = "arrays.json"
+
+    def save(self, dst, data):
+        import numpy as np
+        arrays: dict[str, Any] = {}
+        skeleton = _flatten(data, "", arrays)
+        files = {}
+
+        for i, (name, array) in enumerate(arrays.items()):
+            code = _dtype_code(array)
+            files[name] = {"file": f"{i}.npy", "dtype": code}
+            buffer = _as_bytes(array)
+            raw = np.frombuffer(buffer, np.uint8) if buffer.nbytes else np.empty(0, np.uint8)
+            np.save(os.path.join(dst, f"{i}.npy"), raw.view(_raw_numpy_dtype(code))
+                    .reshape(tuple(array.shape)))
+
+        with open(os.path.join(dst, self.INDEX_FILE), "w") as f:
+            json.dump({"skeleton": skeleton, "arrays": files}, f)
+
+    def load(self, path, *, mmap_file: bool = True, **kwds):
+        import numpy as np
+
+        with open(os.path.join(path, self.INDEX_FILE), "r") as f:
+            index = json.load(f)
+
+        skeleton = index["skeleton"]
+        torch_names = set()
+        _collect_torch_names(skeleton, torch_names)
+        arrays = {}
+
+        for name, info in index["arrays"].items():
+            file_name = os.path.join(path, info["file"])
+            array = np.load(file_name, mmap_mode="c" if mmap_file else None)
+            arrays[name] = _cast_loaded(array, info["dtype"], name in torch_names)
+
+        return _unflatten(skeleton, _map_location(arrays, kwds))
+
+
+def _raw_numpy_dtype(code: str) -> str:
+    # numpy has no bfloat16 or float8, which are stored by their bits
+    return _NUMPY_DTYPES.get(code) or f"int{_DTYPE_SIZES[code] * 8}"
+
+
+def _map_location(arrays: dict[str, Any], loader_kwds: dict[str, Any]) -> dict[str, Any]:
+    """Honor the `map_location` of `torch.load` given as a device, or a dict
+    from the loaded device (`"cpu"`). Other loader args only apply to the
+    pickle-based format, and are ignored."""
+    location = loader_kwds.get("map_location")
+    if isinstance(location, dict):
+        location = location.get("cpu")
+    if location is None or callable(location) or str(location) == "cpu":
+        return arrays
+
+    return {name: array.to(location) if _is_tensor(array) else array
+            for name, array in arrays.items()}
+
+
+def _cast_loaded(array, code: str, as_tensor: bool):
+    if not as_tensor:
+        return array
+
+    import torch
+    dtype = getattr(torch, _TORCH_DTYPES[code])
+    if array.size == 0:
+        return torch.empty(array.shape, dtype=dtype)
+    return torch.from_numpy(array).view(dtype)
+
+
+class NpzFormat(CkptFormat):
+    """A numpy `.npz` archive. Members of an archive are read into memory
+    on load, use `NpyDirFormat` if memory-mapping is required."""
+    SKELETON_KEY = "__skeleton__"
+    DTYPES_KEY = "__dtypes__"
+    # Members of the archive, and argument names of `numpy.savez`
+    RESERVED = (SKELETON_KEY, DTYPES_KEY, "file", "allow_pickle")
+
+    def save(self, dst, data):
+        import numpy as np
+        arrays: dict[str, Any] = {}
+        skeleton = _flatten(data, "", arrays, self.RESERVED)
+        members = {self.SKELETON_KEY: np.array(json.dumps(skeleton))}
+        dtypes = {}
+
+        for name, array in arrays.items():
+            code = _dtype_code(array)
+            buffer = _as_bytes(array)
+            raw = np.frombuffer(buffer, np.uint8) if buffer.nbytes else np.empty(0, np.uint8)
+            members[name] = raw.view(_raw_numpy_dtype(code)).reshape(tuple(array.shape))
+            dtypes[name] = code
+
+        members[self.DTYPES_KEY] = np.array(json.dumps(dtypes))
+        np.savez(dst, **members)
+
+    def load(self, path, **kwds):
+        import numpy as np
+
+        with np.load(path) as archive:
+            skeleton = json.loads(archive[self.SKELETON_KEY].item())
+            dtypes = json.loads(archive[self.DTYPES_KEY].item())
+            torch_names = set()
+            _collect_torch_names(skeleton, torch_names)
+            arrays = {
+                name: _cast_loaded(archive[name], code, name in torch_names)
+                for name, code in dtypes.items()
+            }
+
+        return _unflatten(skeleton, _map_location(arrays, kwds))
+
+
+register_format("pt", TorchFormat())
+register_format("pth", TorchFormat())
+register_format("safetensors", SafeTensorsFormat())
+register_format("npy", NpyDirFormat())
+register_format("npz", NpzFormat())
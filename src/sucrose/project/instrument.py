@@ -0,0 +1,155 @@
+
+__all__ = [
+    "Histogram",
+    "Instrumentation"
+]
+
+import os, json, time
+import threading
+from bisect import bisect_left
+from collections.abc import Callable
+from contextlib import contextmanager
+from typing import Any
+
+from ..sucrose_logger import logger
+from .._fsutil import atomic_write
+
+# Upper bounds (seconds) of the latency buckets, from 1 us to about 1100 s.
+BUCKET_BOUNDS = tuple(1e-6 * 2 ** i for i in range(31))
+
+# Called with the operation, its duration in seconds, and extra info like bytes.
+Hook = Callable[[str, float, dict[str, Any]], Any]
+
+
+class Histogram():
+    """Count, total, extremes and log2-bucketed latencies of an operation."""
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the quantile `q`, within [min, max]."""
+        if self.count == 0:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                bound = BUCKET_BOUNDS[i] if i < len(BUCKET_BOUNDS) else self.max
+                return min(max(bound, self.min), self.max)
+
+        return self.max
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": {f"{BUCKET_BOUNDS[i]:.6g}" if i < len(BUCKET_BOUNDS) else "inf": n
+                        for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class Instrumentation():
+    """Counters and latency histograms of the operations of a scenario,
+    bytes written and read, and user hooks called on every operation.
+
+    Records can come from the background writer threads, so they are
+    guarded by a lock. Optionally, the stats are written as JSON to
+    `path` at most once every `write_interval` seconds."""
+    def __init__(self, path: str | None = None, write_interval: float | None = None):
+        self.path = path
+        self.write_interval = write_interval
+        self.started = time.time()
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self._ops: dict[str, Histogram] = {}
+        self._hooks: list[Hook] = []
+        self._lock = threading.Lock()
+        self._last_write = time.monotonic()
+
+    def add_hook(self, hook: Hook) -> None:
+        """Call `hook(op, seconds, info)` after every recorded operation,
+        in the thread that did it."""
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Hook) -> None:
+        self._hooks.remove(hook)
+
+    def record(self, op: str, seconds: float, **info) -> None:
+        """Record an operation. `bytes_written` and `bytes_read` in `info`
+        are added to the totals."""
+        with self._lock:
+            try:
+                hist = self._ops[op]
+            except KeyError:
+                hist = self._ops[op] = Histogram()
+            hist.add(seconds)
+            self.bytes_written += info.get("bytes_written", 0)
+            self.bytes_read += info.get("bytes_read", 0)
+            due = (self.write_interval is not None and
+                   time.monotonic() - self._last_write >= self.write_interval)
+            if due:
+                self._last_write = time.monotonic()
+
+        for hook in self._hooks:
+            try:
+                hook(op, seconds, info)
+            except Exception as e:
+                logger.error(f"Stats hook {hook!r} failed on {op!r}: {e!r}")
+
+        if due:
+            self.write()
+
+    @contextmanager
+    def timer(self, op: str, **info):
+        """Time the block as an operation. Extra info can be added to the
+        yielded dict inside the block."""
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            self.record(op, time.perf_counter() - start, **info)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "started": self.started,
+                "time": time.time(),
+                "bytes_written": self.bytes_written,
+                "bytes_read": self.bytes_read,
+                "ops": {op: hist.to_dict() for op, hist in self._ops.items()},
+            }
+
+    def write(self, path: str | None = None) -> None:
+        """Write the snapshot as JSON, replacing the file atomically."""
+        path = self.path if path is None else path
+        if path is None:
+            raise ValueError("No path to write the stats to")
+
+        try:
+            atomic_write(path, json.dumps(self.snapshot(), indent=2))
+        except OSError as e:
+            logger.warning(f"Stats not written to {path}: {e!r}")
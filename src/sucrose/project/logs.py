@@ -1,5 +1,17 @@
 
-__all__ = ["start_pytorch_tensorboard_impl"]
+__all__ = [
+    "start_pytorch_tensorboard_impl",
+    "ScalarLogger",
+    "NullWriter",
+    "list_scalar_logs",
+    "read_scalar_log",
+]
+
+import os, json, time, struct
+import atexit, threading, weakref
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Collection, Mapping
+from typing import Any
 
 from ..sucrose_logger import logger
 
@@ -9,3 +21,334 @@ def start_pytorch_tensorboard_impl(logdir: str, **kwargs):
     writter = SummaryWriter(logdir, **kwargs)
 
     return writter
+
+
+def _ignore(*args, **kwargs) -> None:
+    pass
+
+
+class NullWriter():
+    """A writer ignoring everything, returned in place of the loggers on ranks
+    other than the writer, so that the same logging code runs on all ranks.
+    Any method of `SummaryWriter` or `ScalarLogger` can be called on it."""
+    add_scalar = add_scalars = flush = close = staticmethod(_ignore)
+
+    def __getattr__(self, name: str):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _ignore
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}()"
+
+
+### Scalar logs
+
+# A scalar log file is a sequence of blocks, one for each flush:
+#   header: magic, number of rows n, size of the tag table (bytes)
+#   tag table: JSON list of tag names, indexed by the codes below
+#   columns: step (int64 x n), tag code (int32 x n),
+#            value (float64 x n), wall_time (float64 x n)
+# A block cut short at the end (still being written) is ignored by readers.
+
+SCALAR_LOG_EXT = ".sclog"
+_MAGIC = b"SCL1"
+_BLOCK_HEADER = struct.Struct("<4sQI")
+_ROW_SIZE = 8 + 4 + 8 + 8
+
+
+def list_scalar_logs(log_dir: str) -> list[str]:
+    """Scalar log files directly under the log directory, in the order
+    they were created."""
+    if not os.path.isdir(log_dir):
+        return []
+
+    with os.scandir(log_dir) as it:
+        names = sorted(e.name for e in it
+                       if e.is_file() and e.name.endswith(SCALAR_LOG_EXT))
+
+    return [os.path.join(log_dir, name) for name in names]
+
+
+def read_scalar_log(
+    path: str,
+    tags: Collection[str],
+    offset: int = 0
+) -> tuple[int, dict[str, tuple[Any, Any, Any]]]:
+    """Read scalars of the given tags from a scalar log file, starting at
+    the byte `offset`.
+
+    Returns:
+        tuple[int, dict]: The offset after the last complete block, and
+            arrays of step, value and wall_time for each tag found.
+    """
+    import numpy as np
+
+    tags = frozenset(tags)
+    found: dict[str, list[tuple[Any, Any, Any]]] = {}
+
+    with open(path, "rb") as f:
+        f.seek(offset)
+
+        while True:
+            header = f.read(_BLOCK_HEADER.size)
+            if len(header) < _BLOCK_HEADER.size:
+                break
+            magic, rows, table_size = _BLOCK_HEADER.unpack(header)
+            if magic != _MAGIC:
+                raise ValueError(f"{path} is not a scalar log, or is corrupted "
+                                 f"at byte {offset}")
+            body = f.read(table_size + rows * _ROW_SIZE)
+            if len(body) < table_size + rows * _ROW_SIZE:
+                break
+            offset += _BLOCK_HEADER.size + len(body)
+
+            table: list[str] = json.loads(body[:table_size])
+            wanted = [code for code, tag in enumerate(table) if tag in tags]
+            if not wanted:
+                continue
+
+            pos = table_size
+            steps = np.frombuffer(body, np.int64, rows, pos)
+            pos += 8 * rows
+            codes = np.frombuffer(body, np.int32, rows, pos)
+            pos += 4 * rows
+            values = np.frombuffer(body, np.float64, rows, pos)
+            pos += 8 * rows
+            walls = np.frombuffer(body, np.float64, rows, pos)
+
+            for code in wanted:
+                mask = codes == code
+                if mask.any():
+                    found.setdefault(table[code], []).append(
+                        (steps[mask], values[mask], walls[mask])
+                    )
+
+    return offset, {
+        tag: tuple(np.concatenate(cols) for cols in zip(*parts))
+        for tag, parts in found.items()
+    }
+
+
+# Loggers alive in the process, flushed at exit before modules are torn down.
+_LOGGERS: "weakref.WeakSet[ScalarLogger]" = weakref.WeakSet()
+
+
+@atexit.register
+def _close_loggers():
+    for scalar_logger in list(_LOGGERS):
+        try:
+            scalar_logger.close()
+        except Exception as e:
+            logger.error(f"Failed to write the scalar log: {e!r}")
+
+
+def _stack_tensors(tensors: list):
+    """Stack 0-dim tensors, one stack for each device, without synchronizing."""
+    import torch
+
+    groups: dict[Any, list[int]] = {}
+    for i, t in enumerate(tensors):
+        groups.setdefault(t.device, []).append(i)
+
+    return [(positions, torch.stack([tensors[i].reshape(()) for i in positions]))
+            for positions in groups.values()]
+
+
+class ScalarLogger():
+    """Buffered scalar logger writing a columnar scalar log file.
+
+    Scalars are kept in preallocated arrays and appended to the file as one
+    block by a background thread when the buffer is full, when `flush_secs`
+    has passed since the last flush, or on `flush()`. Tensor values are kept
+    as tensors, and copied to the host once for every block instead of once
+    for every call. The file can be read by `sucrose.post.LogDataFrame`.
+    """
+    def __init__(
+        self,
+        log_dir: str,
+        *,
+        buffer_size: int = 4096,
+        flush_secs: float = 10.0,
+        tensorboard: bool = False,
+    ):
+        """
+        Args:
+            log_dir (str): The directory to write the log file in.
+            buffer_size (int, optional): Number of scalars buffered before
+                being written. Defaults to `4096`.
+            flush_secs (float, optional): Write the buffered scalars when this
+                long has passed since the last write. Defaults to `10.0`.
+            tensorboard (bool, optional): Also write the scalars as TensorBoard
+                events under `log_dir/tensorboard`. Defaults to `False`.
+        """
+        if buffer_size < 1:
+            raise ValueError(f"buffer_size should be positive, got {buffer_size}")
+
+        os.makedirs(log_dir, exist_ok=True)
+        file_name = f"scalars.{int(time.time())}.{os.getpid()}{SCALAR_LOG_EXT}"
+        self.path = os.path.join(log_dir, file_name)
+        self.buffer_size = buffer_size
+        self.flush_secs = flush_secs
+        self._tag_codes: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="sucrose-logs")
+        self._error: BaseException | None = None
+        self._last_flush = time.monotonic()
+        self._mirror = None
+        self._closed = False
+        self.stats = None # Instrumentation, set by the scenario
+
+        if tensorboard:
+            self._mirror = start_pytorch_tensorboard_impl(
+                os.path.join(log_dir, "tensorboard")
+            )
+
+        self._allocate()
+        _LOGGERS.add(self)
+
+    def _allocate(self):
+        import numpy as np
+
+        n = self.buffer_size
+        self._size = 0
+        self._steps = np.empty(n, dtype=np.int64)
+        self._codes = np.empty(n, dtype=np.int32)
+        self._values = np.empty(n, dtype=np.float64)
+        self._walls = np.empty(n, dtype=np.float64)
+        self._tensors: list = []
+        self._tensor_pos: list[int] = []
+
+    def add_scalar(
+        self,
+        tag: str,
+        scalar_value: Any,
+        global_step: int = 0,
+        walltime: float | None = None,
+    ) -> None:
+        """Log a scalar, with the same arguments as `SummaryWriter.add_scalar`.
+        Tensors are detached and kept until the next flush, so they should not
+        be modified in-place after being logged."""
+        with self._lock:
+            try:
+                code = self._tag_codes[tag]
+            except KeyError:
+                code = self._tag_codes[tag] = len(self._tag_codes)
+
+            i = self._size
+            self._steps[i] = global_step
+            self._codes[i] = code
+            self._walls[i] = time.time() if walltime is None else walltime
+
+            if isinstance(scalar_value, (int, float)):
+                self._values[i] = scalar_value
+            elif hasattr(scalar_value, "detach"):
+                self._tensors.append(scalar_value.detach())
+                self._tensor_pos.append(i)
+            else:
+                self._values[i] = float(scalar_value)
+
+            self._size = i + 1
+            # Swapped in the same critical section, so that no other thread
+            # writes past the end of the full buffer.
+            full = self._size == self.buffer_size
+            if full:
+                self._submit_locked()
+
+        if full:
+            self._raise_error()
+        elif time.monotonic() - self._last_flush >= self.flush_secs:
+            self._submit()
+
+    def add_scalars(
+        self,
+        scalars: Mapping[str, Any],
+        global_step: int = 0,
+        walltime: float | None = None,
+    ) -> None:
+        """Log scalars of several tags at the same step."""
+        if walltime is None:
+            walltime = time.time()
+        for tag, value in scalars.items():
+            self.add_scalar(tag, value, global_step, walltime)
+
+    def _submit(self):
+        with self._lock:
+            self._submit_locked()
+        self._raise_error()
+
+    def _submit_locked(self):
+        # Swap in new buffers and submit the block of the old ones, in order.
+        size = self._size
+        if size == 0:
+            return
+        columns = (self._steps[:size], self._codes[:size],
+                   self._values[:size], self._walls[:size])
+        stacked = _stack_tensors(self._tensors) if self._tensors else []
+        positions = self._tensor_pos
+        table = list(self._tag_codes)
+        self._allocate()
+        self._last_flush = time.monotonic()
+
+        tensors = [([positions[j] for j in group], t) for group, t in stacked]
+        try:
+            self._executor.submit(self._write, table, columns, tensors)
+        except RuntimeError: # executors are shut down at interpreter exit
+            self._write(table, columns, tensors)
+
+    def _write(self, table: list[str], columns, tensors):
+        start = time.perf_counter()
+        try:
+            steps, codes, values, walls = columns
+
+            for positions, t in tensors: # the only copies to the host
+                values[positions] = t.detach().cpu().double().numpy()
+
+            encoded = json.dumps(table).encode("utf-8")
+            with open(self.path, "ab") as f:
+                f.write(_BLOCK_HEADER.pack(_MAGIC, len(steps), len(encoded)))
+                f.write(encoded)
+                for col in columns:
+                    f.write(col.tobytes())
+
+            if self.stats is not None:
+                self.stats.record(
+                    "log_flush", time.perf_counter() - start,
+                    bytes_written=_BLOCK_HEADER.size + len(encoded) + len(steps) * _ROW_SIZE
+                )
+
+            if self._mirror is not None:
+                for step, code, value, wall in zip(steps.tolist(), codes.tolist(),
+                                                   values.tolist(), walls.tolist()):
+                    self._mirror.add_scalar(table[code], value, step, wall)
+        except BaseException as e:
+            logger.error(f"Failed to write scalars to {self.path}: {e!r}")
+            self._error = e
+
+    def _raise_error(self):
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def flush(self) -> None:
+        """Write all buffered scalars, and block until they are written.
+        Errors in the writer thread are raised here."""
+        self._submit()
+        try:
+            self._executor.submit(lambda: None).result()
+        except RuntimeError:
+            pass
+        if self._mirror is not None:
+            self._mirror.flush()
+        self._raise_error()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+            if self._mirror is not None:
+                self._mirror.close()
@@ -0,0 +1,299 @@
+
+__all__ = ["Manifest"]
+
+import os, re, json, time
+import hashlib
+import threading
+from typing import Any
+
+from ..sucrose_logger import logger
+from .._fsutil import atomic_write
+from .storage import Storage, LocalStorage
+
+
+def _hash_path(path: str, algorithm: str) -> str:
+    """Hash a checkpoint file, or all files under a checkpoint directory."""
+    digest = hashlib.new(algorithm)
+
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.relpath(os.path.join(root, name), path)
+            for root, _, names in os.walk(path) for name in names
+        )
+    else:
+        files = [""]
+
+    for rel in files:
+        if rel:
+            digest.update(rel.encode("utf-8"))
+        with open(os.path.join(path, rel) if rel else path, "rb") as f:
+            while chunk := f.read(1 << 20):
+                digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def _size_of_path(path: str) -> int:
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+def _hash_object(storage: Storage, key: str, algorithm: str,
+                 chunk_size: int = 8 << 20) -> str:
+    """Hash a checkpoint in a storage like `_hash_path`, reading objects
+    by ranges instead of into memory at once."""
+    digest = hashlib.new(algorithm)
+    listing = storage.list(key)
+    files = sorted(listing) if listing else [""]
+
+    for rel in files:
+        if rel:
+            digest.update(rel.encode("utf-8"))
+            obj, size = storage.join(key, rel), listing[rel][0]
+        else:
+            obj, size = key, storage.info(key)[0]
+        for start in range(0, size, chunk_size):
+            digest.update(storage.read(obj, start, min(start + chunk_size, size)))
+
+    return digest.hexdigest()
+
+
+# Manifests of the same directory share a lock in the process, so that
+# records added by one are merged, not overwritten, by the others.
+_LOCKS: dict[str, threading.Lock] = {}
+_LOCKS_LOCK = threading.Lock()
+
+
+def _lock_of(key: str) -> threading.Lock:
+    with _LOCKS_LOCK:
+        return _LOCKS.setdefault(key, threading.Lock())
+
+
+class Manifest():
+    """Index of the checkpoints in a checkpoint directory.
+
+    Each record is keyed by the checkpoint name and holds its epoch, step,
+    size, timestamp and content hash. The index is kept in `manifest.json`
+    and replaced atomically on every update, merged with the records written
+    by others since it was read. When the file is missing, the records are
+    rebuilt from a single directory scan (without steps and hashes), and only
+    written with the next update."""
+    FILE_NAME = "manifest.json"
+
+    def __init__(
+        self,
+        ckpts_dir: str,
+        pattern: re.Pattern,
+        hash_algo: str | None = None,
+        storage: Storage | None = None
+    ):
+        """
+        Args:
+            ckpts_dir (str): The checkpoint directory.
+            pattern (re.Pattern): Pattern of checkpoint names, whose first group
+                is the epoch number. Only used to rebuild the manifest.
+            hash_algo (str | None, optional): Name of the `hashlib` algorithm for
+                content hashes, or `None` to skip hashing. Hashing reads the
+                whole checkpoint again after it is saved. Defaults to `None`.
+            storage (Storage | None, optional): The storage of the checkpoints,
+                where `ckpts_dir` is a key. Local if `None`.
+        """
+        self.ckpts_dir = ckpts_dir
+        self.pattern = pattern
+        self.hash_algo = hash_algo
+        self.storage = storage or LocalStorage()
+        self._records: dict[str, dict[str, Any]] | None = None
+        local_path = self.storage.local_path(self.path)
+        self._lock = _lock_of(os.path.abspath(local_path) if local_path is not None
+                              else f"{self.storage!r}:{self.path}")
+
+    @property
+    def path(self):
+        return self.storage.join(self.ckpts_dir, self.FILE_NAME)
+
+    def _local(self, name: str) -> str | None:
+        return self.storage.local_path(self.storage.join(self.ckpts_dir, name))
+
+    @property
+    def records(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            if self._records is None:
+                self._records = self._read()
+            return self._records
+
+    def _read(self) -> dict[str, dict[str, Any]]:
+        records = self._load()
+        return self._scan() if records is None else records
+
+    def _load(self) -> dict[str, dict[str, Any]] | None:
+        # The records in the file, `None` if missing or broken.
+        try:
+            return json.loads(self.storage.read(self.path))["checkpoints"]
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Broken manifest {self.path} ({e!r}), rebuilding.")
+            return None
+
+    def _scan(self) -> dict[str, dict[str, Any]]:
+        records: dict[str, dict[str, Any]] = {}
+        local_dir = self._local("")
+
+        if local_dir is not None:
+            if not os.path.isdir(local_dir):
+                return records
+            with os.scandir(local_dir) as it:
+                entries = [(entry.name, entry.is_dir(), entry.stat().st_mtime)
+                           for entry in it if self.pattern.match(entry.name)]
+        else:
+            # Objects of checkpoint directories are grouped by their first part.
+            entries = {}
+            for rel, (_, mtime) in self.storage.list(self.ckpts_dir).items():
+                name, sep, _ = rel.partition("/")
+                if self.pattern.match(name):
+                    _, is_dir, latest = entries.get(name, (name, False, mtime))
+                    entries[name] = (name, is_dir or bool(sep), max(latest, mtime))
+            entries = list(entries.values())
+
+        for name, is_dir, mtime in entries:
+            records[name] = {
+                "epoch": int(self.pattern.match(name).group(1)),
+                "step": None,
+                "size": None if is_dir else self._size(name),
+                "mtime": mtime,
+                "hash": None,
+            }
+
+        return records
+
+    def _write(self, records: dict[str, dict[str, Any]]):
+        local_dir = self._local("")
+        if local_dir is None:
+            self.storage.write(self.path, json.dumps({"checkpoints": records}).encode())
+            return
+
+        atomic_write(os.path.join(local_dir, self.FILE_NAME),
+                     json.dumps({"checkpoints": records}))
+
+    def _size(self, name: str) -> int:
+        path = self._local(name)
+        if path is None:
+            return self.storage.info(self.storage.join(self.ckpts_dir, name))[0]
+        return _size_of_path(path)
+
+    def _hash(self, name: str, algorithm: str) -> str:
+        path = self._local(name)
+        if path is None:
+            return _hash_object(self.storage, self.storage.join(self.ckpts_dir, name), algorithm)
+        return _hash_path(path, algorithm)
+
+    def _exists(self, name: str) -> bool:
+        return self.storage.exists(self.storage.join(self.ckpts_dir, name))
+
+    def rebuild(self) -> None:
+        """Drop the records and rebuild them by scanning the directory."""
+        with self._lock:
+            self._records = self._scan()
+
+    def _refresh(self):
+        # Records of the checkpoints found by a scan, keeping the recorded
+        # steps and hashes of those still there.
+        with self._lock:
+            known = self._load() or {}
+            records = {name: known.get(name, record) for name, record in self._scan().items()}
+            # Other checkpoints, like mid-epoch ones, are not found by the scan.
+            for name, record in known.items():
+                if name not in records and not self.pattern.match(name) and self._exists(name):
+                    records[name] = record
+            self._records = records
+
+    def _name_of(self, name: str, epoch: int) -> str:
+        # The name of another epoch, like the checkpoint `name`.
+        match = self.pattern.match(name)
+        digits = match.group(1)
+        number = str(epoch).zfill(len(digits)) if digits.startswith("0") else str(epoch)
+        return name[:match.start(1)] + number + name[match.end(1):]
+
+    def add(self, name: str, epoch: int, step: int | None = None) -> dict[str, Any]:
+        """Record a checkpoint which has been written to the directory."""
+        path = self._local(name)
+        record = {
+            "epoch": epoch,
+            "step": step,
+            "size": self._size(name),
+            "mtime": os.path.getmtime(path) if path is not None else
+                self.storage.info(self.storage.join(self.ckpts_dir, name))[1],
+            "hash": self._hash(name, self.hash_algo) if self.hash_algo else None,
+            "hash_algo": self.hash_algo,
+            "saved_at": time.time(),
+        }
+
+        with self._lock:
+            records = self._load()
+            if records is None:
+                records = self._scan()
+            records[name] = record
+            self._write(records)
+            self._records = records
+
+        return record
+
+    def get(self, name: str) -> dict[str, Any] | None:
+        """The record of a checkpoint, `None` if not recorded or removed."""
+        record = self.records.get(name)
+        if record is None or not self._exists(name):
+            return None
+        return record
+
+    def _epoch_records(self) -> dict[str, dict[str, Any]]:
+        # Records of other checkpoints, like mid-epoch ones, have no epochs
+        # of their own.
+        return {k: r for k, r in self.records.items() if self.pattern.match(k)}
+
+    def epochs(self) -> list[int]:
+        """Sorted epochs of the recorded checkpoints."""
+        return sorted({r["epoch"] for r in self._epoch_records().values()})
+
+    def latest_epoch(self) -> int:
+        """The latest epoch recorded, or `0` if none.
+
+        The records are refreshed by a scan if the latest checkpoint has been
+        removed, if none is recorded, or if a checkpoint of the next epoch (or
+        of the epoch after the same interval as between the last two) exists
+        but is not recorded, like one written without the manifest."""
+        records = self._epoch_records()
+        if not records: # maybe written since, without the manifest
+            self._refresh()
+            records = self._epoch_records()
+            if not records:
+                return 0
+
+        epochs = sorted({r["epoch"] for r in records.values()})
+        latest = epochs[-1]
+        name = max(records, key=lambda k: records[k]["epoch"])
+        interval = latest - epochs[-2] if len(epochs) > 1 else 1
+        unrecorded = [self._name_of(name, epoch) for epoch in {latest + 1, latest + interval}]
+
+        if not self._exists(name) or any(self._exists(n) for n in unrecorded):
+            logger.info(f"Manifest of {self.ckpts_dir} is out of date, refreshing.")
+            self._refresh()
+            records = self._epoch_records()
+            return max((r["epoch"] for r in records.values()), default=0)
+
+        return latest
+
+    def verify(self, name: str) -> bool:
+        """Check the size and hash (if recorded) of a checkpoint."""
+        record = self.records.get(name)
+
+        if record is None or not self._exists(name):
+            return False
+        if record["size"] is not None and record["size"] != self._size(name):
+            return False
+        if record["hash"] is not None:
+            return record["hash"] == self._hash(name, record.get("hash_algo", "sha256"))
+
+        return True
@@ -0,0 +1,147 @@
+
+__all__ = [
+    "MetricAccumulator",
+    "REDUCTIONS"
+]
+
+from collections.abc import Callable
+from typing import Any
+
+from ..counter import Buffer
+
+REDUCTIONS = ("mean", "sum", "min", "max", "last")
+
+
+class _Window():
+    """Values of one tag in the current window. Tensors are kept on their
+    device, and reduced by one stacked operation at the end of the window."""
+    __slots__ = ("reduce", "values", "has_tensor")
+
+    def __init__(self, reduce: str):
+        self.reduce = reduce
+        self.values: list = []
+        self.has_tensor = False
+
+    def add(self, value: Any):
+        if hasattr(value, "detach"):
+            value = value.detach()
+            self.has_tensor = True
+        self.values.append(value)
+
+    def result(self):
+        values = self.values
+
+        if self.reduce == "last":
+            return values[-1]
+
+        if not self.has_tensor:
+            if self.reduce == "mean":
+                return sum(values) / len(values)
+            return {"sum": sum, "min": min, "max": max}[self.reduce](values)
+
+        from torch import stack
+        ref = next(v for v in values if hasattr(v, "detach"))
+        stacked = stack([v.reshape(()) if hasattr(v, "detach") else ref.new_tensor(v)
+                         for v in values])
+
+        if self.reduce == "mean":
+            return (stacked if stacked.is_floating_point() else stacked.double()).mean()
+        if self.reduce == "sum":
+            return stacked.sum()
+        if self.reduce == "min":
+            return stacked.amin()
+        return stacked.amax()
+
+    def clear(self):
+        self.values = []
+        self.has_tensor = False
+
+
+class MetricAccumulator():
+    """Accumulate metrics of every step, and emit one value per tag for every
+    `interval` steps.
+
+    Tensors are kept on their own device and reduced by one stacked tensor
+    operation per window, and never converted to Python numbers here, so
+    accumulating does not synchronize the device. Reduced values are passed
+    to `emit`, like the `add_scalar` of `ScalarLogger`, which copies them to
+    the host once per flush.
+
+    Examples:
+        ```
+        acc = MetricAccumulator(logger.add_scalar, interval=100)
+        for data in loader:
+            loss = ...
+            acc.add("loss", loss)
+            acc.step()
+        ```
+    """
+    def __init__(
+        self,
+        emit: Callable[[str, Any, int], Any],
+        interval: int = 100,
+    ):
+        """
+        Args:
+            emit (Callable[[str, Any, int], Any]): Called with tag, reduced value
+                and step at the end of every window.
+            interval (int, optional): Number of steps of every window.
+                Defaults to `100`.
+        """
+        if interval < 1:
+            raise ValueError(f"interval should be positive, got {interval}")
+
+        self.emit = emit
+        self.interval = interval
+        self._counter = Buffer()
+        self._windows: dict[str, _Window] = {}
+
+    def add(self, tag: str, value: Any, reduce: str = "mean") -> None:
+        """Accumulate a value (number or tensor) of the tag in the current window.
+
+        Args:
+            reduce (str, optional): One of `"mean"`, `"sum"`, `"min"`, `"max"`
+                and `"last"`. Fixed by the first value of the tag.
+                Defaults to `"mean"`.
+        """
+        try:
+            window = self._windows[tag]
+        except KeyError:
+            if reduce not in REDUCTIONS:
+                raise ValueError(f"unknown reduction {reduce!r}, "
+                                 f"expected one of {REDUCTIONS}") from None
+            window = self._windows[tag] = _Window(reduce)
+
+        window.add(value)
+
+    def step(self, n: int = 1, /, global_step: int | Callable[[], int] | None = None) -> bool:
+        """Count `n` steps, and emit the reduced values when the window is full.
+
+        Args:
+            global_step (int | Callable[[], int] | None, optional): The step the
+                values are emitted at, or a function returning it, only called
+                when they are. Use the number of steps counted by the
+                accumulator if `None`.
+
+        Returns:
+            bool: Whether values are emitted.
+        """
+        if not self._counter.step(n, interval=self.interval):
+            return False
+
+        if callable(global_step):
+            global_step = global_step()
+        self._emit(int(self._counter) if global_step is None else global_step)
+        return True
+
+    def flush(self, global_step: int | None = None) -> None:
+        """Emit the values of the unfinished window, e.g. at the end of training."""
+        self._counter.update()
+        self._emit(int(self._counter) if global_step is None else global_step)
+
+    def _emit(self, global_step: int):
+        for tag, window in self._windows.items():
+            if not window.values:
+                continue
+            self.emit(tag, window.result(), global_step)
+            window.clear()
@@ -1,76 +1,240 @@
 
 __all__ = [
     "find_latest_epoch",
+    "list_epochs",
     "Scenario",
     "get_current_scenario",
+    "set_current_scenario",
     "auto_get_scenario"
 ]
 
-import os, re, yaml
+import os, re, sys, time
+import functools
+import pickle
 import threading
+import contextvars
 from typing import Any, TypeVar
-from collections.abc import Callable
+from collections.abc import Callable, Collection, Iterable, Iterator
 
 from ..sucrose_logger import logger
+from ..counter import ShardedCounter
+from .._fsutil import atomic_write
 from ..config import *
 from .ckpt import *
+from .formats import get_format
+from .compress import Compression, DEFAULT_CHUNK_SIZE
+from .manifest import Manifest, _size_of_path
+from .instrument import Instrumentation, Hook
+from .metrics import MetricAccumulator
+from .schedule import CheckpointScheduler
+from .distributed import DistInfo, handoff
+from .storage import Storage, get_storage
 from .logs import *
 
 _R = TypeVar("_R")
 
 
-LOCAL_THREAD = threading.local()
+# Current objects (like the scenario) of the running context, seen by asyncio
+# tasks and `contextvars.copy_context()`, falling back to the process-global
+# ones, which are also seen by threads started without the context.
+_CURRENT: dict[str, contextvars.ContextVar] = {}
+_GLOBAL: dict[str, Any] = {}
+_CURRENT_LOCK = threading.Lock()
+_UNSET = object()
 
 
-def set_current(key: str, data):
-    setattr(LOCAL_THREAD, key, data)
+def _current_var(key: str) -> contextvars.ContextVar:
+    try:
+        return _CURRENT[key]
+    except KeyError:
+        with _CURRENT_LOCK:
+            return _CURRENT.setdefault(key, contextvars.ContextVar(f"sucrose.{key}"))
 
 
-def get_current(key: str):
-    if hasattr(LOCAL_THREAD, key):
-        return getattr(LOCAL_THREAD, key)
+def set_current(key: str, data, *, process_wide: bool = False) -> contextvars.Token:
+    """Set the current object of the context. Also set it as the process-global
+    fallback if `process_wide`. Return the token to `reset_current`."""
+    if process_wide:
+        _GLOBAL[key] = data
+    return _current_var(key).set(data)
+
+
+def reset_current(key: str, token: contextvars.Token) -> None:
+    """Restore the current object of the context before `set_current`."""
+    _current_var(key).reset(token)
+
+
+def set_global(key: str, data) -> None:
+    """Set the process-global fallback, or remove it if `data` is `None`."""
+    if data is None:
+        _GLOBAL.pop(key, None)
     else:
-        return None
+        _GLOBAL[key] = data
+
+
+def get_current(key: str):
+    result = _current_var(key).get(_UNSET)
+    if result is _UNSET:
+        return _GLOBAL.get(key)
+    return result
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_pattern(filename_pattern: str) -> re.Pattern:
+    return re.compile(filename_pattern)
 
 
-def find_latest_epoch(ckpts_dir: str, filename_pattern: str) -> int:
+def find_latest_epoch(ckpts_dir: str, filename_pattern: str,
+                      storage: Storage | None = None) -> int:
     """Look into the checkpoint directory and find the latest epoch.
-    Return `0` if no file found."""
+    Return `0` if no file found.
+
+    The first group of `filename_pattern` should match the epoch number.
+    With `storage`, `ckpts_dir` is a key of it, listed by a single call."""
+    if storage is not None:
+        return max(list_epochs(ckpts_dir, filename_pattern, storage), default=0)
+
     if not os.path.exists(ckpts_dir):
         return 0
 
-    all_ckpts = os.listdir(ckpts_dir)
+    pattern = _compile_pattern(filename_pattern)
     max_epoch = 0
 
-    for name in all_ckpts:
-        res = re.match(filename_pattern, name)
-        if res is None:
-            continue
-        else:
-            epoch = int(res.group(1))
-            if epoch > max_epoch:
-                max_epoch = epoch
+    with os.scandir(ckpts_dir) as it:
+        for entry in it:
+            res = pattern.match(entry.name)
+            if res is None:
+                continue
+            else:
+                epoch = int(res.group(1))
+                if epoch > max_epoch:
+                    max_epoch = epoch
 
     return max_epoch
 
 
+def list_epochs(ckpts_dir: str, filename_pattern: str,
+                storage: Storage | None = None) -> list[int]:
+    """Look into the checkpoint directory and list the epochs of the
+    checkpoints in ascending order, like `find_latest_epoch`."""
+    pattern = _compile_pattern(filename_pattern)
+
+    if storage is not None:
+        return sorted({int(res.group(1)) for name in storage.names(ckpts_dir)
+                       if (res := pattern.match(name)) is not None})
+
+    if not os.path.exists(ckpts_dir):
+        return []
+
+    with os.scandir(ckpts_dir) as it:
+        return sorted({int(res.group(1)) for entry in it
+                       if (res := pattern.match(entry.name)) is not None})
+
+
+def _ckpt_pattern(name: str, epoch_prefix: str, ext: str) -> str:
+    """Pattern of checkpoint file names of a scenario, whose first group is the epoch."""
+    prefix = re.escape(f'{name.replace("/", "_")}_{epoch_prefix}')
+    return f'{prefix}([0-9]+){re.escape("." + ext.lstrip("."))}$'
+
+
+def _saved_at(record: dict[str, Any]) -> float:
+    # Records rebuilt by scanning have no save time.
+    return record.get("saved_at") or record["mtime"]
+
+
+def _lookup_optional(context: dict[str, Any], field: str, default: Any):
+    try:
+        return lookup(**context, field=field)
+    except KeyError:
+        return default
+
+
+# Parsed config files shared by all scenarios in the process,
+# keyed by the absolute path, and validated by the mtime and size.
+_CONFIG_CACHE: dict[str, tuple[tuple[int, int], dict[str, Any]]] = {}
+_CONFIG_LOCK = threading.Lock()
+
+CONFIG_SIDECAR_ENV = "SUCROSE_CONFIG_CACHE"
+CONFIG_SIDECAR_NAME = ".config.yaml.cache"
+
+
+def _parse_yaml(file_name: str):
+    import yaml
+
+    # The libyaml loader is much faster than the pure-Python one.
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+    with open(file_name, 'r') as f:
+        return yaml.load(f, Loader=loader)
+
+
+def _read_sidecar(file_name: str, key: tuple[int, int]):
+    try:
+        with open(file_name, 'rb') as f:
+            cached_key, data = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+        return None
+
+    return data if tuple(cached_key) == key else None
+
+
+def _write_sidecar(file_name: str, key: tuple[int, int], data: dict[str, Any]):
+    try:
+        atomic_write(file_name, lambda f: pickle.dump(
+            (key, data), f, protocol=pickle.HIGHEST_PROTOCOL
+        ))
+    except OSError as e:
+        logger.info(f"Config cache not written to {file_name}: {e!r}")
+
+
 def load_config(work_dir: str) -> dict[str, Any]:
-    log_file = os.path.join(work_dir, "config.yaml")
+    """Load `config.yaml` in the work directory.
 
-    if not os.path.exists(log_file):
+    The parsed data is cached in the process until the file changes, so the
+    returned dict is shared and should not be modified. Set the environment
+    variable `SUCROSE_CONFIG_CACHE=1` to also keep a pickled copy beside the
+    config file, which is reused across processes."""
+    log_file = os.path.abspath(os.path.join(work_dir, "config.yaml"))
+
+    try:
+        stat = os.stat(log_file)
+    except FileNotFoundError:
         raise FileNotFoundError(
             f"config.yaml not found in the work directory: {work_dir}"
-        )
+        ) from None
+
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    with _CONFIG_LOCK:
+        cached = _CONFIG_CACHE.get(log_file)
+        if cached is not None and cached[0] == key:
+            return cached[1]
 
-    with open(log_file, 'r') as f:
-        config_data = yaml.safe_load(f)
+    use_sidecar = os.environ.get(CONFIG_SIDECAR_ENV, "") not in ("", "0")
+    sidecar = os.path.join(os.path.dirname(log_file), CONFIG_SIDECAR_NAME)
+    config_data = _read_sidecar(sidecar, key) if use_sidecar else None
 
-    assert isinstance(config_data, dict), "config.yaml is expected to be a dict"
-    logger.info(f"Config file loaded from {log_file}")
+    if config_data is None:
+        config_data = _parse_yaml(log_file)
+        assert isinstance(config_data, dict), "config.yaml is expected to be a dict"
+        logger.info(f"Config file loaded from {log_file}")
+        if use_sidecar:
+            _write_sidecar(sidecar, key, config_data)
+
+    with _CONFIG_LOCK:
+        _CONFIG_CACHE[log_file] = (key, config_data)
 
     return config_data
 
 
+def _config_entry(work_dir: str) -> tuple[str, tuple[tuple[int, int], dict[str, Any]]]:
+    # The config data and its cache entry, to be handed to the other ranks.
+    load_config(work_dir)
+    log_file = os.path.abspath(os.path.join(work_dir, "config.yaml"))
+    with _CONFIG_LOCK:
+        return log_file, _CONFIG_CACHE[log_file]
+
+
 class Scenario():
     """Provide scenarios to manage file paths and names."""
     def __init__(
@@ -78,11 +242,58 @@ class Scenario():
         work_dir: str,
         name: str,
         *,
-        meta_domain: str = "workspace"
+        meta_domain: str = "workspace",
+        async_save: bool = False,
+        instrument: bool = False,
+        distributed: DistInfo | bool | None = None,
+        storage: Storage | str | None = None
     ):
+        """
+        Args:
+            work_dir (str): The workspace directory containing `config.yaml`.
+            name (str): Name of the scenario, which is also its config domain.
+            meta_domain (str, optional): The config domain of workspace settings.
+                Defaults to `"workspace"`.
+            async_save (bool, optional): Write checkpoint files on a background
+                thread, see `save_state_dict`. Defaults to `False`.
+            instrument (bool, optional): Record timings of operations, see
+                `enable_stats`. Defaults to `False`.
+            distributed (DistInfo | bool | None, optional): The rank of this
+                process in a distributed launch. Detected from the `RANK`,
+                `WORLD_SIZE` and `LOCAL_RANK` environment variables if `None`
+                or `True`, and disabled if `False`. Defaults to `None`.
+            storage (Storage | str | None, optional): Where checkpoints are kept,
+                or its URL like `"dirobj:///mnt/bucket"`. Read from the `storage`
+                field of the meta domain if `None`, and the local workspace if
+                the field is not set either. Defaults to `None`.
+
+        In the distributed mode, only the writer rank writes checkpoints, logs
+        and stats, and the other ranks skip the work but keep the same epoch
+        and step counters. The config file is parsed and the latest epoch is
+        found once on each machine, and handed to the other local ranks.
+
+        With a storage, checkpoints are kept under `CKPTS_FOLDER/NAME` in it.
+        Logs are still written to `LOGS_DIR`, and copied to `LOGS_FOLDER/NAME`
+        in the storage by `flush()`.
+        """
         self.NAME = name
         self.WORK_DIR = work_dir
-        self.CONFIG = load_config(work_dir)
+
+        if distributed is None or distributed is True:
+            distributed = DistInfo.from_env()
+        self.DIST: DistInfo | None = distributed or None
+
+        if self.DIST is None:
+            config_data = load_config(work_dir)
+        else:
+            logger.info(f"Distributed mode: rank {self.DIST.rank} of "
+                        f"{self.DIST.world_size}, writer rank {self.DIST.writer_rank}.")
+            log_file, entry = self._shared("config", _config_entry, work_dir)
+            with _CONFIG_LOCK:
+                _CONFIG_CACHE.setdefault(log_file, entry)
+            config_data = entry[1]
+
+        self.CONFIG = CompiledConfig(config_data)
 
         context = {"data": self.CONFIG, "domain": meta_domain}
 
@@ -91,23 +302,87 @@ class Scenario():
         self.EPOCH_PREFIX = lookup(**context, field="epoch_prefix")
         self.CKPTS_EXT    = lookup(**context, field="ckpts_extension").lstrip('.')
         self.STEP_KEY     = lookup(**context, field="step_key")
-
-        name_ = name.replace("/", "_")
-        self.LAST_EPOCH = find_latest_epoch(
+        get_format(self.CKPTS_EXT) # fail early on unknown formats
+        self.CKPTS_LAYOUT = _lookup_optional(context, "ckpts_layout", "file")
+        self.SHARD_SIZE   = _lookup_optional(context, "ckpts_shard_size", None)
+        self.COMPRESSION  = self._compression_of(context)
+
+        if storage is None:
+            storage = _lookup_optional(context, "storage", None)
+        if isinstance(storage, str):
+            storage = get_storage(storage)
+        # `None` for the local workspace
+        self.STORAGE: Storage | None = storage
+        self._synced_logs: dict[str, tuple[int, float]] = {}
+
+        self.MANIFEST = Manifest(
             self.CKPTS_DIR,
-            f'{name_}_{self.EPOCH_PREFIX}([0-9]*).{self.CKPTS_EXT}'
+            _compile_pattern(self._ckpt_pattern()),
+            _lookup_optional(context, "ckpts_hash", None),
+            self.STORAGE
         )
-        self._step = 0 # number of steps finished, index of the next
+        self.LAST_EPOCH = self._shared("last_epoch", self._find_last_epoch)
+        self._steps = ShardedCounter() # number of steps finished, index of the next
         self._local_epoch = 0
         self._config_cache: dict[str, Any] = {}
+        self._config_version = self.CONFIG.version
+        self._writer = CheckpointWriter() if async_save and self.IS_WRITER else None
+        self._scalar_logger: ScalarLogger | None = None
+        self._metrics: MetricAccumulator | None = None
+        self._stats: Instrumentation | None = None
+        self._scheduler: CheckpointScheduler | None = None
+        self._meta_domain = meta_domain
+
+        if instrument:
+            self.enable_stats(_lookup_optional(context, "stats_interval", None))
 
     def __del__(self):
+        if getattr(self, "_scalar_logger", None) is not None:
+            try:
+                if self._metrics is not None and not sys.is_finalizing():
+                    self._metrics.flush(self.num_steps)
+                self._scalar_logger.close()
+            except Exception as e:
+                logger.error(f"Failed to write the scalar log: {e!r}")
+        if getattr(self, "_writer", None) is not None:
+            try:
+                self._writer.close()
+            except Exception as e:
+                logger.error(f"Failed to write the checkpoint: {e!r}")
         if hasattr(self, "_local_epoch") and self._local_epoch != 0:
             logger.warning(f"There are still {self._local_epoch} epochs that "
                            "are not saved as checkpoint files by `save_state_dict()`. ")
 
+    def _compression_of(self, context: dict[str, Any]) -> Compression | None:
+        codec = _lookup_optional(context, "ckpts_compression", None)
+        if codec is None:
+            return None
+        if get_format(self.CKPTS_EXT).directory:
+            raise ValueError(f"ckpts_compression is set, but checkpoints of "
+                             f"{self.CKPTS_EXT!r} are directories")
+        return Compression(
+            codec,
+            _lookup_optional(context, "ckpts_compression_level", None),
+            _lookup_optional(context, "ckpts_chunk_size", DEFAULT_CHUNK_SIZE)
+        )
+
+    @property
+    def IS_WRITER(self) -> bool:
+        """Whether this process writes files, always `True` if not distributed."""
+        return self.DIST is None or self.DIST.is_writer
+
+    def _shared(self, key: str, compute: Callable[..., _R], *args) -> _R:
+        # Computed by the local leader and handed to the other local ranks.
+        if self.DIST is None:
+            return compute(*args)
+        key = f"{os.path.abspath(self.WORK_DIR)}:{self.NAME}:{key}"
+        return handoff(key, functools.partial(compute, *args), self.DIST)
+
     @property
     def CKPTS_DIR(self):
+        """The checkpoint directory, or its key if the storage is not local."""
+        if self.STORAGE is not None:
+            return self.STORAGE.join(self.CKPTS_FOLDER, self.NAME)
         return os.path.join(self.WORK_DIR, self.CKPTS_FOLDER, self.NAME)
 
     @property
@@ -118,13 +393,48 @@ class Scenario():
         name = self.NAME.replace("/", "_")
         return f"{name}_{self.EPOCH_PREFIX}{epoch}.{self.CKPTS_EXT}"
 
+    def _make_resume_name(self):
+        # Not matched by the pattern of epochs, so never taken for an epoch.
+        name = self.NAME.replace("/", "_")
+        return f"{name}_resume.{self.CKPTS_EXT}"
+
+    def _ckpt_pattern(self):
+        return _ckpt_pattern(self.NAME, self.EPOCH_PREFIX, self.CKPTS_EXT)
+
+    def _find_last_epoch(self) -> int:
+        # The finished epochs of the latest checkpoint, mid-epoch ones included.
+        epoch = self.MANIFEST.latest_epoch()
+        resume = self.MANIFEST.get(self._make_resume_name())
+        if resume is not None and resume["epoch"] > epoch:
+            return resume["epoch"]
+        return epoch
+
+    def _latest_ckpt_name(self) -> str:
+        # The mid-epoch checkpoint if saved after the one of `LAST_EPOCH`.
+        file_name = self._make_ckpt_name(self.LAST_EPOCH)
+        resume = self.MANIFEST.get(self._make_resume_name())
+        if resume is None or resume["epoch"] != self.LAST_EPOCH:
+            return file_name
+
+        record = self.MANIFEST.get(file_name)
+        if record is None or _saved_at(resume) > _saved_at(record):
+            return self._make_resume_name()
+        return file_name
+
     ### Config
 
     def __getitem__(self, field: str):
+        if self._config_version != self.CONFIG.version:
+            self._config_cache.clear()
+            self._config_version = self.CONFIG.version
         try:
             return self._config_cache[field]
         except KeyError:
-            val = lookup(self.CONFIG, domain=self.NAME, field=field)
+            if self._stats is None:
+                val = lookup(self.CONFIG, domain=self.NAME, field=field)
+            else:
+                with self._stats.timer("config_miss"):
+                    val = lookup(self.CONFIG, domain=self.NAME, field=field)
             self._config_cache[field] = val
             return val
 
@@ -141,20 +451,31 @@ class Scenario():
 
         Position-only args are not supported as the config data is stored in a dict.
         """
-        return config_from_data(func, prefix, domain=self.NAME, data=self.CONFIG)
+        if self._stats is None:
+            return config_from_data(func, prefix, domain=self.NAME, data=self.CONFIG)
+
+        start = time.perf_counter()
+        result = config_from_data(func, prefix, domain=self.NAME, data=self.CONFIG)
+        self._stats.record("partial", time.perf_counter() - start)
+        return result
 
     ### Training
 
     def step(self, num: int = 1, /):
-        self._step += num
+        """Count finished steps. Threads can call it concurrently, each adding
+        to its own shard of the counter without taking a lock."""
+        self._steps.add(num)
+        if self._metrics is not None:
+            # Only read when the window is emitted
+            self._metrics.step(num, global_step=self._steps.__int__)
 
     @property
-    def num_steps(self): return self._step
+    def num_steps(self): return self._steps.value
     @num_steps.setter
     def num_steps(self, step: int):
         if not isinstance(step, int):
             raise TypeError(f"Step should be an int, but got {step.__class__.__name__}.")
-        self._step = step
+        self._steps.set(step)
 
     def epoch_range(self, num: int, /):
         start = self.LAST_EPOCH
@@ -168,18 +489,24 @@ class Scenario():
         *,
         load_step: bool = True,
         loader_kwds: dict[str, Any] = {},
+        keys: Collection[str] | None = None,
         **state_dict: SupportsStateDict
     ) -> dict[str, Any]:
         """Load state dict to objects.
 
         Args:
             epoch (int | None, optional): The epoch number of the checkpoint
-                file to read. Use the biggest number found in the folder if `None`.
+                file to read. Use the biggest number found in the folder if `None`,
+                or the mid-epoch checkpoint saved by `checkpoint()` after it.
                 Defaults to `None`.
             load_step (bool, optional): Read step info (if exists) from file into
                 the scenario if `True`. Defaults to `True`.
             loader_kwds (dict[str, Any], optional): Keyword args for the loader function
                 like `torch.load`.
+            keys (Collection[str] | None, optional): Extra entries to read from
+                sharded checkpoints. Shards of the given objects and entries
+                holding no tensors are always read, and the others are skipped.
+                All shards are read if neither objects nor keys are given.
 
         Returns:
             dict: Objects remaining in the dictionary after loading the state dict.
@@ -196,19 +523,25 @@ class Scenario():
             ph.num_step = data['step'] # this key is actually `sucrose.const.STEP_KEY`
             ```
         """
-        if epoch is None:
-            epoch = self.LAST_EPOCH
-        file_name = self._make_ckpt_name(epoch)
+        file_name = self._latest_ckpt_name() if epoch is None else self._make_ckpt_name(epoch)
+        start = time.perf_counter()
 
         try:
             extra_data = load_state_dict_impl(
-                self.CKPTS_DIR, file_name, loader_kwds=loader_kwds, **state_dict
+                self.CKPTS_DIR, file_name, loader_kwds=loader_kwds, keys=keys,
+                storage=self.STORAGE, **state_dict
             )
         except FileNotFoundError:
             logger.warning(f"No checkpoint found for scenario {self.NAME!r}. "
                            "Loading skipped.")
             return {}
 
+        if self._stats is not None:
+            self._stats.record(
+                "load_state_dict", time.perf_counter() - start,
+                bytes_read=self._ckpt_size(file_name)
+            )
+
         if load_step and self.STEP_KEY in extra_data:
             self.num_steps = extra_data[self.STEP_KEY]
 
@@ -236,6 +569,10 @@ class Scenario():
             **state_dict (SupportsStateDict | Any): Objects to save.
                 Save state dicts if they support.
 
+        In the async mode (`async_save=True`), state dicts are copied to CPU
+        and written by a background thread, so this function returns before
+        the file is written. Call `wait()` to block until it is done.
+
         Examples:
             ```
             sucrose.save_state_dict(10, model=model, optim=optim)
@@ -255,26 +592,358 @@ class Scenario():
 
         self._local_epoch = 0
         self.LAST_EPOCH += interval
-        file_name = self._make_ckpt_name(self.LAST_EPOCH)
+        self._write_checkpoint(state_dict, save_step)
+
+    def _write_checkpoint(
+        self,
+        state_dict: dict[str, Any],
+        save_step: bool,
+        mid_epoch: bool = False
+    ) -> str:
+        # Save the checkpoint of `LAST_EPOCH`, replacing the file if it exists,
+        # or the mid-epoch checkpoint.
+        file_name = self._make_resume_name() if mid_epoch else \
+            self._make_ckpt_name(self.LAST_EPOCH)
+
+        if not self.IS_WRITER:
+            return file_name
 
         if save_step:
             if self.STEP_KEY in state_dict:
                 raise ValueError(f"Key {self.STEP_KEY!r} is reserved for step info.")
             state_dict[self.STEP_KEY] = self.num_steps
 
-        save_state_dict_impl(
-            self.CKPTS_DIR, file_name, **state_dict
+        options = {"layout": self.CKPTS_LAYOUT, "shard_size": self.SHARD_SIZE,
+                   "compression": self.COMPRESSION, "storage": self.STORAGE}
+        record = functools.partial(
+            self.MANIFEST.add, file_name, self.LAST_EPOCH, self.num_steps
+        )
+        start = time.perf_counter()
+
+        if self._stats is not None:
+            op = "save_state_dict" if self._writer is None else "save_state_dict.write"
+            record = functools.partial(self._stats_of_save, op, start, record)
+
+        if self._writer is None:
+            save_state_dict_impl(
+                self.CKPTS_DIR, file_name, **options, **state_dict
+            )
+            record()
+            logger.info(f"{file_name} is saved, at step {self.num_steps}.")
+        else:
+            self._writer.wait()
+            data = snapshot_state_dict(**state_dict)
+            self._writer.submit(self.CKPTS_DIR, file_name, data, record, **options)
+            logger.info(f"{file_name} is submitted, at step {self.num_steps}.")
+            if self._stats is not None:
+                self._stats.record("save_state_dict", time.perf_counter() - start)
+
+        return file_name
+
+    def schedule_checkpoints(
+        self,
+        every_steps: int | None = None,
+        every_seconds: float | None = None,
+        max_overhead: float | None = None,
+        **kwargs
+    ) -> CheckpointScheduler:
+        """Save checkpoints by `checkpoint()` on global steps, on elapsed
+        wall-clock time, or adaptively so that the measured time of saving stays
+        under `max_overhead` of the training time. See `CheckpointScheduler`.
+
+        Triggers not given are read from the optional fields `ckpts_every_steps`,
+        `ckpts_every_seconds` and `ckpts_max_overhead` of the meta domain.
+        Keyword args are passed to `CheckpointScheduler`."""
+        context = {"data": self.CONFIG, "domain": self._meta_domain}
+        if every_steps is None:
+            every_steps = _lookup_optional(context, "ckpts_every_steps", None)
+        if every_seconds is None:
+            every_seconds = _lookup_optional(context, "ckpts_every_seconds", None)
+        if max_overhead is None:
+            max_overhead = _lookup_optional(context, "ckpts_max_overhead", None)
+
+        self._scheduler = CheckpointScheduler(
+            every_steps, every_seconds, max_overhead, **kwargs
+        )
+        self._scheduler.start(self.num_steps)
+        return self._scheduler
+
+    def checkpoint(
+        self,
+        *,
+        epoch_end: bool = False,
+        force: bool = False,
+        save_step: bool = True,
+        **state_dict: SupportsStateDict | Any
+    ) -> dict[str, Any] | None:
+        """Save a checkpoint if the scheduler says it is due. Call it every
+        step (after `step()`), with `epoch_end=True` at the end of every epoch.
+
+        Saves at the end of epochs are named by the number of finished epochs.
+        Saves in the middle of an epoch go to a separate mid-epoch checkpoint,
+        replaced by every such save, and never overwrite the checkpoints of
+        finished epochs. `load_state_dict` resumes from whichever of the
+        mid-epoch checkpoint and the one of the last finished epoch is newer,
+        with the saved step, from which the position in the unfinished epoch
+        can be found.
+
+        Args:
+            epoch_end (bool, optional): An epoch is finished. Defaults to `False`.
+            force (bool, optional): Save even if not due. Defaults to `False`.
+            save_step (bool, optional): See `save_state_dict`. Defaults to `True`.
+            **state_dict (SupportsStateDict | Any): Objects to save.
+
+        Returns:
+            dict[str, Any] | None: The checkpoint saved, with its `name`,
+            `epoch`, `step`, the `reason` it is saved and the `duration` of
+            blocking the loop, also kept in `scheduler.history`. `None` if not saved.
+        """
+        if self._scheduler is None:
+            self.schedule_checkpoints()
+        if epoch_end:
+            self._local_epoch += 1
+
+        reason = self._scheduler.due(self.num_steps)
+        if reason is None:
+            if not force:
+                return None
+            reason = "forced"
+
+        self.LAST_EPOCH += self._local_epoch
+        self._local_epoch = 0
+
+        start = time.perf_counter()
+        file_name = self._write_checkpoint(state_dict, save_step, mid_epoch=not epoch_end)
+        return self._scheduler.record(
+            self.num_steps, time.perf_counter() - start,
+            name=file_name, epoch=self.LAST_EPOCH, reason=reason
         )
 
-        logger.info(f"{file_name} is saved, at step {self.num_steps}.")
+    @property
+    def scheduler(self) -> CheckpointScheduler | None:
+        """The checkpoint scheduler started by `schedule_checkpoints`."""
+        return self._scheduler
+
+    def _stats_of_save(self, op: str, start: float, record: Callable[[], dict[str, Any]]):
+        # Called after the file is written, in the writer thread if async.
+        info = record()
+        self._stats.record(op, time.perf_counter() - start,
+                           bytes_written=info["size"] or 0)
+
+    def iter_checkpoints(
+        self,
+        epochs: Iterable[int] | None = None,
+        *,
+        keys: Collection[str] | None = None,
+        prefetch: int = 2,
+        max_bytes: int | None = None,
+        loader_kwds: dict[str, Any] = {}
+    ) -> Iterator[tuple[int, dict[str, Any]]]:
+        """Load the checkpoints of the epochs one by one, e.g. to evaluate every
+        epoch, while the next `prefetch` checkpoints are read on background
+        threads.
+
+        Args:
+            epochs (Iterable[int] | None, optional): Epochs to load, in order.
+                All epochs found in the checkpoint directory if `None`.
+            keys (Collection[str] | None, optional): Entries to load, like
+                `["model"]`. Other shards of sharded checkpoints are not read.
+                The step is kept if saved. All entries if `None`.
+            prefetch (int, optional): Number of checkpoints read ahead.
+                Defaults to `2`.
+            max_bytes (int | None, optional): Limit of the memory of the checkpoints
+                read ahead and the current one, estimated by their (decompressed)
+                file sizes. Not limited if `None`.
+            loader_kwds (dict[str, Any], optional): Keyword args for the loader
+                function like `torch.load`.
+
+        Yields:
+            tuple[int, dict[str, Any]]: The epoch and the loaded checkpoint.
+
+        Examples:
+            ```
+            for epoch, data in ssc.iter_checkpoints(keys=["model"]):
+                model.load_state_dict(data["model"])
+                evaluate(model)
+            ```
+        """
+        if epochs is None:
+            epochs = list_epochs(self.CKPTS_DIR, self._ckpt_pattern(), self.STORAGE)
+        epochs = list(epochs)
+
+        if keys is not None:
+            keys = {*keys, self.STEP_KEY}
+
+        files = [self._make_ckpt_name(epoch) for epoch in epochs]
+        loaded = iter_state_dicts(self.CKPTS_DIR, files, keys, prefetch=prefetch,
+                                  max_bytes=max_bytes, loader_kwds=loader_kwds,
+                                  storage=self.STORAGE)
+        try:
+            for epoch, data in zip(epochs, loaded):
+                yield epoch, data
+        finally:
+            loaded.close()
+
+    def list_checkpoints(self) -> list[int]:
+        """Epochs of the checkpoints saved, in ascending order."""
+        return self.MANIFEST.epochs()
+
+    def verify_checkpoint(self, epoch: int | None = None) -> bool:
+        """Check the size and content hash of a checkpoint against the manifest.
+        Use the latest epoch if `epoch` is `None`."""
+        file_name = self._latest_ckpt_name() if epoch is None else self._make_ckpt_name(epoch)
+        return self.MANIFEST.verify(file_name)
+
+    def wait(self) -> None:
+        """Block until the pending checkpoint file is written.
+        Errors in the background writer are raised here."""
+        if self._writer is not None:
+            self._writer.wait()
+
+    def flush(self) -> None:
+        """Finish all pending I/O of the scenario."""
+        self.wait()
+        if self._metrics is not None:
+            self._metrics.flush(self.num_steps)
+        if self._scalar_logger is not None:
+            self._scalar_logger.flush()
+        if self._stats is not None and self._stats.write_interval is not None:
+            self._stats.write()
+        if self.STORAGE is not None and self.IS_WRITER:
+            self._sync_logs()
+
+    def _ckpt_size(self, file_name: str) -> int:
+        if self.STORAGE is None:
+            return _size_of_path(os.path.join(self.CKPTS_DIR, file_name))
+        return self.STORAGE.info(self.STORAGE.join(self.CKPTS_DIR, file_name))[0]
+
+    def _sync_logs(self) -> None:
+        # Object stores can not append, so log files are written locally and
+        # copied whole when they have changed since the last copy.
+        if not os.path.isdir(self.LOGS_DIR):
+            return
+
+        key = self.STORAGE.join(self.LOGS_FOLDER, self.NAME)
+        if self.STORAGE.local_path(key) == self.LOGS_DIR:
+            return
+
+        for root, _, names in os.walk(self.LOGS_DIR):
+            for name in names:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                version = (stat.st_size, stat.st_mtime)
+                if self._synced_logs.get(path) == version:
+                    continue
+                rel = os.path.relpath(path, self.LOGS_DIR).replace(os.sep, "/")
+                self.STORAGE.upload(path, self.STORAGE.join(key, rel))
+                self._synced_logs[path] = version
+
+    ### Stats
+
+    def enable_stats(self, write_interval: float | None = None) -> Instrumentation:
+        """Start recording counts and latency histograms of checkpoint saves
+        and loads, `partial`, config lookups missing the cache and scalar log
+        flushes, with the bytes written and read. Nothing is recorded, and
+        almost no time is spent, until this is called.
+
+        Args:
+            write_interval (float | None, optional): Write the stats to
+                `LOGS_DIR/stats.json` at most once every this many seconds,
+                and on `flush()`. Never written if `None`. Defaults to `None`.
+                It can also be set by the `stats_interval` field of the meta domain.
+        """
+        if not self.IS_WRITER:
+            write_interval = None
+        if self._stats is None:
+            self._stats = Instrumentation(
+                os.path.join(self.LOGS_DIR, "stats.json") if self.IS_WRITER else None,
+                write_interval
+            )
+            if self._scalar_logger is not None:
+                self._scalar_logger.stats = self._stats
+        elif write_interval is not None:
+            self._stats.write_interval = write_interval
+        return self._stats
+
+    def stats(self) -> dict[str, Any]:
+        """Counters, latencies (seconds) and bytes recorded since `enable_stats`.
+        Empty if stats are not enabled."""
+        if self._stats is None:
+            return {}
+        return self._stats.snapshot()
+
+    def add_stats_hook(self, hook: Hook) -> None:
+        """Call `hook(op, seconds, info)` after every recorded operation, e.g.
+        to forward timings to a profiler. Stats are enabled if not yet."""
+        self.enable_stats().add_hook(hook)
 
     ### Logs
 
     def start_pytorch_tensorboard(self, **kwargs):
+        """Start a `SummaryWriter` writing to `LOGS_DIR`. A `NullWriter` on ranks
+        other than the writer in the distributed mode."""
+        if not self.IS_WRITER:
+            return NullWriter()
         result = start_pytorch_tensorboard_impl(self.LOGS_DIR, **kwargs)
         logger.info(f"Logger started at {self.LOGS_DIR}")
         return result
 
+    def start_scalar_logger(self, **kwargs) -> ScalarLogger | NullWriter:
+        """Start the buffered scalar logger of the scenario, writing to `LOGS_DIR`.
+        Keyword args are passed to `ScalarLogger` when it is first started.
+        A `NullWriter` on ranks other than the writer in the distributed mode.
+
+        The logger can be used in place of a `SummaryWriter` for scalars, and
+        the scalars are loaded by `sucrose.post.LogDataFrame` in the same way."""
+        if not self.IS_WRITER:
+            return NullWriter()
+        if self._scalar_logger is None:
+            self._scalar_logger = ScalarLogger(self.LOGS_DIR, **kwargs)
+            self._scalar_logger.stats = self._stats
+            logger.info(f"Scalar logger started at {self._scalar_logger.path}")
+        elif kwargs:
+            logger.warning("Scalar logger is already started, arguments ignored.")
+        return self._scalar_logger
+
+    def start_metric_accumulator(self, interval: int = 100, **kwargs) -> MetricAccumulator | NullWriter:
+        """Start accumulating metrics by `accumulate`, and log one value per tag
+        for every `interval` steps counted by `step()`.
+        Keyword args are passed to `start_scalar_logger`.
+        A `NullWriter` on ranks other than the writer in the distributed mode."""
+        if not self.IS_WRITER:
+            return NullWriter()
+        if self._metrics is None:
+            self._metrics = MetricAccumulator(
+                self.start_scalar_logger(**kwargs).add_scalar, interval
+            )
+        elif self._metrics.interval != interval or kwargs:
+            logger.warning("Metric accumulator is already started, arguments ignored.")
+        return self._metrics
+
+    def accumulate(self, tag: str, value: Any, reduce: str = "mean") -> None:
+        """Accumulate a metric (number or tensor) of the current step, without
+        synchronizing the device. The window is reduced by `reduce` (`"mean"`,
+        `"sum"`, `"min"`, `"max"` or `"last"`) and logged when it is full.
+        The accumulator is started with the default interval if not started.
+        Skipped on ranks other than the writer in the distributed mode."""
+        if not self.IS_WRITER:
+            return
+        if self._metrics is None:
+            self.start_metric_accumulator()
+        self._metrics.add(tag, value, reduce)
+
+    def log_scalar(self, tag: str, value: Any, step: int | None = None) -> None:
+        """Log a scalar (number or tensor) by the scalar logger, at the current
+        step if `step` is `None`. Skipped on ranks other than the writer in the
+        distributed mode."""
+        if not self.IS_WRITER:
+            return
+        if self._scalar_logger is None:
+            self.start_scalar_logger()
+        self._scalar_logger.add_scalar(
+            tag, value, self.num_steps if step is None else step
+        )
+
 
 def get_current_scenario() -> Scenario:
     result = get_current('Scenario')
@@ -285,6 +954,15 @@ def get_current_scenario() -> Scenario:
     return result
 
 
+def set_current_scenario(scen: Scenario | None, /, *, process_wide: bool = True) -> contextvars.Token:
+    """Set the current scenario of the context, seen by asyncio tasks started
+    from it. If `process_wide`, it is also the fallback of all threads and
+    contexts which have not set their own. Return the token to reset it."""
+    if process_wide:
+        set_global('Scenario', scen)
+    return set_current('Scenario', scen)
+
+
 def auto_get_scenario(scen: Scenario | None = None, /) -> Scenario:
     if scen is None:
         return get_current_scenario()
@@ -0,0 +1,104 @@
+
+__all__ = ["CheckpointScheduler"]
+
+import time
+from collections.abc import Callable
+from typing import Any
+
+
+class CheckpointScheduler():
+    """Decide when to save checkpoints during training, by global steps,
+    by wall-clock time, or adaptively by the measured cost of saving.
+
+    A checkpoint is due when any of the enabled triggers fires:
+    - `every_steps`: this many steps have passed since the last save.
+    - `every_seconds`: this long has passed since the last save.
+    - `max_overhead`: saving again keeps the time spent saving under this
+      fraction of the total time, i.e. the time since the last save is at
+      least `cost * (1 - max_overhead) / max_overhead`, where `cost` is the
+      moving average of the measured save times. The first adaptive
+      checkpoint is due at the first check, to measure the cost.
+
+    `min_seconds` is a lower bound of the time between two saves."""
+    def __init__(
+        self,
+        every_steps: int | None = None,
+        every_seconds: float | None = None,
+        max_overhead: float | None = None,
+        *,
+        min_seconds: float = 0.0,
+        smoothing: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            every_steps (int | None, optional): Save every this many steps.
+            every_seconds (float | None, optional): Save every this many seconds.
+            max_overhead (float | None, optional): The target fraction of time
+                spent saving, in (0, 1).
+            min_seconds (float, optional): The minimum time between two saves.
+                Defaults to `0.0`.
+            smoothing (float, optional): Weight of the latest save time in the
+                moving average of the cost. Defaults to `0.5`.
+            clock (Callable[[], float], optional): The clock in seconds.
+                Defaults to `time.monotonic`.
+        """
+        if every_steps is None and every_seconds is None and max_overhead is None:
+            raise ValueError("At least one of every_steps, every_seconds "
+                             "and max_overhead should be given")
+        if every_steps is not None and every_steps < 1:
+            raise ValueError(f"every_steps should be positive, got {every_steps}")
+        if max_overhead is not None and not 0 < max_overhead < 1:
+            raise ValueError(f"max_overhead should be in (0, 1), got {max_overhead}")
+
+        self.every_steps = every_steps
+        self.every_seconds = every_seconds
+        self.max_overhead = max_overhead
+        self.min_seconds = min_seconds
+        self.smoothing = smoothing
+        self.clock = clock
+        self.cost: float | None = None
+        self.history: list[dict[str, Any]] = []
+        self._last_step: int | None = None
+        self._last_time = clock()
+
+    def start(self, step: int) -> None:
+        """Count steps and time from now, e.g. after resuming at `step`."""
+        self._last_step = step
+        self._last_time = self.clock()
+
+    def due(self, step: int) -> str | None:
+        """The trigger firing at the step, or `None` if no save is due."""
+        if self._last_step is None:
+            self._last_step = step
+
+        elapsed = self.clock() - self._last_time
+
+        if elapsed < self.min_seconds:
+            return None
+        if self.every_steps is not None and step - self._last_step >= self.every_steps:
+            return "steps"
+        if self.every_seconds is not None and elapsed >= self.every_seconds:
+            return "time"
+        if self.max_overhead is not None:
+            if self.cost is None:
+                return "overhead"
+            if elapsed >= self.cost * (1 - self.max_overhead) / self.max_overhead:
+                return "overhead"
+
+        return None
+
+    def record(self, step: int, duration: float, **info) -> dict[str, Any]:
+        """Record a save taking `duration` seconds of the training loop,
+        and count from its end."""
+        if self.cost is None:
+            self.cost = duration
+        else:
+            self.cost += self.smoothing * (duration - self.cost)
+
+        entry = {"step": step, "duration": duration, "time": time.time(), **info}
+        self.history.append(entry)
+        self._last_step = step
+        self._last_time = self.clock()
+
+        return entry
@@ -0,0 +1,501 @@
+
+__all__ = [
+    "Storage",
+    "LocalStorage",
+    "ObjectStorage",
+    "DirectoryObjectStore",
+    "register_storage",
+    "get_storage"
+]
+
+import os, io
+import shutil
+import posixpath
+import threading
+import uuid
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections.abc import Callable
+from urllib.parse import quote, unquote
+
+from .._fsutil import atomic_path, atomic_write
+
+
+class Storage():
+    """Where checkpoints and logs are kept.
+
+    Objects are addressed by keys, joined by `join`. A key may also be a
+    prefix of other keys, like a directory. Writes are atomic: an object
+    appears when its writer is closed, and never appears if writing fails."""
+
+    def join(self, *parts: str) -> str:
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> str | None:
+        """The path of the key on the local filesystem, if it has one."""
+        return None
+
+    def names(self, prefix: str) -> list[str]:
+        """Names directly under the prefix, by a single list call."""
+        raise NotImplementedError
+
+    def list(self, prefix: str) -> dict[str, tuple[int, float]]:
+        """Keys under the prefix (relative to it, joined by `/`), with their
+        sizes and modification times, by a single list call."""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        """Whether the key is an object, or a prefix of objects."""
+        raise NotImplementedError
+
+    def info(self, key: str) -> tuple[int, float]:
+        """Size and modification time of an object, or the total size and
+        latest time of the objects under a prefix."""
+        raise NotImplementedError
+
+    def read(self, key: str, start: int = 0, end: int | None = None) -> bytes:
+        """Read the bytes `[start, end)` of an object."""
+        raise NotImplementedError
+
+    def writer(self, key: str) -> io.BufferedIOBase:
+        """A binary file-like object writing the object. Use it as a context
+        manager: the object is committed on a normal exit and dropped on errors."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """Delete an object, and the objects under it as a prefix."""
+        raise NotImplementedError
+
+    def write(self, key: str, data: bytes) -> None:
+        with self.writer(key) as f:
+            f.write(data)
+
+    def upload(self, path: str, key: str, *, chunk_size: int = 8 << 20) -> None:
+        """Copy a local file to the key."""
+        with open(path, "rb") as src, self.writer(key) as dst:
+            while chunk := src.read(chunk_size):
+                dst.write(chunk)
+
+    def download(self, key: str, path: str) -> None:
+        """Copy the object, or the objects under the prefix, to a local path."""
+        listing = self.list(key)
+        if not listing:
+            with open(path, "wb") as f:
+                f.write(self.read(key))
+            return
+        for rel in listing:
+            dst = os.path.join(path, *rel.split("/"))
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            with open(dst, "wb") as f:
+                f.write(self.read(self.join(key, rel)))
+
+
+### Local filesystem
+
+class _LocalWriter(io.FileIO):
+    # Written to a hidden temp file and renamed into place on a normal exit.
+    def __init__(self, path: str, fsync: bool):
+        self._target = atomic_path(path)
+        super().__init__(self._target.__enter__(), "wb")
+        self._fsync = fsync
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None and self._fsync:
+                self.flush()
+                os.fsync(self.fileno())
+            self.close()
+        except BaseException as e:
+            self.close()
+            self._target.__exit__(type(e), e, e.__traceback__)
+            raise
+        # Renamed into place, or removed if the block raised
+        self._target.__exit__(exc_type, exc, tb)
+
+
+class LocalStorage(Storage):
+    """Keys are paths on the local filesystem, relative to `root` (or to the
+    working directory if `root` is empty)."""
+    def __init__(self, root: str = "", *, fsync: bool = False):
+        self.root = root
+        self.fsync = fsync
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.root!r})"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key) if self.root else key
+
+    def join(self, *parts):
+        return os.path.join(*parts)
+
+    def local_path(self, key):
+        return self._path(key)
+
+    def names(self, prefix):
+        try:
+            with os.scandir(self._path(prefix)) as it:
+                return [entry.name for entry in it]
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+
+    def list(self, prefix):
+        top = self._path(prefix)
+        result = {}
+        for root, _, files in os.walk(top):
+            for name in files:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                rel = os.path.relpath(path, top).replace(os.sep, "/")
+                result[rel] = (stat.st_size, stat.st_mtime)
+        return result
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def info(self, key):
+        path = self._path(key)
+        if not os.path.isdir(path):
+            stat = os.stat(path)
+            return stat.st_size, stat.st_mtime
+        listing = self.list(key).values()
+        return sum(s for s, _ in listing), max((t for _, t in listing),
+                                               default=os.path.getmtime(path))
+
+    def read(self, key, start=0, end=None):
+        with open(self._path(key), "rb") as f:
+            f.seek(start)
+            return f.read() if end is None else f.read(end - start)
+
+    def writer(self, key):
+        return _LocalWriter(self._path(key), self.fsync)
+
+    def delete(self, key):
+        path = self._path(key)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    def upload(self, path, key, **kwargs):
+        dst = self._path(key)
+        if os.path.abspath(path) != os.path.abspath(dst):
+            with self.writer(key) as f, open(path, "rb") as src:
+                shutil.copyfileobj(src, f)
+
+    def download(self, key, path):
+        src = self._path(key)
+        if os.path.isdir(src):
+            shutil.copytree(src, path, dirs_exist_ok=True)
+        else:
+            shutil.copyfile(src, path)
+
+
+### Object stores
+
+class _MultipartWriter(io.BufferedIOBase):
+    # Parts are uploaded on the pool of the store while the next ones are
+    # written; objects smaller than a part are put by a single request.
+    def __init__(self, store: "ObjectStorage", key: str):
+        super().__init__()
+        self._store = store
+        self._key = key
+        self._buffer = bytearray()
+        self._upload_id: str | None = None
+        self._parts: deque[Future] = deque()
+        self._etags: list[str] = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def write(self, data) -> int:
+        view = memoryview(data).cast("B")
+        self._buffer += view
+        self._position += len(view)
+        part_size = self._store.part_size
+        while len(self._buffer) >= part_size:
+            self._submit(bytes(self._buffer[:part_size]))
+            del self._buffer[:part_size]
+        return len(view)
+
+    def _submit(self, part: bytes):
+        store = self._store
+        if self._upload_id is None:
+            self._upload_id = store._create_upload(self._key)
+        number = len(self._etags) + len(self._parts) + 1
+        self._parts.append(store._executor().submit(
+            store._upload_part, self._key, self._upload_id, number, part
+        ))
+        while len(self._parts) > store.max_concurrency:
+            self._etags.append(self._parts.popleft().result())
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.closed:
+            return
+        store = self._store
+        try:
+            if exc_type is None:
+                if self._upload_id is None:
+                    store._put(self._key, bytes(self._buffer))
+                else:
+                    if self._buffer:
+                        self._submit(bytes(self._buffer))
+                    while self._parts:
+                        self._etags.append(self._parts.popleft().result())
+                    store._complete_upload(self._key, self._upload_id, self._etags)
+                    self._upload_id = None
+        finally:
+            if self._upload_id is not None: # failed
+                for part in self._parts:
+                    part.cancel()
+                store._abort_upload(self._key, self._upload_id)
+            self._buffer.clear()
+            self.close()
+
+
+class ObjectStorage(Storage):
+    """Base of object stores, with a flat namespace of keys joined by `/`.
+
+    Subclasses implement the requests of the store (`_list`, `_head`, `_get`,
+    `_put`, `_delete` and the multipart upload ones). Large objects are
+    uploaded in parts of `part_size` bytes and read by ranges of the same size,
+    with up to `max_concurrency` requests in flight for each object."""
+    def __init__(self, *, part_size: int = 8 << 20, max_concurrency: int = 8):
+        if part_size <= 0:
+            raise ValueError(f"part size should be positive, got {part_size}")
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self._pool: ThreadPoolExecutor | None = None
+        self._pool_lock = threading.Lock()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    self.max_concurrency, thread_name_prefix="sucrose-storage"
+                )
+            return self._pool
+
+    ### Requests
+
+    def _list(self, prefix: str) -> list[tuple[str, int, float]]:
+        """All keys starting with the prefix, with sizes and times."""
+        raise NotImplementedError
+
+    def _head(self, key: str) -> tuple[int, float] | None:
+        raise NotImplementedError
+
+    def _get(self, key: str, start: int, end: int) -> bytes:
+        raise NotImplementedError
+
+    def _put(self, key: str, data: bytes) -> None:
+        raise NotImplementedError
+
+    def _delete(self, keys: list[str]) -> None:
+        raise NotImplementedError
+
+    def _create_upload(self, key: str) -> str:
+        raise NotImplementedError
+
+    def _upload_part(self, key: str, upload_id: str, number: int, data: bytes) -> str:
+        raise NotImplementedError
+
+    def _complete_upload(self, key: str, upload_id: str, etags: list[str]) -> None:
+        raise NotImplementedError
+
+    def _abort_upload(self, key: str, upload_id: str) -> None:
+        raise NotImplementedError
+
+    ### Storage
+
+    def join(self, *parts):
+        return posixpath.join(*parts)
+
+    def _prefix(self, prefix: str) -> str:
+        return prefix.rstrip("/") + "/" if prefix else ""
+
+    def list(self, prefix):
+        start = self._prefix(prefix)
+        return {key[len(start):]: (size, mtime) for key, size, mtime in self._list(start)}
+
+    def names(self, prefix):
+        return list(dict.fromkeys(rel.split("/", 1)[0] for rel in self.list(prefix)))
+
+    def exists(self, key):
+        return self._head(key) is not None or bool(self.list(key))
+
+    def info(self, key):
+        head = self._head(key)
+        if head is not None:
+            return head
+        listing = self.list(key).values()
+        if not listing:
+            raise FileNotFoundError(f"No object at {key}")
+        return sum(s for s, _ in listing), max(t for _, t in listing)
+
+    def read(self, key, start=0, end=None):
+        if end is None:
+            head = self._head(key)
+            if head is None:
+                raise FileNotFoundError(f"No object at {key}")
+            end = head[0]
+        if end - start <= self.part_size:
+            return self._get(key, start, end)
+
+        ranges = [(s, min(s + self.part_size, end))
+                  for s in range(start, end, self.part_size)]
+        futures = [self._executor().submit(self._get, key, s, e) for s, e in ranges]
+        return b"".join(f.result() for f in futures)
+
+    def writer(self, key):
+        return _MultipartWriter(self, key)
+
+    def delete(self, key):
+        keys = [self.join(key, rel) for rel in self.list(key)]
+        if self._head(key) is not None:
+            keys.append(key)
+        if keys:
+            self._delete(keys)
+
+
+class DirectoryObjectStore(ObjectStorage):
+    """An object store kept in a local directory, standing in for a real one
+    in tests and benchmarks.
+
+    Every object is a file named by its quoted key, so the namespace is flat
+    as in object stores, and listing is a single directory scan. Uploaded
+    parts are kept aside until the upload completes. Requests are counted in
+    `requests` by their kind."""
+    _UPLOADS = ".uploads"
+
+    def __init__(self, root: str, **kwargs):
+        super().__init__(**kwargs)
+        self.root = root
+        self.requests: Counter[str] = Counter()
+        self._requests_lock = threading.Lock()
+        os.makedirs(os.path.join(root, self._UPLOADS), exist_ok=True)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.root!r})"
+
+    def _count(self, kind: str):
+        with self._requests_lock:
+            self.requests[kind] += 1
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.root, quote(key, safe=""))
+
+    def _list(self, prefix):
+        self._count("list")
+        result = []
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                key = unquote(entry.name)
+                if key.startswith(prefix):
+                    stat = entry.stat()
+                    result.append((key, stat.st_size, stat.st_mtime))
+        return sorted(result)
+
+    def _head(self, key):
+        self._count("head")
+        try:
+            stat = os.stat(self._file(key))
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime
+
+    def _get(self, key, start, end):
+        self._count("get")
+        try:
+            with open(self._file(key), "rb") as f:
+                f.seek(start)
+                return f.read(end - start)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"No object at {key}") from None
+
+    def _put(self, key, data):
+        self._count("put")
+        atomic_write(self._file(key), data)
+
+    def _delete(self, keys):
+        self._count("delete")
+        for key in keys:
+            try:
+                os.remove(self._file(key))
+            except FileNotFoundError:
+                pass
+
+    def _upload_dir(self, upload_id: str) -> str:
+        return os.path.join(self.root, self._UPLOADS, upload_id)
+
+    def _create_upload(self, key):
+        self._count("create_upload")
+        upload_id = uuid.uuid4().hex
+        os.makedirs(self._upload_dir(upload_id))
+        return upload_id
+
+    def _upload_part(self, key, upload_id, number, data):
+        self._count("upload_part")
+        with open(os.path.join(self._upload_dir(upload_id), f"{number:05d}"), "wb") as f:
+            f.write(data)
+        return f"{upload_id}-{number}"
+
+    def _complete_upload(self, key, upload_id, etags):
+        self._count("complete_upload")
+        dir_name = self._upload_dir(upload_id)
+
+        def chunks():
+            for etag in etags:
+                number = int(etag.rsplit("-", 1)[1])
+                with open(os.path.join(dir_name, f"{number:05d}"), "rb") as f:
+                    yield f.read()
+
+        atomic_write(self._file(key), lambda f: f.writelines(chunks()))
+        shutil.rmtree(dir_name, ignore_errors=True)
+
+    def _abort_upload(self, key, upload_id):
+        self._count("abort_upload")
+        shutil.rmtree(self._upload_dir(upload_id), ignore_errors=True)
+
+
+### Registry
+
+_STORAGES: dict[str, Callable[[str], Storage]] = {}
+
+
+def register_storage(scheme: str, factory: Callable[[str], Storage], *, overwrite: bool = False):
+    """Register a factory of storages for URLs like `scheme://location`,
+    called with the location."""
+    if scheme in _STORAGES and not overwrite:
+        raise KeyError(f"storage for {scheme!r} is already registered")
+    _STORAGES[scheme] = factory
+
+
+def get_storage(url: str | None) -> Storage:
+    """The storage of the URL, like `dirobj:///path/to/bucket`. Local if the
+    URL is `None` or has no scheme."""
+    if url is None:
+        return LocalStorage()
+
+    scheme, sep, location = url.partition("://")
+    if not sep:
+        return LocalStorage(url)
+
+    try:
+        factory = _STORAGES[scheme]
+    except KeyError:
+        raise ValueError(
+            f"unknown storage {scheme!r}, expected one of {sorted(_STORAGES)}"
+        ) from None
+
+    return factory(location)
+
+
+register_storage("file", LocalStorage)
+register_storage("dirobj", DirectoryObjectStore)
@@ -0,0 +1,339 @@
+
+__all__ = [
+    "match_domains",
+    "run_sweep"
+]
+
+import os, json, time
+import fnmatch
+import traceback
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+from typing import Any
+
+from .sucrose_logger import logger
+from ._fsutil import atomic_write
+from .config import lookup, get_sweep, iter_sweep_members
+from .project.scenario import (
+    Scenario, _CONFIG_CACHE, _ckpt_pattern, find_latest_epoch, load_config,
+    reset_current, set_current_scenario, set_global
+)
+from .project.storage import get_storage
+
+SUMMARY_NAME = "sweep.json"
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+                   "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS")
+STATUS_SECS = 1.0
+
+
+def match_domains(
+    config: Mapping[str, Any],
+    pattern: str,
+    meta_domain: str = "workspace"
+) -> list[str]:
+    """Config domains matching the glob pattern (like `"base/*"`), in the
+    order of the config file. The meta domain is never matched.
+    Domains declaring sweeps are replaced by their members."""
+    domains: dict[str, None] = {}
+
+    for domain, dom_data in config.items():
+        if domain == meta_domain:
+            continue
+        if get_sweep(dom_data) is None:
+            names = (domain,)
+        else:
+            names = iter_sweep_members(config, domain)
+        for name in names:
+            if fnmatch.fnmatchcase(name, pattern):
+                domains[name] = None
+
+    return list(domains)
+
+
+def _latest_epoch(work_dir: str, config: Mapping[str, Any], domain: str, meta_domain: str) -> int:
+    def meta(field: str):
+        return lookup(config, domain=meta_domain, field=field)
+
+    pattern = _ckpt_pattern(domain, meta("epoch_prefix"), meta("ckpts_extension"))
+    try:
+        url = meta("storage")
+    except KeyError:
+        url = None
+
+    if url is None:
+        ckpts_dir = os.path.join(work_dir, meta("ckpts_folder"), domain)
+        return find_latest_epoch(ckpts_dir, pattern)
+
+    storage = get_storage(url)
+    return find_latest_epoch(storage.join(meta("ckpts_folder"), domain), pattern, storage)
+
+
+### Summary
+
+def _read_summary(path: str) -> dict[str, dict[str, Any]]:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)["runs"]
+    except FileNotFoundError:
+        return {}
+    except (ValueError, KeyError) as e:
+        logger.warning(f"Broken sweep summary {path} ({e!r}), starting over.")
+        return {}
+
+
+def _write_summary(path: str, runs: dict[str, dict[str, Any]]):
+    atomic_write(path, json.dumps({"updated": time.time(), "runs": runs}, indent=2))
+
+
+def _jsonable(value: Any) -> Any:
+    try:
+        json.dumps(value)
+    except (TypeError, ValueError):
+        return repr(value)
+    return value
+
+
+### Workers
+
+_STARTED = None # queue of the runs started by the worker
+
+
+@contextmanager
+def _thread_env(threads: int | None) -> Iterator[None]:
+    # OpenMP and BLAS libraries read these once, when they are loaded, which
+    # may be before the initializer of a forked worker runs. So they are set
+    # in the parent while the workers are created, and inherited.
+    if threads is None:
+        yield
+        return
+
+    saved = {name: os.environ.get(name) for name in THREAD_ENV_VARS}
+    os.environ.update({name: str(threads) for name in THREAD_ENV_VARS})
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def _init_worker(
+    config_entries: list[tuple[str, Any]],
+    threads: int | None,
+    cpu_sets: list[list[int]] | None,
+    counter,
+    started,
+):
+    global _STARTED
+    _STARTED = started
+    # The config parsed by the parent is reused, instead of parsed again.
+    _CONFIG_CACHE.update(config_entries)
+
+    if threads is not None:
+        # The env vars are set by the parent, but torch may be imported
+        # already in a forked worker.
+        try:
+            import torch
+        except ImportError:
+            pass
+        else:
+            torch.set_num_threads(threads)
+
+    if cpu_sets and hasattr(os, "sched_setaffinity"):
+        with counter.get_lock():
+            index = counter.value
+            counter.value += 1
+        os.sched_setaffinity(0, cpu_sets[index % len(cpu_sets)])
+
+
+def _run_one(
+    work_dir: str,
+    domain: str,
+    train_fn: Callable[[Scenario], Any],
+    scenario_kwds: dict[str, Any],
+) -> dict[str, Any]:
+    started = time.time()
+    if _STARTED is not None:
+        _STARTED.put((domain, started))
+
+    sc = Scenario(work_dir, domain, **scenario_kwds)
+    token = set_current_scenario(sc, process_wide=True)
+    try:
+        result = train_fn(sc)
+        sc.flush()
+    finally:
+        reset_current('Scenario', token)
+        set_global('Scenario', None)
+
+    return {"started": started, "epoch": sc.LAST_EPOCH, "steps": sc.num_steps,
+            "result": _jsonable(result)}
+
+
+def _cpu_sets(workers: int, threads: int | None) -> list[list[int]]:
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") \
+        else list(range(os.cpu_count() or 1))
+    size = threads or max(1, len(cpus) // workers)
+    return [cpus[i:i + size] for i in range(0, len(cpus) - size + 1, size)] or [cpus]
+
+
+def run_sweep(
+    work_dir: str,
+    train_fn: Callable[[Scenario], Any],
+    pattern: str = "*",
+    *,
+    target_epoch: int | None = None,
+    max_workers: int | None = None,
+    threads_per_task: int | None = 1,
+    pin_cpus: bool = False,
+    meta_domain: str = "workspace",
+    summary_file: str | None = None,
+    retry_failed: bool = True,
+    mp_context: str | None = None,
+    scenario_kwds: dict[str, Any] | None = None,
+) -> dict[str, dict[str, Any]]:
+    """Run `train_fn(scenario)` for every config domain matching `pattern`,
+    on a pool of worker processes.
+
+    The config file is parsed once, and the parsed data is handed to the
+    workers. Each scenario is started in a worker, set as the current
+    scenario, and flushed after `train_fn` returns.
+
+    Scenarios are skipped if their latest checkpoint reaches `target_epoch`,
+    or (if `target_epoch` is `None`) if they are done in the summary file.
+    The summary file is updated as runs are queued, picked up by a worker
+    and finished, so that running the sweep again resumes it.
+
+    Args:
+        work_dir (str): The workspace directory containing `config.yaml`.
+        train_fn (Callable[[Scenario], Any]): The training function, which must
+            be picklable (defined at module level). Its return value is kept in
+            the summary if it can be serialized as JSON.
+        pattern (str, optional): Glob pattern of the domains to run.
+            Defaults to `"*"`.
+        target_epoch (int | None, optional): The epoch a finished run reaches.
+            Defaults to `None`.
+        max_workers (int | None, optional): Number of worker processes. Use
+            the number of CPUs divided by `threads_per_task` if `None`, and run
+            in this process if `0`. Defaults to `None`.
+        threads_per_task (int | None, optional): Threads of torch and BLAS
+            libraries in each worker. Not limited if `None`. Defaults to `1`.
+        pin_cpus (bool, optional): Pin each worker to its own set of CPUs
+            (on platforms supporting CPU affinity). Defaults to `False`.
+        meta_domain (str, optional): The config domain of workspace settings.
+            Defaults to `"workspace"`.
+        summary_file (str | None, optional): Path of the summary file.
+            Defaults to `WORK_DIR/sweep.json`.
+        retry_failed (bool, optional): Run the failed runs in the summary again.
+            Defaults to `True`.
+        mp_context (str | None, optional): Start method of the worker processes,
+            like `"spawn"`. Use the default of the platform if `None`.
+        scenario_kwds (dict[str, Any] | None, optional): Keyword args of `Scenario`.
+
+    Returns:
+        dict[str, dict[str, Any]]: Status of every matched run, as in the summary.
+    """
+    config = load_config(work_dir)
+    domains = match_domains(config, pattern, meta_domain)
+    summary_file = summary_file or os.path.join(work_dir, SUMMARY_NAME)
+    runs = _read_summary(summary_file)
+    scenario_kwds = dict(scenario_kwds or {}, meta_domain=meta_domain)
+    pending: list[str] = []
+
+    for domain in domains:
+        record = runs.get(domain, {})
+        latest = _latest_epoch(work_dir, config, domain, meta_domain)
+
+        if target_epoch is not None:
+            done = latest >= target_epoch
+        else:
+            done = record.get("status") in ("done", "skipped")
+
+        if done or (record.get("status") == "failed" and not retry_failed):
+            if not done:
+                logger.info(f"Sweep: {domain!r} failed before, not retried.")
+            elif record.get("status") != "done":
+                runs[domain] = {"status": "skipped", "epoch": latest}
+            continue
+
+        pending.append(domain)
+
+    logger.info(f"Sweep: {len(pending)} of {len(domains)} runs to start.")
+
+    if not pending:
+        _write_summary(summary_file, runs)
+        return {d: runs[d] for d in domains if d in runs}
+
+    def start(domain: str, status: str = "running"):
+        runs[domain] = {"status": status, "started": time.time()}
+
+    def drain(started) -> bool:
+        # A run may be finished before its start is read, so only queued runs
+        # are marked running.
+        changed = False
+        while not started.empty():
+            domain, when = started.get()
+            record = runs[domain]
+            if record["status"] == "queued":
+                record.update(status="running", started=when)
+                changed = True
+        return changed
+
+    def finish(domain: str, future: Future):
+        record = runs[domain]
+        record["finished"] = time.time()
+        try:
+            record.update(future.result())
+        except Exception as e:
+            record["status"] = "failed"
+            record["error"] = "".join(traceback.format_exception_only(type(e), e)).strip()
+            logger.error(f"Sweep: {domain!r} failed: {record['error']}")
+        else:
+            record["status"] = "done"
+            logger.info(f"Sweep: {domain!r} done at epoch {record['epoch']}.")
+        _write_summary(summary_file, runs)
+
+    if max_workers == 0:
+        for domain in pending:
+            start(domain)
+            _write_summary(summary_file, runs)
+            future = Future()
+            try:
+                future.set_result(_run_one(work_dir, domain, train_fn, scenario_kwds))
+            except Exception as e:
+                future.set_exception(e)
+            finish(domain, future)
+        return {d: runs[d] for d in domains if d in runs}
+
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 1) // (threads_per_task or 1))
+    max_workers = min(max_workers, len(pending))
+
+    ctx = multiprocessing.get_context(mp_context)
+    config_path = os.path.abspath(os.path.join(work_dir, "config.yaml"))
+    config_entries = [(config_path, _CONFIG_CACHE[config_path])]
+    cpu_sets = _cpu_sets(max_workers, threads_per_task) if pin_cpus else None
+    started = ctx.SimpleQueue()
+    initargs = (config_entries, threads_per_task, cpu_sets, ctx.Value("i", 0), started)
+
+    with _thread_env(threads_per_task), \
+            ProcessPoolExecutor(max_workers, mp_context=ctx,
+                                initializer=_init_worker, initargs=initargs) as executor:
+        futures = {}
+        for domain in pending:
+            start(domain, "queued")
+            futures[executor.submit(_run_one, work_dir, domain, train_fn, scenario_kwds)] = domain
+        _write_summary(summary_file, runs)
+
+        not_done = set(futures)
+        while not_done:
+            done, not_done = wait(not_done, timeout=STATUS_SECS, return_when=FIRST_COMPLETED)
+            if drain(started) and not done:
+                _write_summary(summary_file, runs)
+            for future in done:
+                finish(futures[future], future)
+
+    return {d: runs[d] for d in domains if d in runs}